@@ -0,0 +1,115 @@
+"""
+集計処理のベンチマーク
+合成した作業時間エントリを Python の集計 (GroupBy) と列指向の集計 (ColumnarGroupBy) で集計し、
+エントリ数ごとの処理時間を比較する
+列指向の集計は、ローカルストアから列形式で読み込んだ場合 (エントリの辞書を経由しない場合) も計測する
+
+実行例:
+    python benchmarks/bench_aggregation.py
+    python benchmarks/bench_aggregation.py --sizes 10000 100000
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+from collections.abc import Iterator
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import aggregation
+from time_entry import TimeEntry
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+
+# 月次・四半期のチェックを想定した集計軸と集計内容
+DIMENSIONS = ('day', 'user', 'project')
+ROLLUPS = [('user',), ('project',), ('day',), ('day', 'user')]
+
+
+def synthetic_entries(count: int, users: int = 300, projects: int = 40, days: int = 92) -> Iterator[TimeEntry]:
+    """
+    作業時間エントリを合成する
+
+    メモリに保持しないよう1件ずつ生成する。
+
+    Args:
+        count: エントリ数
+        users: ユーザー数
+        projects: プロジェクト数
+        days: 期間の日数 (既定は四半期)
+
+    Yields:
+        作業時間エントリ
+    """
+    start = datetime.date(2025, 10, 1).toordinal()
+    day_names = [datetime.date.fromordinal(start + i).isoformat() for i in range(days)]
+    project_names = [f'Project {i}' for i in range(projects)]
+    for i in range(count):
+        yield TimeEntry(
+            i,
+            day_names[i % days],
+            0.25 * (i % 16 + 1),
+            (i * 7) % users,
+            project_id=i % projects,
+            project_name=project_names[i % projects],
+        )
+
+
+def _measure(count: int, factory: type | None) -> float:
+    """エントリの生成 (factory が None の場合) または生成と集計にかかった秒数を返す"""
+    started = time.perf_counter()
+    entries = synthetic_entries(count)
+    if factory is None:
+        for _ in entries:
+            pass
+    else:
+        factory(DIMENSIONS).add(entries).rollups(ROLLUPS)
+    return time.perf_counter() - started
+
+
+def _measure_columns(count: int) -> float:
+    """列形式のデータ (ローカルストアからの読み込みを想定) の集計にかかった秒数を返す"""
+    columns: dict[str, list] = {d: [] for d in DIMENSIONS}
+    hours = []
+    for entry in synthetic_entries(count):
+        for dimension in DIMENSIONS:
+            columns[dimension].append(getattr(entry, aggregation.DIMENSIONS[dimension]))
+        hours.append(entry.hours)
+
+    started = time.perf_counter()
+    aggregation.ColumnarGroupBy(DIMENSIONS).add_columns(columns, hours).rollups(ROLLUPS)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    """ベンチマークを実行し、結果を表形式で出力する"""
+    parser = argparse.ArgumentParser(description='集計処理のベンチマーク')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='エントリ数のリスト')
+    args = parser.parse_args()
+
+    backends: list[tuple[str, type]] = [('python', aggregation.GroupBy)]
+    if aggregation.load_numpy() is not None:
+        backends.append(('numpy', aggregation.ColumnarGroupBy))
+    else:
+        print('numpy が導入されていないため、Python の集計のみ計測します')
+
+    # 生成時間を差し引いた集計のみの時間も併せて出力する
+    header = ['entries', 'generate'] + [f'{name} (agg only)' for name, _ in backends]
+    if aggregation.load_numpy() is not None:
+        header.append('numpy columns')
+    print(' | '.join(f'{h:>20}' for h in header))
+    for count in args.sizes:
+        generate = _measure(count, None)
+        row = [f'{count:,}', f'{generate:.3f}s']
+        for _, factory in backends:
+            total = _measure(count, factory)
+            row.append(f'{total:.3f}s ({max(total - generate, 0):.3f}s)')
+        if aggregation.load_numpy() is not None:
+            row.append(f'{_measure_columns(count):.3f}s')
+        print(' | '.join(f'{c:>20}' for c in row))
+
+
+if __name__ == '__main__':
+    main()
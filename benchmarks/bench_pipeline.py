@@ -0,0 +1,296 @@
+"""
+日次チェック処理全体のベンチマーク
+Redmine スタンドインサーバー (tests/fake_redmine.py) に対して
+前回チェック日の特定 → 対象日のデータ取得・集計 → チケット作成 を実行し、
+所要時間・HTTP リクエスト数・転送量・ピークメモリ (RSS) を工程ごとに計測する
+
+シナリオごとに子プロセスでチェック処理を実行するため、ピークメモリはシナリオ単位の値になる。
+メンバーの先行取得は他の工程と並行して実行されるため、その通信は工程ごとの値に含めず members_prefetch として別に数える。
+結果は JSON で出力し、--compare で以前の結果と比較して性能の劣化を検出できる。
+
+実行例:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --preset full --latency 0.02 --output results.json
+    python benchmarks/bench_pipeline.py --compare baseline.json --tolerance 0.2
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from multiprocessing.process import BaseProcess
+from queue import Empty
+from typing import Any
+from urllib.parse import urlsplit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from fake_redmine import FakeRedmine  # noqa: E402
+
+# (メンバー数, 対象日の作業時間エントリ数) の組み合わせ
+PRESETS = {
+    'small': [(10, 100), (100, 1_000), (100, 10_000)],
+    'full': [(10, 100), (100, 10_000), (1_000, 10_000), (1_000, 100_000), (10_000, 100_000), (10_000, 1_000_000)],
+}
+
+# 比較時に劣化を判定する指標 (値が大きいほど悪いもの)
+COMPARED_METRICS = ('wall_time', 'http_requests', 'bytes_received', 'peak_rss_kb')
+
+
+def _run_pipeline(url: str, api_key: str, project_id: str, member_ids: list[int], cache_dir: str, queue: multiprocessing.Queue) -> None:
+    """
+    子プロセスでチェック処理を実行し、計測結果をキューに送る
+
+    main.main と同じ順序で各工程を呼び出し、工程ごとに所要時間と HTTP 通信量を記録する。
+    """
+    import requests
+
+    import check_specific_time
+    import main
+    import redmine_client
+    import user_setting as us
+
+    us.REDMINE_URL = url
+    us.REDMINE_API_KEY = api_key
+    us.TARGET_PROJECT_ID = project_id
+    us.TARGET_LIST = member_ids
+    us.CACHE_DIR = cache_dir
+
+    # 応答ごとにリクエスト数と受信量 (ヘッダーの Content-Length) を数える
+    # メンバーの取得 (メンバーシップ・グループ) は先行取得として他の工程と並行するため、別に数える
+    traffic = {'requests': 0, 'bytes': 0}
+    prefetch_traffic = {'requests': 0, 'bytes': 0}
+    lock = threading.Lock()
+
+    def count_response(response: requests.Response, *args: object, **kwargs: object) -> None:
+        path = urlsplit(response.url).path
+        counter = prefetch_traffic if path.endswith('/memberships.json') or path.startswith('/groups/') else traffic
+        with lock:
+            counter['requests'] += 1
+            counter['bytes'] += int(response.headers.get('Content-Length') or 0)
+
+    redmine_client.get_client().session.hooks['response'].append(count_response)
+
+    phases = []
+
+    def measure(name: str, func: Callable[..., Any], *args: Any) -> Any:
+        with lock:
+            before = dict(traffic)
+        started = time.perf_counter()
+        result = func(*args)
+        with lock:
+            after = dict(traffic)
+        phases.append(
+            {
+                'name': name,
+                'wall_time': time.perf_counter() - started,
+                'http_requests': after['requests'] - before['requests'],
+                'bytes_received': after['bytes'] - before['bytes'],
+            }
+        )
+        return result
+
+    started = time.perf_counter()
+    members_future = check_specific_time.prefetch_project_members()
+    prefetch_done: list[float] = []
+    members_future.add_done_callback(lambda _: prefetch_done.append(time.perf_counter()))
+    target_date = measure('last_target_date', check_specific_time.get_last_target_date)
+    result = measure('fetch_and_aggregate', check_specific_time.get_specific_date_time, target_date, members_future)
+    measure('create_ticket', main._report, *result)
+    wall_time = time.perf_counter() - started
+
+    # 先行取得は get_specific_date_time が結果を受け取った時点で完了している
+    phases.insert(
+        0,
+        {
+            'name': 'members_prefetch',
+            'wall_time': prefetch_done[0] - started,
+            'http_requests': prefetch_traffic['requests'],
+            'bytes_received': prefetch_traffic['bytes'],
+        },
+    )
+    queue.put(
+        {
+            'wall_time': wall_time,
+            'http_requests': traffic['requests'] + prefetch_traffic['requests'],
+            'bytes_received': traffic['bytes'] + prefetch_traffic['bytes'],
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'phases': phases,
+        }
+    )
+
+
+def _receive_result(queue: multiprocessing.Queue, process: BaseProcess, timeout: float) -> dict:
+    """
+    子プロセスから計測結果を受け取る
+
+    Raises:
+        RuntimeError: 子プロセスが結果を返さずに終了した場合、または timeout 秒以内に終わらなかった場合
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result: dict = queue.get(timeout=1.0)
+            return result
+        except Empty:
+            pass
+        if process.exitcode is not None:
+            # 終了直前に送られた結果が届いていれば受け取る
+            try:
+                result = queue.get(timeout=1.0)
+                return result
+            except Empty:
+                raise RuntimeError(f'チェック処理のプロセスが結果を返さずに終了しました (終了コード: {process.exitcode})') from None
+        if time.monotonic() > deadline:
+            process.terminate()
+            raise RuntimeError(f'チェック処理が {timeout:.0f}秒以内に終わりませんでした')
+
+
+def run_scenario(members: int, entries: int, latency: float, timeout: float = 1800.0) -> dict:
+    """
+    1つのシナリオを実行する
+
+    Args:
+        members: プロジェクトメンバー数
+        entries: 対象日の作業時間エントリ数
+        latency: リクエストごとの応答遅延 (秒)
+        timeout: 子プロセスの結果を待つ最大秒数
+
+    Returns:
+        計測結果
+
+    Raises:
+        RuntimeError: 子プロセスが異常終了した場合、または timeout 秒以内に終わらなかった場合
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    # 非メンバーの入力も含まれるよう、ユーザー数はメンバー数より多くする
+    with FakeRedmine(users=members + max(members // 5, 1), members=members, entries_per_day=entries, latency=latency) as fake:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            process = context.Process(
+                target=_run_pipeline,
+                args=(fake.url, fake.api_key, fake.project_id, fake.member_ids(), cache_dir, queue),
+            )
+            process.start()
+            try:
+                result = _receive_result(queue, process, timeout)
+            finally:
+                process.join()
+
+        result.update(
+            {
+                'members': members,
+                'entries': entries,
+                'latency': latency,
+                'server_requests': len(fake.requests),
+                'server_bytes_sent': fake.bytes_sent,
+                'tickets_created': len(fake.issues),
+            }
+        )
+    return result
+
+
+def _git_revision() -> str | None:
+    """計測したコードのコミットID"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline_path: str, tolerance: float) -> list[str]:
+    """
+    以前の結果と比較し、許容範囲を超えて悪化した指標を返す
+
+    Args:
+        results: 今回の計測結果
+        baseline_path: 比較対象の結果ファイル
+        tolerance: 許容する悪化の割合 (0.2 なら 20% まで)
+
+    Returns:
+        悪化した指標の説明のリスト
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['members'], r['entries'], r['latency']): r for r in json.load(f)['scenarios']}
+
+    regressions = []
+    for result in results:
+        before = baseline.get((result['members'], result['entries'], result['latency']))
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if before[metric] and result[metric] > before[metric] * (1 + tolerance):
+                regressions.append(
+                    f'members={result["members"]} entries={result["entries"]}: {metric} {before[metric]:.3f} -> {result[metric]:.3f} '
+                    f'(+{(result[metric] / before[metric] - 1) * 100:.0f}%)'
+                )
+    return regressions
+
+
+def main() -> None:
+    """ベンチマークを実行し、結果を表形式と JSON で出力する"""
+    parser = argparse.ArgumentParser(description='日次チェック処理全体のベンチマーク')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small', help='シナリオの組み合わせ')
+    parser.add_argument('--scenario', nargs=2, type=int, action='append', metavar=('MEMBERS', 'ENTRIES'), help='シナリオを個別に指定する (複数可)')
+    parser.add_argument('--latency', type=float, default=0.0, help='リクエストごとの応答遅延 (秒)')
+    parser.add_argument('--output', help='結果を書き出す JSON ファイル')
+    parser.add_argument('--compare', help='比較対象の結果 JSON ファイル')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='比較時に許容する悪化の割合')
+    parser.add_argument('--timeout', type=float, default=1800.0, help='シナリオごとの最大秒数')
+    args = parser.parse_args()
+
+    scenarios = args.scenario or PRESETS[args.preset]
+
+    results = []
+    failed = False
+    print(f'{"members":>8} {"entries":>10} {"wall":>9} {"requests":>9} {"MB recv":>9} {"peak RSS MB":>12}  phases')
+    for members, entries in scenarios:
+        try:
+            result = run_scenario(members, entries, args.latency, args.timeout)
+        except RuntimeError as e:
+            print(f'{members:>8} {entries:>10}  失敗: {e}')
+            failed = True
+            continue
+        results.append(result)
+        phases = ', '.join(f'{p["name"]}={p["wall_time"]:.3f}s/{p["http_requests"]}req' for p in result['phases'])
+        print(
+            f'{members:>8} {entries:>10} {result["wall_time"]:>8.3f}s {result["http_requests"]:>9} '
+            f'{result["bytes_received"] / 1e6:>9.2f} {result["peak_rss_kb"] / 1024:>12.1f}  {phases}'
+        )
+
+    report = {
+        'benchmark': 'pipeline',
+        'created_at': datetime.datetime.now(datetime.UTC).isoformat(),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scenarios': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'結果を出力しました: {args.output}')
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f'性能劣化: {line}')
+        if regressions:
+            sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
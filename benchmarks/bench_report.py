@@ -0,0 +1,73 @@
+"""
+レポート生成のベンチマーク
+合成したチェック結果 (プロジェクト・日付ごとのメンバーとプロジェクト別集計) からレポートを生成し、
+report モジュールの出力形式ごと・ワーカープロセス数ごとの処理時間を比較する
+
+実行例:
+    python benchmarks/bench_report.py
+    python benchmarks/bench_report.py --reports 2000 --members 500 --workers 1 4
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import report
+import user_setting as us
+
+
+def synthetic_specs(reports: int, members: int, projects: int = 40, seed: int = 0) -> list[tuple]:
+    """
+    レポートの元になるチェック結果を合成する
+
+    Args:
+        reports: レポート数 (プロジェクト・日付の組み合わせ数)
+        members: レポートごとのメンバー数
+        projects: プロジェクト別集計の行数
+        seed: 乱数のシード
+
+    Returns:
+        (対象日付, チェック対象ユーザー, 入力済みユーザー, プロジェクト別集計, プロジェクトID) のリスト
+    """
+    rng = random.Random(seed)
+    target_users = {uid: f'User {uid}' for uid in range(1, members + 1)}
+    specs = []
+    for index in range(reports):
+        entered_users = {uid: rng.choice([0.5, 4.0, 7.5, 8.0]) for uid in target_users if rng.random() < 0.9}
+        entered_projects = {f'Project {p}': rng.uniform(1, 200) for p in range(projects)}
+        specs.append((f'2025-{index % 12 + 1:02d}-{index % 28 + 1:02d}', target_users, entered_users, entered_projects, f'prj_{index}'))
+    return specs
+
+
+def _measure(func: object, *args: object, **kwargs: object) -> float:
+    """処理時間を計測する"""
+    started = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    """ベンチマークを実行し、結果を表形式で出力する"""
+    parser = argparse.ArgumentParser(description='レポート生成のベンチマーク')
+    parser.add_argument('--reports', type=int, default=1000, help='レポート数')
+    parser.add_argument('--members', type=int, default=300, help='レポートごとのメンバー数')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1], help='ワーカープロセス数のリスト')
+    args = parser.parse_args()
+
+    # 件数によらずワーカー数の指定どおりに生成する
+    us.REPORT_PARALLEL_MIN = 1
+    specs = synthetic_specs(args.reports, args.members)
+    print(f'{args.reports:,} 件 (メンバー {args.members:,} 名) のレポートを生成')
+
+    for fmt in report.FORMATS:
+        for workers in args.workers:
+            elapsed = _measure(report.render_many, specs, fmt, workers=workers)
+            print(f'{f"{fmt} (workers={workers})":>24}: {elapsed:.3f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,392 @@
+"""
+作業時間エントリの集計を行うモジュール
+エントリを1回走査するだけで、ユーザー・プロジェクト・作業分類・チケット・日付の任意の組み合わせで集計できる
+"""
+
+import datetime
+import itertools
+import math
+import operator
+import sys
+from array import array
+from collections.abc import Callable, Collection, Iterable, Mapping, Sequence
+from typing import Any
+
+import user_setting as us
+from time_entry import TimeEntry
+
+# numpy は任意の依存関係 (未導入時は GroupBy を使う)
+# 読み込みに時間がかかるため、列指向の集計が必要になった時点で load_numpy により読み込む
+np: Any = None
+_numpy_loaded = False
+
+# 列指向の集計で、ソートせずに bincount で集計する組み合わせの数の下限
+_DENSE_LIMIT = 1 << 20
+
+# 列指向の集計で、組み合わせを1つの整数 (int64) にまとめられる組み合わせの数の上限
+_KEY_LIMIT = 1 << 63
+
+# 列指向の集計で、エントリを列に変換する際にまとめて処理する件数
+_ADD_BATCH_SIZE = 4096
+
+# 集計軸と、値を取り出す TimeEntry の属性
+DIMENSIONS: dict[str, str] = {
+    'user': 'user_id',
+    'project': 'project_name',
+    'activity': 'activity_name',
+    'issue': 'issue_id',
+    'day': 'spent_on',
+}
+
+
+def _intern(value: object) -> object:
+    """文字列は同じ値を1つのオブジェクトで共有する"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class GroupBy:
+    """
+    作業時間エントリのグループ集計
+
+    エントリは指定された全集計軸の組み合わせ (最も細かい粒度) ごとに積算する。
+    組み合わせごとに連番を割り当て、時間と件数は連番をインデックスとする数値配列に保持するため、
+    エントリ数が増えても使用メモリは組み合わせの数に比例する。
+    任意の集計軸での集計 (rollup) は、エントリではなく組み合わせを走査して求める。
+    """
+
+    def __init__(self, dimensions: Iterable[str]) -> None:
+        """
+        Args:
+            dimensions: 集計軸のリスト (DIMENSIONS のキー)
+
+        Raises:
+            ValueError: 未知の集計軸が指定された場合
+        """
+        self.dimensions = tuple(dimensions)
+        unknown = [d for d in self.dimensions if d not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f'未知の集計軸: {", ".join(unknown)}')
+
+        # 全集計軸の値をまとめて取り出す (集計軸が1つでもタプルにする)
+        attributes = [DIMENSIONS[d] for d in self.dimensions]
+        getter = operator.attrgetter(*attributes)
+        self._key_of: Callable[[TimeEntry], tuple] = getter if len(attributes) > 1 else lambda entry: (getter(entry),)
+        self._slots: dict[tuple, int] = {}
+        self._keys: list[tuple] = []
+        self._hours = array('d')
+        self._counts = array('q')
+
+    def __len__(self) -> int:
+        """組み合わせの数"""
+        return len(self._keys)
+
+    def add(self, entries: Iterable[TimeEntry]) -> 'GroupBy':
+        """
+        エントリを積算する
+
+        Args:
+            entries: 作業時間エントリのイテラブル (1回だけ走査する)
+
+        Returns:
+            自身 (呼び出しを連結できるように)
+        """
+        key_of = self._key_of
+        slots = self._slots
+        hours = self._hours
+        counts = self._counts
+
+        for entry in entries:
+            key = key_of(entry)
+            slot = slots.get(key)
+            if slot is None:
+                # 初出の組み合わせのみ、値を共有化して登録する
+                key = tuple([_intern(value) for value in key])
+                slot = slots[key] = len(self._keys)
+                self._keys.append(key)
+                hours.append(0.0)
+                counts.append(0)
+            hours[slot] += entry.hours
+            counts[slot] += 1
+
+        return self
+
+    def _select(self, by: Iterable[str], where: dict[str, Collection] | None) -> tuple[list[int], list[tuple[int, Collection]]]:
+        """集計軸名を組み合わせ内の位置に変換する"""
+        positions = [self.dimensions.index(d) for d in by]
+        filters = [(self.dimensions.index(d), values) for d, values in (where or {}).items()]
+        return positions, filters
+
+    def rollup(self, by: Iterable[str], where: dict[str, Collection] | None = None, counts: bool = False) -> dict:
+        """
+        指定した集計軸で集計する
+
+        Args:
+            by: 集計軸のリスト。1つの場合はキーを値そのものとし、複数の場合はタプルとする
+            where: {集計軸: 対象とする値の集合} の絞り込み条件
+            counts: True の場合は時間ではなくエントリ件数を集計する
+
+        Returns:
+            {キー: 時間 (または件数)} の辞書 (キーは初出順)
+        """
+        by = tuple(by)
+        positions, filters = self._select(by, where)
+        values = self._counts if counts else self._hours
+        single = positions[0] if len(positions) == 1 else None
+
+        result: dict = {}
+        for slot, key in enumerate(self._keys):
+            if filters and not all(key[pos] in allowed for pos, allowed in filters):
+                continue
+            group = key[single] if single is not None else tuple([key[pos] for pos in positions])
+            result[group] = result.get(group, 0) + values[slot]
+
+        return result
+
+    def rollups(self, specs: Iterable[Iterable[str]], where: dict[str, Collection] | None = None) -> list[dict]:
+        """
+        複数の集計軸の組み合わせでまとめて集計する
+
+        Args:
+            specs: 集計軸のリストのリスト
+            where: {集計軸: 対象とする値の集合} の絞り込み条件
+
+        Returns:
+            specs の順に rollup の結果を並べたリスト
+        """
+        return [self.rollup(by, where) for by in specs]
+
+
+def load_numpy() -> Any:
+    """
+    numpy を読み込む (2回目以降は読み込み済みのモジュールを返す)
+
+    Returns:
+        numpy モジュール、または導入されていない場合はNone
+    """
+    global np, _numpy_loaded
+
+    if not _numpy_loaded:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _numpy_loaded = True
+    return np
+
+
+class ColumnarGroupBy:
+    """
+    作業時間エントリの列指向のグループ集計 (numpy が必要)
+
+    エントリは集計軸ごとの整数配列と時間の配列に格納する。
+    ユーザーはユーザーID、日付は序数 (datetime.date.toordinal)、それ以外の集計軸は初出順のコードとする。
+    集計は配列全体に対する bincount (組み合わせの範囲が広い場合は unique) で行う。
+    組み合わせの範囲が int64 に収まらない場合は、1つの整数にまとめずに列の組で unique する。
+    列形式のデータを add_columns で渡した場合は、エントリの辞書を走査する GroupBy より大幅に速い。
+    インターフェースは GroupBy と同じ。
+    """
+
+    def __init__(self, dimensions: Iterable[str]) -> None:
+        """
+        Args:
+            dimensions: 集計軸のリスト (DIMENSIONS のキー)
+
+        Raises:
+            ValueError: 未知の集計軸が指定された場合
+            RuntimeError: numpy が利用できない場合
+        """
+        if load_numpy() is None:
+            raise RuntimeError('numpy が利用できません')
+        self.dimensions = tuple(dimensions)
+        unknown = [d for d in self.dimensions if d not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f'未知の集計軸: {", ".join(unknown)}')
+
+        self._getters = [operator.attrgetter(DIMENSIONS[d]) for d in self.dimensions]
+        # 集計軸ごとの {値: コード} と {コード: 値} (ユーザーはIDをそのままコードとする)
+        self._codes: list[dict | None] = [None if d == 'user' else {} for d in self.dimensions]
+        self._values: list[dict] = [{} for _ in self.dimensions]
+        self._columns = [array('q') for _ in self.dimensions]
+        self._hours = array('d')
+        self._arrays: tuple | None = None
+
+    def __len__(self) -> int:
+        """組み合わせの数"""
+        if not self._hours:
+            return 0
+        columns, _ = self._as_arrays()
+        return len(np.unique(np.stack(columns), axis=1)[0])
+
+    def _encode(self, index: int, codes: dict, value: Any) -> int:
+        """集計軸の値に整数のコードを割り当てる (ユーザー以外)"""
+        code = codes.get(value)
+        if code is None:
+            value = _intern(value)
+            # 日付は序数をコードとし、並べ替えや範囲の比較に使えるようにする
+            code = datetime.date.fromisoformat(value).toordinal() if self.dimensions[index] == 'day' else len(codes)
+            codes[value] = code
+            self._values[index][code] = value
+        return code
+
+    def add(self, entries: Iterable[TimeEntry]) -> 'ColumnarGroupBy':
+        """
+        エントリを列に追加する
+
+        Args:
+            entries: 作業時間エントリのイテラブル (1回だけ走査する)
+
+        Returns:
+            自身 (呼び出しを連結できるように)
+        """
+        # 一定件数ずつまとめ、集計軸ごとに列単位で変換して追加する
+        for batch in itertools.batched(entries, _ADD_BATCH_SIZE):
+            for index, getter in enumerate(self._getters):
+                self._extend(index, list(map(getter, batch)))
+            self._hours.extend([entry.hours for entry in batch])
+
+        self._arrays = None
+        return self
+
+    def add_columns(self, columns: Mapping[str, Sequence], hours: Sequence[float]) -> 'ColumnarGroupBy':
+        """
+        列形式のエントリを追加する (ローカルストアなど、すでに列形式のデータがある場合)
+
+        Args:
+            columns: {集計軸: 値の列} の辞書 (全集計軸を含み、各列の長さは hours と同じ)
+            hours: 時間の列
+
+        Returns:
+            自身 (呼び出しを連結できるように)
+        """
+        for index, dimension in enumerate(self.dimensions):
+            self._extend(index, columns[dimension])
+        self._hours.extend(hours)
+
+        self._arrays = None
+        return self
+
+    def _extend(self, index: int, values: Sequence) -> None:
+        """集計軸の値の列をコードに変換して追加する"""
+        codes = self._codes[index]
+        if codes is None:
+            self._columns[index].extend(values)
+            return
+        for value in set(values).difference(codes):
+            self._encode(index, codes, value)
+        self._columns[index].extend(map(codes.__getitem__, values))
+
+    def _as_arrays(self) -> tuple:
+        """列を numpy 配列に変換する (次に追加されるまで再利用する)"""
+        if self._arrays is None:
+            columns = [np.array(column, dtype=np.int64) for column in self._columns]
+            self._arrays = (columns, np.array(self._hours, dtype=np.float64))
+        return self._arrays
+
+    def _decode(self, index: int, code: int) -> object:
+        """コードを集計軸の値に戻す"""
+        return code if self._codes[index] is None else self._values[index][code]
+
+    def rollup(self, by: Iterable[str], where: dict[str, Collection] | None = None, counts: bool = False) -> dict:
+        """
+        指定した集計軸で集計する
+
+        Args:
+            by: 集計軸のリスト。1つの場合はキーを値そのものとし、複数の場合はタプルとする
+            where: {集計軸: 対象とする値の集合} の絞り込み条件
+            counts: True の場合は時間ではなくエントリ件数を集計する
+
+        Returns:
+            {キー: 時間 (または件数)} の辞書 (キーは初出順)
+        """
+        positions = [self.dimensions.index(d) for d in by]
+        if not self._hours:
+            return {}
+        columns, hours = self._as_arrays()
+
+        # 絞り込み条件は値をコードに変換し、該当する行のマスクにする
+        mask = None
+        for dimension, allowed in (where or {}).items():
+            index = self.dimensions.index(dimension)
+            codes = self._codes[index]
+            wanted = [value if codes is None else codes[value] for value in allowed if codes is None or value in codes]
+            selected = np.isin(columns[index], np.array(wanted, dtype=np.int64))
+            mask = selected if mask is None else mask & selected
+        if mask is not None:
+            if not mask.any():
+                return {}
+            columns = [column[mask] for column in columns]
+            hours = hours[mask]
+
+        # 集計軸ごとのコードを 0 始まりにずらす
+        offsets = [int(columns[pos].min()) for pos in positions]
+        sizes = [int(columns[pos].max()) - low + 1 for pos, low in zip(positions, offsets, strict=True)]
+        length = math.prod(sizes)
+
+        if length >= _KEY_LIMIT:
+            # 組み合わせが int64 に収まらない場合は、1つの整数にまとめずに列の組で unique する
+            stacked = np.stack([columns[pos] - low for pos, low in zip(positions, offsets, strict=True)])
+            rows, first_rows, inverse = np.unique(stacked, axis=1, return_index=True, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            totals = np.bincount(inverse) if counts else np.bincount(inverse, weights=hours)
+            # GroupBy と同じく、組み合わせの初出順に並べる
+            order = np.argsort(first_rows, kind='stable')
+            digits = rows[:, order]
+        else:
+            # 組み合わせを1つの整数にまとめる
+            combined = np.zeros(len(hours), dtype=np.int64)
+            for pos, low, size in zip(positions, offsets, sizes, strict=True):
+                combined = combined * size + (columns[pos] - low)
+
+            if length <= max(4 * len(hours), _DENSE_LIMIT):
+                # 組み合わせの範囲が狭い場合は、ソートせずに範囲全体で bincount する
+                weights = np.bincount(combined, minlength=length)
+                totals = weights if counts else np.bincount(combined, weights=hours, minlength=length)
+                groups = np.flatnonzero(weights)
+                # 組み合わせごとに最初に現れた行番号を求める
+                first = np.full(length, len(combined), dtype=np.int64)
+                np.minimum.at(first, combined, np.arange(len(combined)))
+                first_rows = first[groups]
+                totals = totals[groups]
+            else:
+                groups, first_rows, inverse = np.unique(combined, return_index=True, return_inverse=True)
+                totals = np.bincount(inverse) if counts else np.bincount(inverse, weights=hours)
+
+            # GroupBy と同じく、組み合わせの初出順に並べる
+            order = np.argsort(first_rows, kind='stable')
+            digits = np.unravel_index(groups[order], sizes)
+        keys = [[self._decode(pos, code + low) for code in digit.tolist()] for pos, low, digit in zip(positions, offsets, digits, strict=True)]
+        group_keys = keys[0] if len(keys) == 1 else zip(*keys, strict=True)
+        return dict(zip(group_keys, totals[order].tolist(), strict=True))
+
+    def rollups(self, specs: Iterable[Iterable[str]], where: dict[str, Collection] | None = None) -> list[dict]:
+        """
+        複数の集計軸の組み合わせでまとめて集計する
+
+        Args:
+            specs: 集計軸のリストのリスト
+            where: {集計軸: 対象とする値の集合} の絞り込み条件
+
+        Returns:
+            specs の順に rollup の結果を並べたリスト
+        """
+        return [self.rollup(by, where) for by in specs]
+
+
+def new_group_by(dimensions: Iterable[str], columnar_input: bool = False) -> GroupBy | ColumnarGroupBy:
+    """
+    設定 (AGGREGATION_BACKEND) に従ってグループ集計を生成する
+
+    エントリの辞書から列を作る処理は Python のループになり GroupBy と同程度の時間がかかるため、
+    'auto' ではローカルストアなど列形式のデータを集計する場合のみ ColumnarGroupBy を使う。
+
+    Args:
+        dimensions: 集計軸のリスト (DIMENSIONS のキー)
+        columnar_input: 列形式のデータ (add_columns) を集計する場合は True
+
+    Returns:
+        numpy を使う場合は ColumnarGroupBy、それ以外は GroupBy
+    """
+    backend = us.AGGREGATION_BACKEND
+    if backend == 'numpy' or (backend == 'auto' and columnar_input and load_numpy() is not None):
+        return ColumnarGroupBy(dimensions)
+    return GroupBy(dimensions)
@@ -0,0 +1,102 @@
+"""
+ローカルファイルの読み書きを行うモジュール
+書き込みは一時ファイル経由の置き換えで行い、中断されても壊れたファイルを残さない
+"""
+
+import io
+import json
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import TextIO
+
+
+@contextmanager
+def open_text_atomic(path: str, compress: bool = False) -> Iterator[TextIO]:
+    """
+    テキストファイルを書き込み用に開き、with ブロックが正常に終了した場合のみ置き換える
+
+    同じディレクトリの一時ファイルに書き出してから os.replace で置き換えるため、
+    大きなファイルを逐次書き込む場合も、読み込み側から書きかけの内容が見えることはない。
+    例外で終了した場合は一時ファイルを削除し、既存のファイルは変更しない。
+
+    Args:
+        path: 書き込み先のパス
+        compress: True の場合は gzip 形式で書き込む
+
+    Yields:
+        書き込み用のテキストストリーム (UTF-8)
+    """
+    # 読み込みのみの場合 (チェック済みで終了する場合など) の起動を軽くするため、書き込み時に読み込む
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'wb') as raw:
+            stream: io.BufferedIOBase
+            if compress:
+                import gzip
+
+                stream = gzip.GzipFile(fileobj=raw, mode='wb')
+            else:
+                stream = raw
+            f = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+            yield f
+            f.flush()
+            f.detach()
+            if stream is not raw:
+                # gzip の末尾 (CRC・サイズ) を書き出す (raw は閉じない)
+                stream.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_text_atomic(path: str, text: str) -> None:
+    """
+    テキストファイルをアトミックに書き込む
+
+    同じディレクトリに一時ファイルを書き出してから os.replace で置き換えるため、
+    読み込み側から書きかけの内容が見えることはない。
+
+    Args:
+        path: 書き込み先のパス
+        text: 書き込む内容
+    """
+    with open_text_atomic(path) as f:
+        f.write(text)
+
+
+def write_json_atomic(path: str, data: dict) -> None:
+    """
+    JSONファイルをアトミックに書き込む
+
+    Args:
+        path: 書き込み先のパス
+        data: 書き込む内容
+    """
+    write_text_atomic(path, json.dumps(data, ensure_ascii=False))
+
+
+def read_json(path: str) -> dict | None:
+    """
+    JSONファイルを読み込む
+
+    Args:
+        path: 読み込み先のパス
+
+    Returns:
+        読み込んだ内容、またはファイルが存在しない・壊れている場合はNone
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
@@ -3,115 +3,734 @@ Redmineから作業時間データを取得し、集計するモジュール
 """
 
 import datetime
+import itertools
+import math
 import re
+import threading
+import time
+from collections import deque
+from collections.abc import Generator, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+import aggregation
+import checkpoint
+import entry_store
+import member_cache
+import metrics
+import redmine_client
+import time_entry
+import user_setting as us
+from time_entry import TimeEntry
 
-import requests  # type: ignore
-import urllib3
+# グループID -> {ユーザーID: ユーザー名} のキャッシュ (同一プロセス内で共有)
+_group_users_cache: dict[int, dict] = {}
+_group_users_lock = threading.Lock()
 
-import user_setting as us
+# 常駐モードで開いたままにするローカルストアと、今回の実行で同期した開始日 (参照は _held_store_lock で排他する)
+_held_store: entry_store.EntryStore | None = None
+_held_synced_from: str | None = None
+_held_store_lock = threading.Lock()
 
-# 自己署名証明書の警告(InsecureRequestWarning)を非表示にする設定
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# チケット作成に使う集計軸 (ユーザー別・プロジェクト別)
+_SUMMARY_DIMENSIONS = ('user', 'project')
 
 
-def _get_project_members() -> dict | None:
+def _fetch_page(path: str, params: dict, key: str) -> tuple[list, int, str | None]:
     """
-    Redmineから対象プロジェクトのメンバー一覧を取得する
+    一覧APIの1ページ分を取得する
+
+    Args:
+        path: 取得先のパス
+        params: クエリパラメータ (offset/limit を含む)
+        key: レスポンス中の一覧を格納しているキー (例: 'time_entries')
 
     Returns:
-        {ユーザーID: ユーザー名} の辞書、または取得失敗時はNone
+        (ページ内の要素リスト, 全件数, ETag (ヘッダーがない場合は None))
+    """
+    resp = redmine_client.get_client().get(path, params=params)
+    resp.raise_for_status()
+    data = resp.json()
+    items = data.get(key)
+    # 型チェックして list でなければ不正なレスポンスとして扱う
+    if not isinstance(items, list):
+        raise ValueError('不正なレスポンス')
+    # total_count を返さないAPIの場合は1ページで完結しているものとみなす
+    total_count = data.get('total_count', len(items))
+    return items, total_count, resp.headers.get('ETag')
+
+
+def _iter_items(path: str, params: dict, key: str, etags: list | None = None) -> Iterator[dict]:
     """
-    headers = {'X-Redmine-API-Key': us.REDMINE_API_KEY}
-    request_opts = {'headers': headers, 'verify': False}
+    一覧APIの全ページの要素を offset 順に1件ずつ返す
 
-    try:
-        resp = requests.get(
-            f'{us.REDMINE_URL}/projects/{us.TARGET_PROJECT_ID}/memberships.json',
-            params={'limit': 100},
-            **request_opts,
+    各ページはストリーミングで受信し、受信した部分から逐次デコードして返す。
+    1ページ目の total_count から残りの offset を決定し、2ページ目以降は
+    最大 MAX_WORKERS ページ先までリクエストを並列に送っておく。
+    呼び出し側は先頭のページを処理している間に後続のページを受信でき、
+    一度に保持する要素は受信中のページ分に限られる。
+
+    Args:
+        path: 取得先のパス
+        params: offset/limit 以外のクエリパラメータ
+        key: レスポンス中の一覧を格納しているキー
+        etags: 指定した場合、ページごとのETagを offset 順に追加する
+
+    Yields:
+        一覧の要素
+    """
+    limit = us.PAGE_LIMIT
+    client = redmine_client.get_client()
+
+    def open_page(offset: int) -> 'redmine_client.Response':
+        resp = client.get(path, params={**params, 'offset': offset, 'limit': limit}, stream=True)
+        try:
+            resp.raise_for_status()
+        except Exception:
+            resp.close()
+            raise
+        return resp
+
+    def read_page(resp: 'redmine_client.Response') -> Generator[dict, None, int]:
+        meta: dict = {}
+        count = 0
+        try:
+            for item in redmine_client.iter_json_items(resp, key, meta):
+                count += 1
+                yield item
+        finally:
+            resp.close()
+        if etags is not None:
+            etags.append(resp.headers.get('ETag'))
+        # total_count を返さないAPIの場合は1ページで完結しているものとみなす
+        return int(meta.get('total_count', count))
+
+    total_count = yield from read_page(open_page(0))
+
+    offsets = range(limit, total_count, limit)
+    if not offsets:
+        return
+
+    window = min(us.MAX_WORKERS, len(offsets))
+    with ThreadPoolExecutor(max_workers=window) as executor:
+        pending = deque(executor.submit(open_page, offset) for offset in offsets[:window])
+        rest = iter(offsets[window:])
+        try:
+            while pending:
+                resp = pending.popleft().result()
+                # 1ページ処理するごとに次のページのリクエストを送り、先読みの数を一定に保つ
+                offset = next(rest, None)
+                if offset is not None:
+                    pending.append(executor.submit(open_page, offset))
+                yield from read_page(resp)
+        finally:
+            # 途中で終了した場合は、先読み済みのレスポンスを破棄する
+            for future in pending:
+                if not future.cancel() and future.exception() is None:
+                    future.result().close()
+
+
+def _unique_by_id(entries: Iterable[TimeEntry]) -> Iterator[TimeEntry]:
+    """
+    作業時間エントリを順序を保ったまま返し、id の重複を除去する
+
+    取得中にデータが追加・削除されると offset がずれ、
+    同じエントリが隣接ページに重複して現れることがあるため。
+
+    Args:
+        entries: 作業時間エントリを offset 順に返すイテラブル
+
+    Yields:
+        重複を除いた作業時間エントリ
+    """
+    seen_ids: set = set()
+    for entry in entries:
+        if entry.id in seen_ids:
+            continue
+        seen_ids.add(entry.id)
+        yield entry
+
+
+def _get_group_users(group_id: int) -> dict:
+    """
+    グループに所属するユーザーを取得する (取得結果はプロセス内でキャッシュする)
+
+    Args:
+        group_id: グループID
+
+    Returns:
+        {ユーザーID: ユーザー名} の辞書
+    """
+    with _group_users_lock:
+        cached = _group_users_cache.get(group_id)
+    if cached is not None:
+        return cached
+
+    resp = redmine_client.get_client().get(f'/groups/{group_id}.json', params={'include': 'users'})
+    resp.raise_for_status()
+    users = {u['id']: u['name'] for u in resp.json()['group'].get('users', [])}
+
+    with _group_users_lock:
+        _group_users_cache[group_id] = users
+    return users
+
+
+def clear_group_users_cache() -> None:
+    """グループに所属するユーザーのキャッシュを破棄する (常駐モードで日ごとに最新化するため)"""
+    with _group_users_lock:
+        _group_users_cache.clear()
+
+
+def _fetch_project_members(path: str, etags: list) -> dict:
+    """
+    Redmineから対象プロジェクトのメンバー一覧を全ページ分取得する
+
+    グループとして参加しているメンバーは、所属ユーザーに展開して含める。
+
+    Args:
+        path: memberships.json のパス
+        etags: ページごとのETagを追加するリスト
+
+    Returns:
+        {ユーザーID: ユーザー名} の辞書
+    """
+    target_users: dict = {}
+    group_ids: list = []
+
+    # 受信した要素から順に、そのままメンバー辞書へ反映する
+    for m in _iter_items(path, {}, 'memberships', etags):
+        if 'user' in m:
+            target_users[m['user']['id']] = m['user']['name']
+        elif 'group' in m and m['group']['id'] not in group_ids:
+            group_ids.append(m['group']['id'])
+
+    # グループの展開 (未キャッシュのグループのみ並列に取得される)
+    if group_ids:
+        with ThreadPoolExecutor(max_workers=min(us.MAX_WORKERS, len(group_ids))) as executor:
+            for users in executor.map(_get_group_users, group_ids):
+                for uid, name in users.items():
+                    target_users.setdefault(uid, name)
+
+    return target_users
+
+
+def _revalidate_project_members(path: str, etags: list) -> bool:
+    """
+    キャッシュ済みのメンバー一覧が変更されていないかを条件付きリクエストで確認する
+
+    各ページを If-None-Match 付きで並列に再取得し、すべて 304 であれば変更なしとみなす。
+    グループの所属ユーザーの変更は検出しないため、キャッシュの有効期限で更新される。
+
+    Args:
+        path: memberships.json のパス
+        etags: キャッシュ取得時のページごとのETag
+
+    Returns:
+        全ページが変更されていなければ True
+    """
+    limit = us.PAGE_LIMIT
+
+    def not_modified(page: int) -> bool:
+        resp = redmine_client.get_client().get(
+            path,
+            params={'offset': page * limit, 'limit': limit},
+            headers={'If-None-Match': etags[page]},
         )
-        resp.raise_for_status()
+        return resp.status_code == 304
+
+    with ThreadPoolExecutor(max_workers=min(us.MAX_WORKERS, len(etags))) as executor:
+        return all(executor.map(not_modified, range(len(etags))))
+
+
+@metrics.timed('members')
+def _get_project_members(refresh: bool = False, project_id: str | None = None) -> dict | None:
+    """
+    対象プロジェクトのメンバー一覧を取得する
 
-        target_users: dict = {}
-        for m in resp.json()['memberships']:
-            if 'user' in m:
-                target_users[m['user']['id']] = m['user']['name']
+    有効期限内のローカルキャッシュがあれば通信せずに返す。
+    期限切れの場合は条件付きリクエストで再検証し、変更があった場合のみ再取得する。
 
+    Args:
+        refresh: True の場合、キャッシュを使わずに再取得する
+        project_id: プロジェクトID (省略時は TARGET_PROJECT_ID)
+
+    Returns:
+        {ユーザーID: ユーザー名} の辞書、または取得失敗時はNone
+    """
+    project_id = project_id or us.TARGET_PROJECT_ID
+    path = f'/projects/{project_id}/memberships.json'
+
+    try:
+        cache = None if refresh else member_cache.load(us.REDMINE_URL, project_id)
+        if cache is not None:
+            members: dict = cache['members']
+            if member_cache.is_fresh(cache):
+                return members
+            if member_cache.can_revalidate(cache) and _revalidate_project_members(path, cache['etags']):
+                # 変更なし: 取得時刻のみ更新する
+                member_cache.save(us.REDMINE_URL, project_id, members, cache['etags'])
+                return members
+
+        etags: list = []
+        target_users = _fetch_project_members(path, etags)
+        member_cache.save(us.REDMINE_URL, project_id, target_users, etags)
         return target_users
     except Exception as e:
         print(f'プロジェクトメンバー取得エラー: {e}')
         return None
 
 
-def _get_time_entries(str_date: str) -> list | None:
+def _base_entry_queries(spent_on: str, project_ids: list[str]) -> list[tuple[str, dict]]:
+    """
+    集計範囲 (ENTRY_QUERY_SCOPE) に応じた、絞り込みなしの作業時間エントリ取得クエリを返す
+
+    Args:
+        spent_on: spent_on の検索条件
+        project_ids: 対象プロジェクトIDのリスト
+
+    Returns:
+        (パス, クエリパラメータ) のリスト
+    """
+    if us.ENTRY_QUERY_SCOPE == 'project':
+        # プロジェクト配下のURLはサブプロジェクトのエントリも含む
+        return [(f'/projects/{pid}/time_entries.json', {'spent_on': spent_on}) for pid in project_ids]
+    return [('/time_entries.json', {'spent_on': spent_on})]
+
+
+def _probe_total_count(query: tuple[str, dict]) -> int:
+    """limit=1 の問い合わせでクエリに該当する件数を求める"""
+    path, params = query
+    _, total_count, _ = _fetch_page(path, {**params, 'limit': 1}, 'time_entries')
+    return int(total_count)
+
+
+def _plan_entry_queries(spent_on: str, member_ids: Iterable[int], project_ids: list[str]) -> list[tuple[str, dict]]:
+    """
+    作業時間エントリの取得方法を、件数の見積もりに基づいて選択する
+
+    取得方法は全体 (global)・プロジェクト配下 (project、サブプロジェクトを含む)・
+    メンバーのユーザーIDでの絞り込み (user、分割指定) の3つとし、集計範囲 (ENTRY_QUERY_SCOPE) の
+    エントリを返す方法の中から、取得件数とリクエスト数で見積もったコストが最も小さい方法を選ぶ。
+    範囲が 'all' の場合は global と user、'project' の場合は project と user (プロジェクト配下での絞り込み) が候補となる。
+
+    件数は limit=1 の問い合わせの total_count で求める。絞り込みなしのクエリはそれぞれ1回、
+    ユーザー絞り込みは最も件数の多いクエリに最初の分割分を指定して1回だけ問い合わせ、
+    メンバー全体の件数の割合に換算して見積もる。
+    絞り込みなしでも各クエリが1ページに収まる場合は、ユーザー絞り込みでリクエスト数は減らないため見積もらない。
+    選択結果は計測中であれば実行レポートに記録する。
+
+    Args:
+        spent_on: spent_on の検索条件
+        member_ids: 集計対象のユーザーID
+        project_ids: 対象プロジェクトIDのリスト
+
+    Returns:
+        選択した方法の (パス, クエリパラメータ) のリスト (該当0件のクエリは除く)
+    """
+    ids = sorted(member_ids)
+    if not ids:
+        # 集計対象のメンバーがいなければ取得するエントリはない
+        return []
+
+    base_name = 'project' if us.ENTRY_QUERY_SCOPE == 'project' else 'global'
+    base_queries = _base_entry_queries(spent_on, project_ids)
+    with ThreadPoolExecutor(max_workers=min(us.MAX_WORKERS, len(base_queries))) as executor:
+        base_counts = list(executor.map(_probe_total_count, base_queries))
+    probes = len(base_queries)
+
+    base_rows = sum(base_counts)
+    base_requests = sum(math.ceil(c / us.PAGE_LIMIT) for c in base_counts)
+    estimates = {base_name: {'rows': base_rows, 'requests': base_requests}}
+    chosen = base_name
+    targets = [(query, count) for query, count in zip(base_queries, base_counts, strict=True) if count]
+
+    if any(count > us.PAGE_LIMIT for count in base_counts):
+        batch = us.USER_FILTER_BATCH_SIZE
+        user_ids = ['|'.join(str(uid) for uid in ids[i : i + batch]) for i in range(0, len(ids), batch)]
+
+        # 最初の分割分の件数から、メンバー全体のエントリが占める割合を見積もる
+        (path, params), count = max(targets, key=lambda target: target[1])
+        sampled = _probe_total_count((path, {**params, 'user_id': user_ids[0]}))
+        probes += 1
+        ratio = min(1.0, sampled * len(ids) / min(batch, len(ids)) / count)
+
+        user_rows = round(base_rows * ratio)
+        user_requests = sum(max(len(user_ids), math.ceil(c * ratio / us.PAGE_LIMIT)) for _, c in targets)
+        estimates['user'] = {'rows': user_rows, 'requests': user_requests}
+        if user_rows + user_requests * us.PLANNER_REQUEST_COST < base_rows + base_requests * us.PLANNER_REQUEST_COST:
+            chosen = 'user'
+
+    metrics.record_plan('time_entries', chosen, estimates, probes)
+
+    if chosen == 'user':
+        return [(path, {**params, 'user_id': uid}) for (path, params), _ in targets for uid in user_ids]
+    return [query for query, _ in targets]
+
+
+def _iter_time_entries(
+    str_date: str,
+    str_end_date: str | None = None,
+    member_ids: Iterable[int] | None = None,
+    project_ids: list[str] | None = None,
+) -> Iterator[TimeEntry]:
+    """
+    Redmineから指定日付(または期間)の作業時間エントリを全ページ分、受信しながら1件ずつ返す
+
+    Args:
+        str_date: 対象日付 (YYYY-MM-DD形式)。期間指定時は開始日
+        str_end_date: 期間指定時の終了日 (YYYY-MM-DD形式、この日を含む)
+        member_ids: 集計対象のユーザーID。指定した場合は取得計画に従い絞り込み方法を選ぶ
+        project_ids: 対象プロジェクトIDのリスト (省略時は TARGET_PROJECT_ID のみ)
+
+    Yields:
+        作業時間エントリ (重複除去済み)
+    """
+    if us.USE_ENTRY_STORE:
+        yield from _get_time_entries_from_store(str_date, str_end_date or str_date)
+        return
+
+    # 期間指定時は「><開始日|終了日」の範囲検索で1クエリにまとめる
+    spent_on = str_date if str_end_date is None else f'><{str_date}|{str_end_date}'
+    project_ids = project_ids or [us.TARGET_PROJECT_ID]
+
+    queries = _plan_entry_queries(spent_on, member_ids, project_ids) if member_ids is not None else _base_entry_queries(spent_on, project_ids)
+
+    # 複数クエリの結果は順に連結してレコードに変換し、クエリをまたいだ重複も除去する
+    items = itertools.chain.from_iterable(_iter_items(path, params, 'time_entries') for path, params in queries)
+    yield from _unique_by_id(time_entry.decode(items))
+
+
+def _get_time_entries(
+    str_date: str,
+    str_end_date: str | None = None,
+    member_ids: Iterable[int] | None = None,
+    project_ids: list[str] | None = None,
+) -> list[TimeEntry] | None:
     """
-    Redmineから指定日付の作業時間エントリを取得する
+    Redmineから指定日付(または期間)の作業時間エントリを全ページ分取得する
 
     Args:
-        str_date: 対象日付 (YYYY-MM-DD形式)
+        str_date: 対象日付 (YYYY-MM-DD形式)。期間指定時は開始日
+        str_end_date: 期間指定時の終了日 (YYYY-MM-DD形式、この日を含む)
+        member_ids: 集計対象のユーザーID。指定した場合は取得計画に従い絞り込み方法を選ぶ
+        project_ids: 対象プロジェクトIDのリスト (省略時は TARGET_PROJECT_ID のみ)
 
     Returns:
         作業時間エントリのリスト、または取得失敗時はNone
     """
-    headers = {'X-Redmine-API-Key': us.REDMINE_API_KEY}
-    request_opts = {'headers': headers, 'verify': False}
+    try:
+        return list(_iter_time_entries(str_date, str_end_date, member_ids, project_ids))
+    except Exception as e:
+        print(f'作業時間エントリ取得エラー: {e}')
+        return None
+
+
+@metrics.timed('time_entries')
+def _collect_time_totals(
+    member_futures: dict[str, Future],
+    str_date: str,
+    str_end_date: str | None = None,
+) -> aggregation.GroupBy | aggregation.ColumnarGroupBy | None:
+    """
+    作業時間エントリを受信しながら集計する
+
+    取得計画 (ENTRY_QUERY_PLANNER) を使う場合はメンバー取得の完了を待ってユーザーIDを渡し、
+    使わない場合はメンバー取得を待たずに取得と集計を始める。
+
+    Args:
+        member_futures: {プロジェクトID: メンバー取得の Future} の辞書
+        str_date: 対象日付 (YYYY-MM-DD形式)。期間指定時は開始日
+        str_end_date: 期間指定時の終了日 (YYYY-MM-DD形式、この日を含む)
+
+    Returns:
+        グループ集計 (期間指定時は日付を集計軸に含む)、または取得失敗時はNone
+    """
+    project_ids = list(member_futures)
+    member_ids: set | None = None
+    if us.ENTRY_QUERY_PLANNER and not us.USE_ENTRY_STORE:
+        member_ids = set()
+        for future in member_futures.values():
+            members = future.result()
+            if members is not None:
+                member_ids.update(members)
 
     try:
-        resp = requests.get(
-            f'{us.REDMINE_URL}/time_entries.json',
-            params={'spent_on': str_date, 'limit': 100},
-            **request_opts,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        entries = data.get('time_entries')
-        # 型チェックして list でなければ None を返す
-        if not isinstance(entries, list):
-            print('作業時間エントリ取得エラー: 不正なレスポンス')
-            return None
-        return entries
+        # 単日取得では全エントリが対象日のものなので、日付を集計軸に含めない
+        dimensions = _SUMMARY_DIMENSIONS if str_end_date is None else ('day', *_SUMMARY_DIMENSIONS)
+        groups = aggregation.new_group_by(dimensions, columnar_input=us.USE_ENTRY_STORE)
+        if us.USE_ENTRY_STORE and isinstance(groups, aggregation.ColumnarGroupBy):
+            # ローカルストアの列をそのまま渡し、エントリごとの辞書を作らずに集計する
+            return groups.add_columns(*_get_time_columns_from_store(str_date, str_end_date or str_date, dimensions))
+        return groups.add(_iter_time_entries(str_date, str_end_date, member_ids, project_ids))
     except Exception as e:
         print(f'作業時間エントリ取得エラー: {e}')
         return None
 
 
-def _aggregate_entries(entries: list, target_users: dict) -> tuple[dict, dict]:
+@metrics.timed('entry_store_sync')
+def _sync_entry_store(store: entry_store.EntryStore, str_from: str) -> None:
+    """
+    ローカルストアをRedmineと差分同期する
+
+    未取得の期間は作業日で範囲取得し、取得済みの期間は前回同期時の更新日時の最大値
+    (high-water mark) 以降に更新されたエントリのみを取得する。
+
+    Args:
+        store: 作業時間エントリのローカルストア
+        str_from: 参照する期間の開始日 (YYYY-MM-DD形式)
+    """
+    today = datetime.date.today()
+    synced_from = store.get_state('synced_from')
+
+    if synced_from is None or str_from < synced_from:
+        # 未取得の期間を取得する (初回は設定日数分さかのぼる)
+        start = min(str_from, (today - datetime.timedelta(days=us.ENTRY_STORE_HISTORY_DAYS)).strftime('%Y-%m-%d'))
+        if synced_from is None:
+            spent_on = f'>={start}'
+        else:
+            day_before = datetime.datetime.strptime(synced_from, '%Y-%m-%d').date() - datetime.timedelta(days=1)
+            spent_on = f'><{start}|{day_before:%Y-%m-%d}'
+        items = _iter_items('/time_entries.json', {'spent_on': spent_on}, 'time_entries')
+        for batch in itertools.batched(time_entry.decode(items), us.PAGE_LIMIT):
+            store.upsert(batch)
+        store.set_state('synced_from', start)
+
+    high_water = store.get_state('high_water')
+    if synced_from is not None and high_water is not None:
+        # 前回同期以降に追加・更新されたエントリのみを取得する
+        items = _iter_items('/time_entries.json', {'updated_on': f'>={high_water}'}, 'time_entries')
+        for batch in itertools.batched(time_entry.decode(items), us.PAGE_LIMIT):
+            store.upsert(batch)
+
+    new_high_water = store.max_updated_on()
+    if new_high_water is not None:
+        store.set_state('high_water', new_high_water)
+
+    # 削除は更新日時では検出できないため、定期的に件数を照合する
+    reconciled_at = store.get_state('reconciled_at')
+    if reconciled_at is None or time.time() - float(reconciled_at) >= us.ENTRY_STORE_RECONCILE_INTERVAL:
+        start_date = datetime.datetime.strptime(store.get_state('synced_from') or str_from, '%Y-%m-%d').date()
+        _reconcile_entry_store(store, start_date, today)
+        store.set_state('reconciled_at', str(time.time()))
+
+
+def _reconcile_entry_store(store: entry_store.EntryStore, start: datetime.date, end: datetime.date) -> None:
+    """
+    ローカルストアとRedmineのエントリ件数を照合し、削除されたエントリを取り除く
+
+    期間の件数を limit=1 の問い合わせ (total_count) で比較し、一致しない期間のみを二分して絞り込む。
+    差異のある日だけを全件取得して置き換えるため、削除がなければ問い合わせは1回で済む。
+
+    Args:
+        store: 作業時間エントリのローカルストア
+        start: 照合期間の開始日
+        end: 照合期間の終了日 (この日を含む)
+    """
+    str_start = start.strftime('%Y-%m-%d')
+    str_end = end.strftime('%Y-%m-%d')
+    _, remote_count, _ = _fetch_page('/time_entries.json', {'spent_on': f'><{str_start}|{str_end}', 'limit': 1}, 'time_entries')
+    if remote_count == store.count_between(str_start, str_end):
+        return
+
+    if start == end:
+        entries = _unique_by_id(time_entry.decode(_iter_items('/time_entries.json', {'spent_on': str_start}, 'time_entries')))
+        store.replace_day(str_start, list(entries))
+        return
+
+    mid = start + (end - start) // 2
+    _reconcile_entry_store(store, start, mid)
+    _reconcile_entry_store(store, mid + datetime.timedelta(days=1), end)
+
+
+@contextmanager
+def open_synced_store(str_from: str) -> Iterator[entry_store.EntryStore]:
+    """
+    ローカルストアを開き、Redmineと差分同期したうえで返す
+
+    hold_entry_store の間は、開いたままのストアを返す。
+
+    Args:
+        str_from: 参照する期間の開始日 (YYYY-MM-DD形式)
+
+    Yields:
+        同期済みのローカルストア
+    """
+    global _held_synced_from
+    with _held_store_lock:
+        held = _held_store
+        if held is not None:
+            # 常駐中は開いたままのストアを使い、同期は実行ごとに1回 (より前の開始日を参照する場合は再同期) とする
+            if _held_synced_from is None or str_from < _held_synced_from:
+                _sync_entry_store(held, str_from)
+                _held_synced_from = str_from
+            yield held
+            return
+
+    with entry_store.EntryStore(entry_store.store_path(us.REDMINE_URL)) as store:
+        _sync_entry_store(store, str_from)
+        yield store
+
+
+@contextmanager
+def hold_entry_store() -> Iterator[None]:
+    """
+    この間、ローカルストアを開いたままにして参照のたびに使い回す (常駐モード用)
+
+    USE_ENTRY_STORE が False の場合は何もしない。
+    """
+    global _held_store, _held_synced_from
+    if not us.USE_ENTRY_STORE:
+        yield
+        return
+
+    with entry_store.EntryStore(entry_store.store_path(us.REDMINE_URL), shared=True) as store:
+        with _held_store_lock:
+            _held_store, _held_synced_from = store, None
+        try:
+            yield
+        finally:
+            with _held_store_lock:
+                _held_store, _held_synced_from = None, None
+
+
+def reset_entry_store_sync() -> None:
+    """開いたままのローカルストアを、次の参照時に再び差分同期させる (常駐モードで実行ごとに呼ぶ)"""
+    global _held_synced_from
+    with _held_store_lock:
+        _held_synced_from = None
+
+
+def _get_time_entries_from_store(str_from: str, str_to: str) -> list[TimeEntry]:
+    """
+    ローカルストアを同期したうえで、期間内の作業時間エントリをローカルのデータから返す
+
+    Args:
+        str_from: 開始日 (YYYY-MM-DD形式)
+        str_to: 終了日 (YYYY-MM-DD形式、この日を含む)
+
+    Returns:
+        作業時間エントリのリスト
+    """
+    with open_synced_store(str_from) as store:
+        return store.entries_between(str_from, str_to)
+
+
+def _get_time_columns_from_store(str_from: str, str_to: str, dimensions: tuple[str, ...]) -> tuple[dict[str, list], list[float]]:
+    """
+    ローカルストアを同期したうえで、期間内の作業時間エントリを列形式で返す
+
+    Args:
+        str_from: 開始日 (YYYY-MM-DD形式)
+        str_to: 終了日 (YYYY-MM-DD形式、この日を含む)
+        dimensions: 集計軸のリスト
+
+    Returns:
+        ({集計軸: 値の列}, 時間の列)
+    """
+    with open_synced_store(str_from) as store:
+        return store.columns_between(str_from, str_to, dimensions)
+
+
+def iter_period_entries(str_from: str, str_to: str, source: str = 'redmine', store: entry_store.EntryStore | None = None) -> Iterator[TimeEntry]:
+    """
+    期間内の作業時間エントリを1件ずつ返す (エクスポート用)
+
+    エントリ全体は保持しない。Redmine から取得する場合は ENTRY_QUERY_SCOPE の範囲を受信しながら返し、
+    重複除去のため期間内のエントリIDのみを保持する。
+
+    Args:
+        str_from: 開始日 (YYYY-MM-DD形式)
+        str_to: 終了日 (YYYY-MM-DD形式、この日を含む)
+        source: 'redmine' の場合は Redmine から取得し、'store' の場合はローカルストアを同期したうえでストアから読み出す
+        store: 同期済みのローカルストア (指定した場合は同期せずにこのストアから読み出す。
+            期間を区切って読み出す場合に、open_synced_store で一度だけ同期したストアを渡す)
+
+    Yields:
+        作業時間エントリ (ストアから読み出す場合は作業日・ID順)
+    """
+    if store is not None:
+        yield from store.iter_between(str_from, str_to)
+        return
+    if source == 'store':
+        with open_synced_store(str_from) as synced:
+            yield from synced.iter_between(str_from, str_to)
+        return
+
+    queries = _base_entry_queries(f'><{str_from}|{str_to}', [us.TARGET_PROJECT_ID])
+    items = itertools.chain.from_iterable(_iter_items(path, params, 'time_entries') for path, params in queries)
+    yield from _unique_by_id(time_entry.decode(items))
+
+
+@metrics.timed('summarize')
+def _summarize_day(groups: aggregation.GroupBy | aggregation.ColumnarGroupBy, target_users: dict, str_date: str | None = None) -> tuple[dict, dict]:
+    """
+    グループ集計の結果からユーザー単位およびプロジェクト単位の集計を取り出す
+
+    Args:
+        groups: user, project (および day) を集計軸とするグループ集計
+        target_users: 対象ユーザーの辞書 {ID: 名前}
+        str_date: 日付を集計軸に含む場合、対象とする日付 (YYYY-MM-DD形式)
+
+    Returns:
+        (ユーザー別集計, プロジェクト別集計)
+    """
+    # ターゲットプロジェクトのメンバーによる入力のみを集計対象とする
+    where: dict = {'user': target_users}
+    if str_date is not None and 'day' in groups.dimensions:
+        where['day'] = {str_date}
+
+    # 1. ユーザー単位の集計 / 2. プロジェクト単位の集計
+    entered_users, project_totals = groups.rollups([('user',), ('project',)], where)
+    return entered_users, project_totals
+
+
+def _aggregate_entries(entries: Iterable[TimeEntry], target_users: dict) -> tuple[dict, dict]:
     """
     取得した作業時間エントリをユーザー単位およびプロジェクト単位で集計する
 
     Args:
-        entries: 作業時間エントリのリスト
+        entries: 作業時間エントリのイテラブル
         target_users: 対象ユーザーの辞書 {ID: 名前}
 
     Returns:
         (ユーザー別集計, プロジェクト別集計)
     """
-    entered_users: dict = {}
-    project_totals: dict = {}
+    summary: tuple[dict, dict] = _summarize_day(aggregation.new_group_by(_SUMMARY_DIMENSIONS).add(entries), target_users)
+    return summary
 
-    for entry in entries:
-        uid = entry['user']['id']
 
-        # ターゲットプロジェクトのメンバーによる入力のみを集計対象とする
-        if uid in target_users:
-            hours = entry['hours']
+def prefetch_project_members(refresh: bool = False) -> Future:
+    """
+    プロジェクトメンバーの取得をバックグラウンドで開始する
 
-            # 1. ユーザー単位の集計
-            entered_users[uid] = entered_users.get(uid, 0) + hours
+    メンバー取得は対象日付に依存しないため、前回チェック日の検索と並行して実行できる。
 
-            # 2. プロジェクト単位の集計
-            prj_name = entry['project']['name']
-            project_totals[prj_name] = project_totals.get(prj_name, 0) + hours
+    Args:
+        refresh: True の場合、メンバーキャッシュを使わずに再取得する
 
-    return entered_users, project_totals
+    Returns:
+        _get_project_members の結果を返す Future
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch-members')
+    future = executor.submit(_get_project_members, refresh)
+    # 投入済みのタスクは完了まで実行され、スレッドはその後に解放される
+    executor.shutdown(wait=False)
+    return future
 
 
-def get_specific_date_time(specific_date: datetime.date) -> tuple[str | None, dict | None, dict | None, dict | None]:
+def get_specific_date_time(
+    specific_date: datetime.date,
+    members_future: Future | None = None,
+) -> tuple[str | None, dict | None, dict | None, dict | None]:
     """
     特定プロジェクトのメンバーと指定日の作業時間を取得する
 
+    メンバー取得と作業時間エントリ取得は互いに依存しないため並行して実行する。
+    作業時間エントリは受信しながら集計し、エントリ全体を保持しない。
+
     Args:
         specific_date: 対象日付
+        members_future: prefetch_project_members で開始済みのメンバー取得 (省略時はここで開始する)
 
     Returns:
         (日付文字列, 対象ユーザーdict, ユーザー別集計dict, プロジェクト別集計dict)
@@ -119,34 +738,174 @@ def get_specific_date_time(specific_date: datetime.date) -> tuple[str | None, di
     str_date = specific_date.strftime('%Y-%m-%d')
     print(f'--- {str_date} のデータを取得中 ---')
 
-    # プロジェクトメンバーを取得
-    target_users = _get_project_members()
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='fetch') as executor:
+        # プロジェクトメンバーを取得
+        if members_future is None:
+            members_future = executor.submit(_get_project_members)
+        # 作業時間エントリを取得しながら積算
+        totals_future = executor.submit(_collect_time_totals, {us.TARGET_PROJECT_ID: members_future}, str_date)
+
+        target_users = members_future.result()
+        totals = totals_future.result()
+
     if target_users is None:
         return None, None, None, None
 
-    # 作業時間エントリを取得
-    entries = _get_time_entries(str_date)
-    if entries is None:
+    if totals is None:
         return None, None, None, None
 
     # 集計
-    entered_users, project_totals = _aggregate_entries(entries, target_users)
+    entered_users, project_totals = _summarize_day(totals, target_users, str_date)
 
     return str_date, target_users, entered_users, project_totals
 
 
-def get_last_target_date() -> datetime.date:
+def get_date_range_time(
+    start_date: datetime.date,
+    end_date: datetime.date,
+    members_future: Future | None = None,
+) -> list[tuple[str, dict, dict, dict]] | None:
+    """
+    特定プロジェクトのメンバーと指定期間の作業時間を日ごとに取得する
+
+    期間全体の作業時間エントリを1回の範囲検索で取得し、受信しながら日ごとに積算する。
+    メンバーは期間中共通のスナップショットを使用する。
+
+    Args:
+        start_date: 開始日
+        end_date: 終了日 (この日を含む)
+        members_future: prefetch_project_members で開始済みのメンバー取得 (省略時はここで開始する)
+
+    Returns:
+        日付順の (日付文字列, 対象ユーザーdict, ユーザー別集計dict, プロジェクト別集計dict) のリスト、
+        または取得失敗時はNone
+    """
+    str_start = start_date.strftime('%Y-%m-%d')
+    str_end = end_date.strftime('%Y-%m-%d')
+    print(f'--- {str_start} から {str_end} のデータを取得中 ---')
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='fetch') as executor:
+        if members_future is None:
+            members_future = executor.submit(_get_project_members)
+        totals_future = executor.submit(_collect_time_totals, {us.TARGET_PROJECT_ID: members_future}, str_start, str_end)
+
+        target_users = members_future.result()
+        totals = totals_future.result()
+
+    if target_users is None or totals is None:
+        return None
+
+    results = []
+    day = start_date
+    while day <= end_date:
+        str_date = day.strftime('%Y-%m-%d')
+        entered_users, project_totals = _summarize_day(totals, target_users, str_date)
+        results.append((str_date, target_users, entered_users, project_totals))
+        day += datetime.timedelta(days=1)
+
+    return results
+
+
+def _next_target_date(last_date_str: str) -> datetime.date:
+    """
+    前回チェック日から次にチェックすべき日付を求める
+
+    Args:
+        last_date_str: 前回チェック日 (YYYY-MM-DD形式)
+
+    Returns:
+        前回チェック日の翌日 (今日になる場合は昨日)
+    """
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+
+    # 前回作成から次の日を対象とする
+    last_date = datetime.datetime.strptime(last_date_str, '%Y-%m-%d').date() + datetime.timedelta(days=1)
+    if last_date == datetime.date.today():
+        # 今日になってしまった場合は昨日の日付を返す
+        last_date = yesterday
+    return last_date
+
+
+def get_projects_date_time(
+    target_dates: dict[str, datetime.date],
+    refresh_members: bool = False,
+) -> dict[str, tuple[str, dict, dict, dict] | None] | None:
+    """
+    複数プロジェクトのメンバーと、プロジェクトごとの対象日の作業時間を取得する
+
+    各プロジェクトのメンバーは並行して取得し、作業時間エントリは全プロジェクトの対象期間を
+    まとめた1回の取得で受信しながら積算してから、日付とメンバーに従って各プロジェクトへ振り分ける。
+
+    Args:
+        target_dates: {プロジェクトID: 対象日付} の辞書
+        refresh_members: True の場合、メンバーキャッシュを使わずに再取得する
+
+    Returns:
+        {プロジェクトID: (日付文字列, 対象ユーザーdict, ユーザー別集計dict, プロジェクト別集計dict)} の辞書
+        (メンバー取得に失敗したプロジェクトは None)、またはエントリ取得失敗時はNone
+    """
+    start_date = min(target_dates.values())
+    end_date = max(target_dates.values())
+    str_start = start_date.strftime('%Y-%m-%d')
+    str_end = end_date.strftime('%Y-%m-%d')
+    print(f'--- {len(target_dates)} プロジェクトの {str_start} から {str_end} のデータを取得中 ---')
+
+    with ThreadPoolExecutor(max_workers=us.MAX_WORKERS, thread_name_prefix='fetch') as executor:
+        member_futures = {pid: executor.submit(_get_project_members, refresh_members, pid) for pid in target_dates}
+        totals_future = executor.submit(
+            _collect_time_totals,
+            member_futures,
+            str_start,
+            None if start_date == end_date else str_end,
+        )
+
+        project_members = {pid: future.result() for pid, future in member_futures.items()}
+        totals = totals_future.result()
+
+    if totals is None:
+        return None
+
+    results: dict[str, tuple[str, dict, dict, dict] | None] = {}
+    loaded_members = {}
+    for pid, members in project_members.items():
+        if members is None:
+            print(f'プロジェクト {pid} のメンバーが取得できないため、スキップします')
+            results[pid] = None
+        else:
+            loaded_members[pid] = members
+
+    # 対象日ごとの積算結果を、各プロジェクトのメンバーで絞り込んで集計する
+    for pid, members in loaded_members.items():
+        str_date = target_dates[pid].strftime('%Y-%m-%d')
+        entered_users, project_totals = _summarize_day(totals, members, str_date)
+        results[pid] = (str_date, members, entered_users, project_totals)
+
+    return results
+
+
+@metrics.timed('last_target_date')
+def get_last_target_date(project_id: str | None = None) -> datetime.date:
     """
-    Redmine上の最新のチェックチケットから、最後にチェックした日付を取得する
+    最後にチェックした日付を取得する
+
+    ローカルのチェックポイントを優先し、存在しない・不整合な場合のみ
+    Redmine上の最新のチェックチケットを検索する。
+
+    Args:
+        project_id: プロジェクトID (省略時は TARGET_PROJECT_ID)
 
     Returns:
         次にチェックすべき日付(前回チェック日の翌日、またはデフォルトは昨日)
     """
-    headers = {'X-Redmine-API-Key': us.REDMINE_API_KEY}
+    project_id = project_id or us.TARGET_PROJECT_ID
+    saved = checkpoint.load(us.REDMINE_URL, project_id)
+    if saved is not None:
+        print(f'チェックポイントから前回のチェック対象日を特定しました: {saved["last_checked_date"]}')
+        return _next_target_date(saved['last_checked_date'])
 
     # 件名にキーワードを含み、作成日時の降順で1件だけ取得
     params = {
-        'project_id': us.TARGET_PROJECT_ID,
+        'project_id': project_id,
         'subject': f'~{us.SUBJECT_KEYWORD}',  # ~ は「含む」検索
         'tracker_id': us.TRACKER_ID,
         'limit': 1,
@@ -156,12 +915,7 @@ def get_last_target_date() -> datetime.date:
     yesterday = datetime.date.today() - datetime.timedelta(days=1)
 
     try:
-        resp = requests.get(
-            f'{us.REDMINE_URL}/issues.json',
-            headers=headers,
-            params=params,
-            verify=False,
-        )
+        resp = redmine_client.get_client().get('/issues.json', params=params)
         resp.raise_for_status()
         issues = resp.json()['issues']
 
@@ -178,12 +932,9 @@ def get_last_target_date() -> datetime.date:
             last_date_str = match.group(1)
             print(f'前回のチェック対象日を特定しました: {last_date_str}')
 
-            # 前回作成から次の日を対象とする
-            last_date = datetime.datetime.strptime(last_date_str, '%Y-%m-%d').date() + datetime.timedelta(days=1)
-            if last_date == datetime.date.today():
-                # 今日になってしまった場合は昨日の日付を返す
-                last_date = yesterday
-            return last_date
+            # 次回以降は検索せずに済むよう、チェックポイントに記録する
+            checkpoint.record(us.REDMINE_URL, project_id, last_date_str, issues[0]['id'])
+            return _next_target_date(last_date_str)
 
         print('チケットは見つかりましたが、日付の解析に失敗しました。昨日を返します。')
         return yesterday
@@ -0,0 +1,119 @@
+"""
+チェック済み日付のチェックポイントを管理するモジュール
+最後にチェックした日付と作成したチケットIDをローカルファイルに記録する
+"""
+
+import datetime
+import hashlib
+import os
+import threading
+
+import atomic_file
+import user_setting as us
+
+# 同一プロセス内での読み込み→更新→書き込みを直列化する
+_lock = threading.Lock()
+
+
+def _checkpoint_path(redmine_url: str, project_id: str) -> str:
+    """
+    チェックポイントファイルのパスを返す
+
+    Args:
+        redmine_url: RedmineのURL
+        project_id: プロジェクトID
+
+    Returns:
+        チェックポイントファイルのパス
+    """
+    key = hashlib.sha256(f'{redmine_url.rstrip("/")}|{project_id}'.encode()).hexdigest()[:16]
+    return os.path.join(us.CACHE_DIR, f'checkpoint_{key}.json')
+
+
+def _is_consistent(data: dict, redmine_url: str, project_id: str) -> bool:
+    """
+    チェックポイントの内容が整合しているかを判定する
+
+    Args:
+        data: 読み込んだチェックポイント
+        redmine_url: RedmineのURL
+        project_id: プロジェクトID
+
+    Returns:
+        接続先が一致し、最終チェック日が未来日でなく、その日のチケットIDが記録されていれば True
+    """
+    if data.get('redmine_url') != redmine_url or data.get('project_id') != project_id:
+        return False
+
+    last_date_str = data.get('last_checked_date')
+    tickets = data.get('tickets')
+    if not isinstance(last_date_str, str) or not isinstance(tickets, dict):
+        return False
+
+    try:
+        last_date = datetime.datetime.strptime(last_date_str, '%Y-%m-%d').date()
+    except ValueError:
+        return False
+
+    return last_date < datetime.date.today() and isinstance(tickets.get(last_date_str), int)
+
+
+def load(redmine_url: str, project_id: str) -> dict | None:
+    """
+    チェックポイントを読み込む
+
+    Args:
+        redmine_url: RedmineのURL
+        project_id: プロジェクトID
+
+    Returns:
+        {'last_checked_date': 最終チェック日, 'tickets': {日付文字列: チケットID}} の辞書、
+        またはファイルがない・内容が不整合な場合はNone
+    """
+    data = atomic_file.read_json(_checkpoint_path(redmine_url, project_id))
+    if data is None or not _is_consistent(data, redmine_url, project_id):
+        return None
+    return {'last_checked_date': data['last_checked_date'], 'tickets': data['tickets']}
+
+
+def is_pending(redmine_url: str, project_id: str) -> bool:
+    """
+    チェックしていない日があるかを判定する
+
+    Args:
+        redmine_url: RedmineのURL
+        project_id: プロジェクトID
+
+    Returns:
+        チェックポイントがない、または最終チェック日が昨日より前であれば True
+    """
+    saved = load(redmine_url, project_id)
+    yesterday = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+    return saved is None or saved['last_checked_date'] < yesterday
+
+
+def record(redmine_url: str, project_id: str, date_str: str, issue_id: int) -> None:
+    """
+    チェック済みの日付と作成したチケットIDを記録する (記録に失敗しても処理は継続する)
+
+    Args:
+        redmine_url: RedmineのURL
+        project_id: プロジェクトID
+        date_str: チェックした日付 (YYYY-MM-DD形式)
+        issue_id: 作成したチケットID
+    """
+    path = _checkpoint_path(redmine_url, project_id)
+
+    with _lock:
+        current = load(redmine_url, project_id) or {'last_checked_date': date_str, 'tickets': {}}
+        tickets = {**current['tickets'], date_str: issue_id}
+        data = {
+            'redmine_url': redmine_url,
+            'project_id': project_id,
+            'last_checked_date': max(current['last_checked_date'], date_str),
+            'tickets': tickets,
+        }
+        try:
+            atomic_file.write_json_atomic(path, data)
+        except OSError as e:
+            print(f'チェックポイント保存エラー: {e}')
@@ -3,180 +3,368 @@ Redmineにチケットを作成するモジュール
 作業時間入力チェック結果を整形してチケットとして登録する
 """
 
-import requests  # type: ignore
-import urllib3
+import re
+from concurrent.futures import ThreadPoolExecutor
 
+import checkpoint
+import metrics
+import redmine_client
+import report
 import user_setting as us
 
-# 自己署名証明書の警告(InsecureRequestWarning)を非表示にする設定
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# チケット件名から対象日付 (yyyy-mm-dd) を抽出する正規表現
+_SUBJECT_DATE_PATTERN = re.compile(r'\((\d{4}-\d{2}-\d{2})\)')
 
-# Textile形式の表ヘッダー
-USER_TABLE_HEADER = '|_. 氏名 |_. 時間 |\n'
-PROJECT_TABLE_HEADER = '|_. プロジェクト名 |_. 合計時間 |\n'
+# 入力済みのメンバーの表の行 (|氏名|時間|) を抽出する正規表現
+_OK_ROW_PATTERN = re.compile(r'^\|(.*)\|(\d+\.\d{2})\|$', re.MULTILINE)
 
 
-def _build_user_table_rows(target_users: dict, entered_users: dict) -> tuple[list, list]:
+def _get_subject_and_priority(missing_rows: list, date_str: str) -> tuple[str, int]:
     """
-    ユーザーの入力状況テーブル行を生成する
+    チケットの件名と優先度を決定する
 
     Args:
-        target_users: 対象ユーザーの辞書 {ID: 名前}
-        entered_users: 入力済みユーザーの辞書 {ID: 時間}
+        missing_rows: 未入力者のテーブル行 (または未入力者のIDのリスト)
+        date_str: 対象日付
 
     Returns:
-        (未入力者の行リスト, 入力済み者の行リスト)
+        (件名, 優先度ID)
     """
-    missing_rows = []
-    ok_rows = []
+    if missing_rows:
+        return f'【未入力あり】{us.SUBJECT_KEYWORD} ({date_str})', 1  # 低め
+    else:
+        return f'【完了】{us.SUBJECT_KEYWORD} ({date_str})', 1  # 低め
 
-    for uid, name in target_users.items():
-        if uid in entered_users:
-            hours = entered_users[uid]
-            ok_rows.append(f'|{name}|{hours:.2f}|')
-        else:
-            missing_rows.append(f'|{name}|---|')
 
-    return missing_rows, ok_rows
+def _build_payload(date_str: str, target_users: dict, entered_users: dict, entered_projects: dict, project_id: str) -> dict:
+    """
+    チケット作成リクエストの本文を生成する
 
+    Args:
+        date_str: 対象日付 (YYYY-MM-DD形式)
+        target_users: チェック対象ユーザー {ID: 名前}
+        entered_users: 入力済みユーザー {ID: 時間}
+        entered_projects: プロジェクト別集計 {プロジェクト名: 時間}
+        project_id: チケットを作成するプロジェクトID
 
-def _build_project_table_rows(entered_projects: dict) -> list:
+    Returns:
+        POST /issues.json の本文 (未入力者をウォッチャーに含む)
     """
-    プロジェクト別集計テーブル行を生成する
+    # ウォッチャーに追加するユーザーID
+    missing_user_ids = [int(uid) for uid, name in target_users.items() if uid not in entered_users]
+
+    # チケット件名と優先度の決定
+    subject, priority_id = _get_subject_and_priority(missing_user_ids, date_str)
+
+    # 説明文の生成
+    description = report.render(date_str, target_users, entered_users, entered_projects)
+
+    return {
+        'issue': {
+            'project_id': project_id,
+            'parent_issue_id': us.PROJECT_PARENT_TICKET_IDS.get(project_id, us.PARENT_TICKET_ID),
+            'tracker_id': us.TRACKER_ID,
+            'subject': subject,
+            'description': description,
+            'priority_id': priority_id,
+            'watcher_user_ids': missing_user_ids,
+        }
+    }
+
+
+@metrics.timed('create_ticket')
+def create_redmine_ticket(
+    date_str: str,
+    target_users: dict,
+    entered_users: dict,
+    entered_projects: dict,
+    project_id: str | None = None,
+) -> int | None:
+    """
+    Redmineにチケットを作成し、未入力者をウォッチャーに追加する
+
+    作成に成功した場合は対象日付とチケットIDをチェックポイントに記録する。
 
     Args:
-        entered_projects: プロジェクト別集計の辞書 {プロジェクト名: 時間}
+        date_str: 対象日付 (YYYY-MM-DD形式)
+        target_users: チェック対象ユーザー {ID: 名前}
+        entered_users: 入力済みユーザー {ID: 時間}
+        entered_projects: プロジェクト別集計 {プロジェクト名: 時間}
+        project_id: チケットを作成するプロジェクトID (省略時は TARGET_PROJECT_ID)
 
     Returns:
-        テーブル行のリスト
+        作成したチケットID、または作成失敗時はNone
     """
-    return [f'|{prj_name}|{hours:.2f}|' for prj_name, hours in entered_projects.items()]
+    project_id = project_id or us.TARGET_PROJECT_ID
+
+    # チケット作成リクエストの構築
+    payload = _build_payload(date_str, target_users, entered_users, entered_projects, project_id)
+    missing_user_ids = payload['issue']['watcher_user_ids']
+
+    print('Redmineチケットを作成中...')
+
+    try:
+        response = redmine_client.get_client().post('/issues.json', json=payload)
+        response.raise_for_status()
+
+        new_issue = response.json()
+        issue_id: int = new_issue['issue']['id']
+        print(f'チケット作成成功! Issue ID: {issue_id}')
+
+        if missing_user_ids:
+            print(f'ウォッチャー追加数: {len(missing_user_ids)}名')
 
+    except Exception as e:
+        print(f'チケット作成エラー: {e}')
+        if 'response' in locals():
+            print(response.text)
+        return None
 
-def _build_description(date_str: str, missing_rows: list, ok_rows: list, project_rows: list) -> str:
+    checkpoint.record(us.REDMINE_URL, project_id, date_str, issue_id)
+    return issue_id
+
+
+def find_existing_tickets(project_id: str, dates: list[str]) -> dict[str, int]:
     """
-    Redmineチケットの説明欄を生成する
+    指定した日付のチェックチケットが既にあるかを範囲検索でまとめて調べる
+
+    最も古い日付以降に作成された、件名にキーワードを含むチケットを (終了済みも含めて) 一覧で取得し、
+    件名の日付で照合する。日付ごとにチケットを検索するより通信回数が少ない。
 
     Args:
-        date_str: 対象日付
-        missing_rows: 未入力者のテーブル行
-        ok_rows: 入力済み者のテーブル行
-        project_rows: プロジェクト別集計のテーブル行
+        project_id: プロジェクトID
+        dates: 対象日付 (YYYY-MM-DD形式) のリスト
 
     Returns:
-        Textile形式の説明文
+        既存のチケットがある日付とそのチケットID {日付文字列: チケットID} (同じ日付が複数ある場合は最も古いもの)
+
+    Raises:
+        requests.RequestException: 検索に失敗した場合
     """
-    description = f'h3. 対象日: {date_str}\n\n'
+    wanted = set(dates)
+    params = {
+        'project_id': project_id,
+        'subject': f'~{us.SUBJECT_KEYWORD}',  # ~ は「含む」検索
+        'tracker_id': us.TRACKER_ID,
+        'status_id': '*',  # 終了済みのチケットも対象にする
+        'created_on': f'>={min(wanted)}',  # 対象日のチケットは対象日以降に作成される
+        'sort': 'created_on:asc',
+        'limit': us.PAGE_LIMIT,
+    }
 
-    # 未入力者セクション
-    if missing_rows:
-        description += 'h4. 未入力のメンバー\n\n'
-        description += '入力お願いします。\n\n'
-        description += USER_TABLE_HEADER
-        description += '\n'.join(missing_rows) + '\n'
+    client = redmine_client.get_client()
+    found: dict[str, int] = {}
+    offset = 0
+    while True:
+        resp = client.get('/issues.json', params={**params, 'offset': offset})
+        resp.raise_for_status()
+        data = resp.json()
+        issues = data['issues']
+        for issue in issues:
+            match = _SUBJECT_DATE_PATTERN.search(issue['subject'])
+            if match and match.group(1) in wanted:
+                found.setdefault(match.group(1), issue['id'])
+
+        offset += len(issues)
+        if not issues or offset >= data.get('total_count', offset):
+            return found
+
+
+def _write_ticket(spec: tuple, project_id: str, existing: dict[str, int] | Exception) -> dict:
+    """
+    1件のチケットを作成し、結果を返す (既存のチケットがある場合は作成しない)
+
+    Args:
+        spec: (対象日付, チェック対象ユーザー, 入力済みユーザー, プロジェクト別集計, プロジェクトID)
+        project_id: チケットを作成するプロジェクトID
+        existing: find_existing_tickets の結果、または検索時に発生した例外
+
+    Returns:
+        チケットごとの結果 (create_redmine_tickets を参照)
+    """
+    date_str, target_users, entered_users, entered_projects, _ = spec
+    result = {'project_id': project_id, 'date': date_str, 'status': 'failed', 'issue_id': None, 'watchers': 0, 'error': None}
+
+    # 既存チケットを確認できない場合は、重複を避けるため作成しない
+    if isinstance(existing, Exception):
+        result['error'] = f'既存チケットの確認エラー: {existing}'
+        return result
+
+    if date_str in existing:
+        result.update(status='existing', issue_id=existing[date_str])
     else:
-        description += 'h4. 全員の入力が完了しています\n'
+        payload = _build_payload(date_str, target_users, entered_users, entered_projects, project_id)
+        response = None
+        try:
+            response = redmine_client.get_client().post('/issues.json', json=payload)
+            response.raise_for_status()
+            issue_id = response.json()['issue']['id']
+        except Exception as e:
+            result['error'] = f'{e}' if response is None else f'{e} {response.text}'
+            return result
+        result.update(status='created', issue_id=issue_id, watchers=len(payload['issue']['watcher_user_ids']))
+
+    checkpoint.record(us.REDMINE_URL, project_id, date_str, result['issue_id'])
+    return result
+
+
+@metrics.timed('create_tickets')
+def create_redmine_tickets(specs: list[tuple]) -> dict:
+    """
+    複数の日付・プロジェクトのチケットをまとめて作成する
 
-    description += '\n'
+    プロジェクトごとに既存のチェックチケットを1回の範囲検索で確認し、同じ日付のチケットがあれば作成せずに
+    そのIDをチェックポイントに記録する。作成は最大 TICKET_WORKERS 件まで並行して行う。
+    結果は出力せず、集計として返す。
 
-    # 入力済み者セクション
-    if ok_rows:
-        description += 'h4. 入力済みのメンバー\n\n'
-        description += USER_TABLE_HEADER
-        description += '\n'.join(ok_rows) + '\n'
+    Args:
+        specs: (対象日付, チェック対象ユーザー, 入力済みユーザー, プロジェクト別集計, プロジェクトID) のリスト。
+            プロジェクトIDが None の場合は TARGET_PROJECT_ID とする
 
-    # プロジェクト別集計セクション
-    if project_rows:
-        description += '\n'
-        description += 'h4. プロジェクト別集計\n\n'
-        description += PROJECT_TABLE_HEADER
-        description += '\n'.join(project_rows) + '\n'
+    Returns:
+        {'created': 作成数, 'existing': 既存のため作成しなかった数, 'failed': 失敗数, 'tickets': チケットごとの結果のリスト}。
+        チケットごとの結果は specs の順に並び、
+        {'project_id', 'date', 'status' ('created' / 'existing' / 'failed'), 'issue_id', 'watchers' (追加したウォッチャー数), 'error'}
+    """
+    dates_by_project: dict[str, list[str]] = {}
+    for spec in specs:
+        dates_by_project.setdefault(spec[4] or us.TARGET_PROJECT_ID, []).append(spec[0])
 
-    return description
+    def lookup(project_id: str) -> dict[str, int] | Exception:
+        try:
+            return find_existing_tickets(project_id, dates_by_project[project_id])
+        except Exception as e:
+            return e
 
+    with ThreadPoolExecutor(max_workers=us.TICKET_WORKERS, thread_name_prefix='ticket') as executor:
+        existing = dict(zip(dates_by_project, executor.map(lookup, dates_by_project), strict=True))
+        futures = []
+        for spec in specs:
+            project_id = spec[4] or us.TARGET_PROJECT_ID
+            futures.append(executor.submit(_write_ticket, spec, project_id, existing[project_id]))
+        tickets = [future.result() for future in futures]
 
-def _get_subject_and_priority(missing_rows: list, date_str: str) -> tuple[str, int]:
+    summary = {status: sum(t['status'] == status for t in tickets) for status in ('created', 'existing', 'failed')}
+    return {**summary, 'tickets': tickets}
+
+
+def _parse_entered_hours(description: str) -> dict[str, float]:
     """
-    チケットの件名と優先度を決定する
+    説明文の「入力済みのメンバー」の表から氏名ごとの時間を取り出す
 
     Args:
-        missing_rows: 未入力者のテーブル行
-        date_str: 対象日付
+        description: チケットの説明文 (Textile 形式のレポート)
 
     Returns:
-        (件名, 優先度ID)
+        {氏名: 時間}
     """
-    if missing_rows:
-        return f'【未入力あり】{us.SUBJECT_KEYWORD} ({date_str})', 1  # 低め
-    else:
-        return f'【完了】{us.SUBJECT_KEYWORD} ({date_str})', 1  # 低め
+    section = description.partition('h4. 入力済みのメンバー')[2].partition('h4. ')[0]
+    return {name: float(hours) for name, hours in _OK_ROW_PATTERN.findall(section)}
 
 
-def create_redmine_ticket(
-    date_str: str,
-    target_users: dict,
-    entered_users: dict,
-    entered_projects: dict,
-) -> None:
+@metrics.timed('update_ticket')
+def update_redmine_ticket(issue_id: int, date_str: str, target_users: dict, entered_users: dict, entered_projects: dict) -> dict | None:
     """
-    Redmineにチケットを作成し、未入力者をウォッチャーに追加する
+    既存のチェックチケットを最新の入力状況に合わせて更新する
+
+    チケットの現在の内容と比較し、変わった項目だけを送信する。
+    説明文・件名 (【未入力あり】→【完了】) は変わった場合のみ PUT し、チェック対象のうち入力済みになったメンバーはウォッチャーから外す。
+    変更がなければ何も送信しない。
 
     Args:
+        issue_id: 更新するチェックチケットのID
         date_str: 対象日付 (YYYY-MM-DD形式)
         target_users: チェック対象ユーザー {ID: 名前}
         entered_users: 入力済みユーザー {ID: 時間}
         entered_projects: プロジェクト別集計 {プロジェクト名: 時間}
-    """
-    # テーブル行の生成
-    missing_rows, ok_rows = _build_user_table_rows(target_users, entered_users)
-    project_rows = _build_project_table_rows(entered_projects)
 
-    # チケット件名と優先度の決定
-    subject, priority_id = _get_subject_and_priority(missing_rows, date_str)
+    Returns:
+        変更内容 {'issue_id', 'entered': 入力済みになったメンバー名のリスト, 'hours': {氏名: (変更前の時間, 変更後の時間)},
+        'fields': 更新した項目名のリスト, 'watchers_removed': ウォッチャーから外したユーザーIDのリスト}、
+        または取得・更新に失敗した場合はNone
+    """
+    client = redmine_client.get_client()
+    try:
+        response = client.get(f'/issues/{issue_id}.json', params={'include': 'watchers'})
+        response.raise_for_status()
+        issue = response.json()['issue']
+    except Exception as e:
+        print(f'チケット取得エラー: {e}')
+        return None
+
+    # 最新の入力状況で件名と説明文を生成し直す
+    subject, _ = _get_subject_and_priority([uid for uid in target_users if uid not in entered_users], date_str)
+    description = report.render(date_str, target_users, entered_users, entered_projects)
+
+    # Redmine は改行を CRLF で保存するため、LF に揃えて比較する
+    current_description = (issue.get('description') or '').replace('\r\n', '\n')
+    changes = {}
+    if current_description != description:
+        changes['description'] = description
+    if issue.get('subject') != subject:
+        changes['subject'] = subject
+    # ウォッチャーから外すのはチェック対象 (このツールが追加したユーザー) のうち入力済みになったメンバーのみとし、
+    # 手動で追加されたウォッチャーは入力済みでも残す
+    removed = [w['id'] for w in issue.get('watchers', []) if w['id'] in target_users and w['id'] in entered_users]
+
+    # 変更内容の集計 (時間は説明文と同じく小数点以下2桁で比較する)
+    before = _parse_entered_hours(current_description)
+    after = {target_users[uid]: float(f'{hours:.2f}') for uid, hours in entered_users.items() if uid in target_users}
+    entered = [name for name in after if name not in before]
+    changed_hours = {name: (before[name], hours) for name, hours in after.items() if name in before and before[name] != hours}
+    result = {
+        'issue_id': issue_id,
+        'entered': entered,
+        'hours': changed_hours,
+        'fields': sorted(changes),
+        'watchers_removed': removed,
+    }
 
-    # 説明文の生成
-    description = _build_description(date_str, missing_rows, ok_rows, project_rows)
+    if not changes and not removed:
+        print(f'チケットに変更はありません: Issue ID: {issue_id}')
+        return result
 
-    # ウォッチャーに追加するユーザーID
-    missing_user_ids = [int(uid) for uid, name in target_users.items() if uid not in entered_users]
+    try:
+        if changes:
+            response = client.put(f'/issues/{issue_id}.json', json={'issue': changes})
+            response.raise_for_status()
+        # ウォッチャーの削除は1名ずつ行う (PUT ではウォッチャーを外せない)
+        for uid in removed:
+            response = client.delete(f'/issues/{issue_id}/watchers/{uid}.json')
+            response.raise_for_status()
+    except Exception as e:
+        print(f'チケット更新エラー: {e}')
+        return None
 
-    # チケット作成リクエストの構築
-    payload = {
-        'issue': {
-            'project_id': us.TARGET_PROJECT_ID,
-            'parent_issue_id': us.PARENT_TICKET_ID,
-            'tracker_id': us.TRACKER_ID,
-            'subject': subject,
-            'description': description,
-            'priority_id': priority_id,
-            'watcher_user_ids': missing_user_ids,
-        }
-    }
+    print(
+        f'チケットを更新しました: Issue ID: {issue_id} '
+        f'(入力済みになったメンバー {len(entered)}名 / 時間が変わったメンバー {len(changed_hours)}名 / ウォッチャー削除 {len(removed)}名)'
+    )
+    return result
 
-    headers = {
-        'X-Redmine-API-Key': us.REDMINE_API_KEY,
-        'Content-Type': 'application/json',
-    }
 
-    print('Redmineチケットを作成中...')
+@metrics.timed('reminder')
+def add_reminder_note(issue_id: int, missing_users: dict) -> bool:
+    """
+    チェックチケットに未入力者の一覧を注記として追加する
 
-    try:
-        response = requests.post(
-            f'{us.REDMINE_URL}/issues.json',
-            json=payload,
-            headers=headers,
-            verify=False,
-        )
-        response.raise_for_status()
+    注記の追加によりウォッチャー (未入力者) に通知される。
 
-        new_issue = response.json()
-        issue_id = new_issue['issue']['id']
-        print(f'チケット作成成功! Issue ID: {issue_id}')
+    Args:
+        issue_id: チェックチケットのID
+        missing_users: まだ入力していないユーザー {ID: 名前}
 
-        if missing_user_ids:
-            print(f'ウォッチャー追加数: {len(missing_user_ids)}名')
+    Returns:
+        追加に成功した場合は True
+    """
+    notes = report.render_reminder(missing_users)
 
+    try:
+        response = redmine_client.get_client().put(f'/issues/{issue_id}.json', json={'issue': {'notes': notes}})
+        response.raise_for_status()
     except Exception as e:
-        print(f'チケット作成エラー: {e}')
-        if 'response' in locals():
-            print(response.text)
+        print(f'リマインド追加エラー: {e}')
+        return False
+
+    print(f'リマインドを追加しました: Issue ID: {issue_id} (未入力 {len(missing_users)}名)')
+    return True
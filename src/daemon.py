@@ -0,0 +1,237 @@
+"""
+常駐モードのスケジューラーを提供するモジュール
+1つのプロセスで日次チェックと日中のリマインドを設定時刻に実行し、
+Redmine への接続 (コネクションプール)・メンバーキャッシュ・ローカルストアを実行間で使い回す
+"""
+
+import datetime
+import os
+import threading
+import time
+from collections.abc import Callable
+
+import atomic_file
+import check_specific_time
+import checkpoint
+import create_redmine_ticket
+import metrics
+import redmine_client
+import user_setting as us
+
+# 待機中に時刻を再確認する間隔 (秒)。スリープ復帰や時刻変更があっても予定時刻を過ぎないようにする
+_WAKE_INTERVAL = 60
+
+
+def status_path() -> str:
+    """ステータスファイルのパスを返す (設定値がない場合は CACHE_DIR 内)"""
+    return us.DAEMON_STATUS_PATH or os.path.join(us.CACHE_DIR, 'daemon_status.json')
+
+
+def _parse_times(values: list[str]) -> list[datetime.time]:
+    """'HH:MM' 形式の時刻のリストを昇順の time のリストに変換する"""
+    return sorted(datetime.time.fromisoformat(v) for v in values)
+
+
+class Daemon:
+    """
+    日次チェックとリマインドを設定時刻に実行するスケジューラー
+
+    実行ごとに所要時間と HTTP 通信を計測し、最後の実行結果をステータスファイルに書き出す。
+    """
+
+    def __init__(
+        self,
+        daily_check: Callable[[], object],
+        project_ids: list[str],
+        check_times: list[str] | None = None,
+        reminder_times: list[str] | None = None,
+        status_path: str | None = None,
+    ) -> None:
+        """
+        Args:
+            daily_check: 日次チェック (前回チェック日の翌日のチケット作成) を行う関数
+            project_ids: リマインドの対象とするプロジェクトIDのリスト
+            check_times: 日次チェックの時刻 ('HH:MM') のリスト (省略時は設定値)
+            reminder_times: リマインドの時刻 ('HH:MM') のリスト (省略時は設定値)
+            status_path: ステータスファイルのパス (省略時は書き出しのたびに設定値から求める)
+        """
+        self.daily_check = daily_check
+        self.project_ids = project_ids
+        self.check_times = _parse_times(us.DAEMON_CHECK_TIMES if check_times is None else check_times)
+        self.reminder_times = _parse_times(us.DAEMON_REMINDER_TIMES if reminder_times is None else reminder_times)
+        self.status_path = status_path
+        self.status: dict = {
+            'pid': os.getpid(),
+            'started_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'state': 'idle',
+            'runs': 0,
+            'next_run': None,
+            'last_run': None,
+        }
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """待機中の場合は直ちに、実行中の場合はその実行の完了後に終了する"""
+        self._stop.set()
+
+    def next_job(self, now: datetime.datetime) -> tuple[datetime.datetime, str] | None:
+        """
+        次に実行する処理と時刻を求める
+
+        Args:
+            now: 現在時刻
+
+        Returns:
+            (実行時刻, 処理の種類 'check' または 'reminder')、または予定がない場合はNone
+        """
+        candidates = []
+        for kind, times in (('check', self.check_times), ('reminder', self.reminder_times)):
+            for t in times:
+                at = datetime.datetime.combine(now.date(), t)
+                if at <= now:
+                    at += datetime.timedelta(days=1)
+                candidates.append((at, kind))
+        # 同じ時刻の場合は日次チェックを先に実行する
+        return min(candidates, default=None)
+
+    def _check(self) -> None:
+        """日次チェックを実行する (全プロジェクトが昨日までチェック済みの場合は実行しない)"""
+        if not any(checkpoint.is_pending(us.REDMINE_URL, pid) for pid in self.project_ids):
+            print('昨日までチェック済みのため、日次チェックをスキップします')
+            return
+
+        # グループの所属は日ごとに取り直す (プロジェクトメンバーはキャッシュの有効期限に従って再検証する)
+        check_specific_time.clear_group_users_cache()
+        self.daily_check()
+
+    def _remind(self) -> None:
+        """直近のチェックチケットに、まだ入力していないメンバーを注記する"""
+        issues: dict[str, tuple[str, int]] = {}
+        for pid in self.project_ids:
+            saved = checkpoint.load(us.REDMINE_URL, pid)
+            if saved is not None:
+                date_str = saved['last_checked_date']
+                issues[pid] = (date_str, saved['tickets'][date_str])
+        if not issues:
+            print('リマインド対象のチェックチケットがありません')
+            return
+
+        target_dates = {pid: datetime.date.fromisoformat(date_str) for pid, (date_str, _) in issues.items()}
+        results = check_specific_time.get_projects_date_time(target_dates)
+        if results is None:
+            print('エラー: データ取得に失敗しました')
+            return
+
+        for pid, result in results.items():
+            if result is None:
+                continue
+            _, members, entered_users, _ = result
+            missing = {uid: members[uid] for uid in us.TARGET_LIST if uid in members and uid not in entered_users}
+            if missing:
+                create_redmine_ticket.add_reminder_note(issues[pid][1], missing)
+            else:
+                print(f'プロジェクト {pid}: 全員の入力が完了しているため、リマインドしません')
+
+    def run_job(self, kind: str) -> dict:
+        """
+        処理を1回実行し、結果をステータスに記録する
+
+        Args:
+            kind: 処理の種類 ('check' または 'reminder')
+
+        Returns:
+            実行結果 (種類・開始/終了時刻・所要時間・成否・工程ごとの時間・HTTP 通信の集計)
+        """
+        started_at = datetime.datetime.now()
+        self.status.update(state='running', current_job=kind)
+        self._write_status()
+
+        # リクエスト数の上限は実行ごとに適用し、開いたままのローカルストアは実行ごとに差分同期する
+        redmine_client.get_client().reset_budget()
+        check_specific_time.reset_entry_store_sync()
+        metrics.start()
+        started = time.perf_counter()
+        error = None
+        try:
+            if kind == 'check':
+                self._check()
+            else:
+                self._remind()
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+            print(f'{kind} の実行エラー: {error}')
+        duration = time.perf_counter() - started
+        report = metrics.finish(us.METRICS_REPORT_PATH, us.METRICS_TEXTFILE_PATH) or {}
+
+        last_run = {
+            'kind': kind,
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'finished_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'duration_seconds': round(duration, 3),
+            'ok': error is None,
+            'error': error,
+            'phases': {name: round(total['seconds'], 3) for name, total in report.get('phase_totals', {}).items()},
+            'http': {
+                name: {'requests': s['requests'], 'bytes': s['bytes'], 'seconds': round(s['seconds'], 3)}
+                for name, s in report.get('endpoints', {}).items()
+            },
+        }
+        self.status.update(state='idle', current_job=None, last_run=last_run, runs=self.status['runs'] + 1)
+        self._write_status()
+        return last_run
+
+    def _write_status(self) -> None:
+        """ステータスファイルを書き出す (失敗しても処理は継続する)"""
+        try:
+            atomic_file.write_json_atomic(self.status_path or status_path(), self.status)
+        except OSError as e:
+            print(f'ステータスファイル保存エラー: {e}')
+
+    def _sleep_until(self, at: datetime.datetime) -> bool:
+        """
+        指定時刻まで待機する
+
+        Returns:
+            指定時刻に達した場合は True、停止を指示された場合は False
+        """
+        while True:
+            remaining = (at - datetime.datetime.now()).total_seconds()
+            if remaining <= 0:
+                return True
+            if self._stop.wait(min(remaining, _WAKE_INTERVAL)):
+                return False
+
+    def run(self) -> None:
+        """
+        停止を指示されるまで、設定時刻に処理を実行し続ける
+
+        起動時に当日の日次チェックの時刻を過ぎていれば、まず日次チェックを実行する。
+        """
+        check_times = ', '.join(t.strftime('%H:%M') for t in self.check_times)
+        reminder_times = ', '.join(t.strftime('%H:%M') for t in self.reminder_times) or 'なし'
+        print(f'常駐モードで起動しました (日次チェック: {check_times} / リマインド: {reminder_times})')
+
+        try:
+            # ローカルストアは常駐中開いたままにする
+            with check_specific_time.hold_entry_store():
+                if any(t <= datetime.datetime.now().time() for t in self.check_times):
+                    self.run_job('check')
+
+                while not self._stop.is_set():
+                    job = self.next_job(datetime.datetime.now())
+                    if job is None:
+                        print('実行予定がないため終了します')
+                        break
+                    at, kind = job
+                    self.status['next_run'] = {'kind': kind, 'at': at.isoformat(timespec='seconds')}
+                    self._write_status()
+                    if not self._sleep_until(at):
+                        break
+                    self.run_job(kind)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.status.update(state='stopped', next_run=None)
+            self._write_status()
+            redmine_client.get_client().close()
+        print('常駐モードを終了しました')
@@ -0,0 +1,218 @@
+"""
+作業時間エントリのローカルストアを管理するモジュール
+Redmineから取得したエントリを SQLite に保存し、差分同期の状態を保持する
+"""
+
+import hashlib
+import os
+import sqlite3
+from collections.abc import Iterable, Iterator
+
+import user_setting as us
+from time_entry import TimeEntry
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS time_entries (
+    id INTEGER PRIMARY KEY,
+    spent_on TEXT NOT NULL,
+    hours REAL NOT NULL,
+    user_id INTEGER NOT NULL,
+    user_name TEXT,
+    project_id INTEGER,
+    project_name TEXT,
+    activity_id INTEGER,
+    activity_name TEXT,
+    issue_id INTEGER,
+    updated_on TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_time_entries_spent_on ON time_entries (spent_on);
+CREATE INDEX IF NOT EXISTS idx_time_entries_updated_on ON time_entries (updated_on);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# 集計軸 (aggregation.DIMENSIONS) に対応する列
+_DIMENSION_COLUMNS = {
+    'user': 'user_id',
+    'project': 'project_name',
+    'activity': 'activity_name',
+    'issue': 'issue_id',
+    'day': 'spent_on',
+}
+
+# TimeEntry.__slots__ と同じ順に並べる
+_COLUMNS = 'id, spent_on, hours, user_id, user_name, project_id, project_name, activity_id, activity_name, issue_id, updated_on'
+
+
+def store_path(redmine_url: str) -> str:
+    """
+    RedmineのURLに対応するストアファイルのパスを返す
+
+    Args:
+        redmine_url: RedmineのURL
+
+    Returns:
+        SQLite ファイルのパス
+    """
+    key = hashlib.sha256(redmine_url.rstrip('/').encode()).hexdigest()[:16]
+    return os.path.join(us.CACHE_DIR, f'time_entries_{key}.sqlite3')
+
+
+class EntryStore:
+    """
+    作業時間エントリの SQLite ストア
+
+    エントリはIDをキーとして保持し、同期状態 (取得済み期間・更新日時の最大値など) を併せて記録する。
+    """
+
+    def __init__(self, path: str, shared: bool = False) -> None:
+        """
+        Args:
+            path: SQLite ファイルのパス
+            shared: True の場合、開いたスレッド以外からも使えるようにする (利用側で排他すること)
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=not shared)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """ストアを閉じる"""
+        self.conn.close()
+
+    def __enter__(self) -> 'EntryStore':
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def get_state(self, key: str) -> str | None:
+        """
+        同期状態を取得する
+
+        Args:
+            key: 状態のキー
+
+        Returns:
+            状態の値、または未設定の場合はNone
+        """
+        row = self.conn.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: str) -> None:
+        """
+        同期状態を設定する
+
+        Args:
+            key: 状態のキー
+            value: 状態の値
+        """
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (key, value))
+
+    def upsert(self, entries: Iterable[TimeEntry]) -> None:
+        """
+        エントリを追加または更新する
+
+        Args:
+            entries: 作業時間エントリのイテラブル
+        """
+        with self.conn:
+            self.conn.executemany(
+                f'INSERT OR REPLACE INTO time_entries ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [e.as_tuple() for e in entries],
+            )
+
+    def replace_day(self, str_date: str, entries: Iterable[TimeEntry]) -> None:
+        """
+        指定日のエントリを取得結果で置き換える (サーバー側で削除されたエントリを取り除く)
+
+        Args:
+            str_date: 対象日付 (YYYY-MM-DD形式)
+            entries: サーバーから取得した指定日の全エントリ
+        """
+        with self.conn:
+            self.conn.execute('DELETE FROM time_entries WHERE spent_on = ?', (str_date,))
+            self.conn.executemany(
+                f'INSERT OR REPLACE INTO time_entries ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [e.as_tuple() for e in entries],
+            )
+
+    def entries_between(self, str_from: str, str_to: str) -> list[TimeEntry]:
+        """
+        期間内のエントリを取得する
+
+        Args:
+            str_from: 開始日 (YYYY-MM-DD形式)
+            str_to: 終了日 (YYYY-MM-DD形式、この日を含む)
+
+        Returns:
+            作業時間エントリのリスト (作業日・ID順)
+        """
+        return list(self.iter_between(str_from, str_to))
+
+    def iter_between(self, str_from: str, str_to: str) -> Iterator[TimeEntry]:
+        """
+        期間内のエントリを、カーソルから読み出しながら1件ずつ返す (長期間のエントリを保持せずに処理するため)
+
+        Args:
+            str_from: 開始日 (YYYY-MM-DD形式)
+            str_to: 終了日 (YYYY-MM-DD形式、この日を含む)
+
+        Yields:
+            作業時間エントリ (作業日・ID順)
+        """
+        rows = self.conn.execute(
+            f'SELECT {_COLUMNS} FROM time_entries WHERE spent_on BETWEEN ? AND ? ORDER BY spent_on, id',
+            (str_from, str_to),
+        )
+        for row in rows:
+            yield TimeEntry(*row)
+
+    def columns_between(self, str_from: str, str_to: str, dimensions: tuple[str, ...]) -> tuple[dict[str, list], list[float]]:
+        """
+        期間内のエントリを、集計軸ごとの列と時間の列として取得する
+
+        Args:
+            str_from: 開始日 (YYYY-MM-DD形式)
+            str_to: 終了日 (YYYY-MM-DD形式、この日を含む)
+            dimensions: 集計軸のリスト (aggregation.DIMENSIONS のキー)
+
+        Returns:
+            ({集計軸: 値の列}, 時間の列) (作業日・ID順)
+        """
+        selected = ', '.join(_DIMENSION_COLUMNS[d] for d in dimensions)
+        rows = self.conn.execute(
+            f'SELECT hours, {selected} FROM time_entries WHERE spent_on BETWEEN ? AND ? ORDER BY spent_on, id',
+            (str_from, str_to),
+        ).fetchall()
+        if not rows:
+            return {d: [] for d in dimensions}, []
+        hours, *columns = zip(*rows, strict=True)
+        return {d: list(column) for d, column in zip(dimensions, columns, strict=True)}, list(hours)
+
+    def count_between(self, str_from: str, str_to: str) -> int:
+        """
+        期間内のエントリ件数を取得する
+
+        Args:
+            str_from: 開始日 (YYYY-MM-DD形式)
+            str_to: 終了日 (YYYY-MM-DD形式、この日を含む)
+
+        Returns:
+            エントリ件数
+        """
+        row = self.conn.execute('SELECT COUNT(*) FROM time_entries WHERE spent_on BETWEEN ? AND ?', (str_from, str_to)).fetchone()
+        return int(row[0])
+
+    def max_updated_on(self) -> str | None:
+        """
+        保存済みエントリの更新日時の最大値を取得する
+
+        Returns:
+            更新日時 (ISO 8601 形式)、またはエントリがない場合はNone
+        """
+        # updated_on の索引により、全件を走査せずに求める
+        value: str | None = self.conn.execute('SELECT MAX(updated_on) FROM time_entries').fetchone()[0]
+        return value
@@ -0,0 +1,189 @@
+"""
+作業時間エントリと日別の集計結果をファイルに書き出すモジュール
+Redmine (またはローカルストア) から期間内のエントリを受信しながら CSV / JSON Lines 形式で逐次書き出す
+
+期間は EXPORT_CHUNK_DAYS 日ごとに区切って取得し、ユーザー別・プロジェクト別の日別集計は区切りごとに書き出すため、
+期間の長さによらず保持するのは1区切り分の集計と重複除去用のIDのみとなる。
+ローカルストアから読み出す場合は、最初に一度だけ同期してから区切りごとに読み出す。
+
+実行例:
+    python src/export.py API_KEY 2025-01-01 2025-12-31
+    python src/export.py API_KEY 2025-01-01 2025-12-31 --format jsonl --gzip --source store
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import os
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack
+from operator import itemgetter
+from typing import Any, TextIO
+
+import atomic_file
+import check_specific_time
+import metrics
+import user_setting as us
+from time_entry import TimeEntry
+
+# 出力形式と拡張子
+FORMATS = {'csv': 'csv', 'jsonl': 'jsonl'}
+
+# 出力する内容と、その列
+KINDS = {
+    'entries': TimeEntry.__slots__,
+    'user_day': ('spent_on', 'user_id', 'user_name', 'hours', 'entries'),
+    'project_day': ('spent_on', 'project_name', 'hours', 'entries'),
+}
+
+# 取得元
+SOURCES = ('redmine', 'store')
+
+
+def _row_writer(f: TextIO, fmt: str, columns: tuple[str, ...]) -> Callable[[tuple], None]:
+    """
+    1行ずつ書き出す関数を返す (CSV の場合はヘッダー行を書き出す)
+
+    Args:
+        f: 書き込み先のテキストストリーム
+        fmt: 出力形式 ('csv' / 'jsonl')
+        columns: 列名
+
+    Returns:
+        列の値のタプルを1行として書き出す関数
+    """
+    if fmt == 'csv':
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(columns)
+        return writer.writerow
+
+    write = f.write
+
+    def write_json_line(row: tuple) -> None:
+        write(json.dumps(dict(zip(columns, row, strict=True)), ensure_ascii=False))
+        write('\n')
+
+    return write_json_line
+
+
+def _chunks(start: datetime.date, end: datetime.date, days: int) -> Iterator[tuple[str, str]]:
+    """期間を days 日ごとの (開始日, 終了日) に区切る"""
+    while start <= end:
+        chunk_end = min(start + datetime.timedelta(days=days - 1), end)
+        yield start.strftime('%Y-%m-%d'), chunk_end.strftime('%Y-%m-%d')
+        start = chunk_end + datetime.timedelta(days=1)
+
+
+@metrics.timed('export')
+def export(
+    start: datetime.date,
+    end: datetime.date,
+    directory: str | None = None,
+    fmt: str = 'csv',
+    compress: bool = False,
+    source: str = 'redmine',
+    kinds: tuple[str, ...] = tuple(KINDS),
+) -> dict[str, dict]:
+    """
+    期間内の作業時間エントリと日別の集計結果をファイルに書き出す
+
+    ファイルは一時ファイルに逐次書き込み、すべての書き込みが完了した時点で置き換える。
+    途中で失敗した場合は既存のファイルを変更しない。
+
+    Args:
+        start: 開始日
+        end: 終了日 (この日を含む)
+        directory: 出力先のディレクトリ (省略時は EXPORT_DIR)
+        fmt: 出力形式 ('csv' / 'jsonl')
+        compress: True の場合は gzip 形式で書き出す (拡張子に .gz を付ける)
+        source: 取得元 ('redmine' / 'store')
+        kinds: 出力する内容 ('entries': エントリ、'user_day': ユーザー別・日別集計、'project_day': プロジェクト別・日別集計)
+
+    Returns:
+        {出力した内容: {'path': ファイルのパス, 'rows': 行数}}
+
+    Raises:
+        ValueError: 出力形式・取得元・出力内容・期間が不正な場合
+        requests.RequestException: エントリの取得に失敗した場合
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'不正な出力形式: {fmt}')
+    if source not in SOURCES:
+        raise ValueError(f'不正な取得元: {source}')
+    if not kinds or any(kind not in KINDS for kind in kinds):
+        raise ValueError(f'不正な出力内容: {kinds}')
+    if start > end:
+        raise ValueError(f'不正な期間: {start} - {end}')
+
+    directory = directory or us.EXPORT_DIR
+    suffix = f'{start:%Y-%m-%d}_{end:%Y-%m-%d}.{FORMATS[fmt]}' + ('.gz' if compress else '')
+    result: dict[str, dict[str, Any]] = {kind: {'path': os.path.join(directory, f'{kind}_{suffix}'), 'rows': 0} for kind in kinds}
+
+    with ExitStack() as stack:
+        # ローカルストアは期間全体を一度だけ同期する
+        store = stack.enter_context(check_specific_time.open_synced_store(f'{start:%Y-%m-%d}')) if source == 'store' else None
+
+        writers = {}
+        for kind in kinds:
+            f = stack.enter_context(atomic_file.open_text_atomic(result[kind]['path'], compress))
+            writers[kind] = _row_writer(f, fmt, KINDS[kind])
+
+        for chunk_from, chunk_to in _chunks(start, end, us.EXPORT_CHUNK_DAYS):
+            # (作業日, ユーザーID) -> [ユーザー名, 時間, 件数] / (作業日, プロジェクト名) -> [時間, 件数]
+            user_days: dict[tuple, list] = {}
+            project_days: dict[tuple, list] = {}
+
+            for entry in check_specific_time.iter_period_entries(chunk_from, chunk_to, source, store):
+                if 'entries' in writers:
+                    writers['entries'](entry.as_tuple())
+                    result['entries']['rows'] += 1
+                user_total = user_days.setdefault((entry.spent_on, entry.user_id), [entry.user_name, 0.0, 0])
+                user_total[1] += entry.hours
+                user_total[2] += 1
+                project_total = project_days.setdefault((entry.spent_on, entry.project_name), [0.0, 0])
+                project_total[0] += entry.hours
+                project_total[1] += 1
+
+            # 集計は区切りごとに作業日順で書き出す (区切りは日付順のため、ファイル全体でも作業日順になる)
+            if 'user_day' in writers:
+                for (spent_on, user_id), (user_name, hours, count) in sorted(user_days.items(), key=itemgetter(0)):
+                    writers['user_day']((spent_on, user_id, user_name, round(hours, 2), count))
+                result['user_day']['rows'] += len(user_days)
+            if 'project_day' in writers:
+                for (spent_on, project_name), (hours, count) in sorted(project_days.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+                    writers['project_day']((spent_on, project_name, round(hours, 2), count))
+                result['project_day']['rows'] += len(project_days)
+
+    return result
+
+
+if __name__ == '__main__':
+    # 引数の解析処理
+    parser = argparse.ArgumentParser(description='作業時間エントリと日別集計のエクスポート')
+    parser.add_argument('api_key', help='RedmineのAPIキーを指定してください')
+    parser.add_argument('start', type=datetime.date.fromisoformat, help='開始日 (YYYY-MM-DD)')
+    parser.add_argument('end', type=datetime.date.fromisoformat, help='終了日 (YYYY-MM-DD、この日を含む)')
+    parser.add_argument('--output-dir', help='出力先のディレクトリ (省略時は EXPORT_DIR)')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv', help='出力形式')
+    parser.add_argument('--gzip', action='store_true', help='gzip 形式で書き出す')
+    parser.add_argument('--source', choices=SOURCES, default='redmine', help='取得元 (store: ローカルストアを同期して読み出す)')
+    parser.add_argument('--kinds', nargs='+', choices=list(KINDS), default=list(KINDS), help='出力する内容')
+
+    try:
+        args = parser.parse_args()
+
+        # 取得した引数で更新
+        us.REDMINE_API_KEY = args.api_key
+
+        try:
+            exported = export(args.start, args.end, args.output_dir, args.format, args.gzip, args.source, tuple(args.kinds))
+        except Exception as e:
+            print(f'エクスポートエラー: {e}')
+        else:
+            for kind, output in exported.items():
+                print(f'{kind}: {output["rows"]}行 -> {output["path"]}')
+
+    except SystemExit:
+        # 引数不足などで終了した場合
+        pass
@@ -0,0 +1,142 @@
+"""
+JSONレスポンスを逐次デコードするモジュール
+一覧APIのレスポンス ({"一覧キー": [...], "total_count": ...}) から、一覧の要素を受信しながら1件ずつ取り出す
+"""
+
+import codecs
+import json
+from collections.abc import Iterable, Iterator
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+
+
+class _Buffer:
+    """受信済みのテキストを保持し、必要に応じて続きを読み込むバッファ"""
+
+    def __init__(self, chunks: Iterable[bytes | str]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self) -> bool:
+        """
+        続きのデータを読み込む
+
+        Returns:
+            読み込めた場合は True、終端に達している場合は False
+        """
+        if self.eof:
+            return False
+        # 処理済みの部分を捨て、バッファが要素1件分程度に収まるようにする
+        self.text = self.text[self.pos :]
+        self.pos = 0
+        for chunk in self._chunks:
+            piece = self._utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if piece:
+                self.text += piece
+                return True
+        self.text += self._utf8.decode(b'', final=True)
+        self.eof = True
+        return False
+
+    def skip_whitespace(self) -> str:
+        """
+        空白を読み飛ばし、次の1文字を返す
+
+        Returns:
+            次の1文字 (終端の場合は空文字)
+        """
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.read_more():
+                return ''
+
+    def expect(self, char: str) -> None:
+        """次の文字が char であることを確認して読み進める"""
+        if self.skip_whitespace() != char:
+            raise ValueError('不正なレスポンス')
+        self.pos += 1
+
+    def decode_value(self) -> object:
+        """
+        次のJSON値を1つデコードする
+
+        値がバッファ末尾で途切れている可能性がある間 (デコード失敗、または末尾ちょうどで終わった数値など) は、
+        続きを読み込んでから再度デコードする。
+
+        Returns:
+            デコードした値
+        """
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.read_more():
+                    raise
+                continue
+            if end == len(self.text) and self.read_more():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array_items(chunks: Iterable[bytes | str], key: str, meta: dict) -> Iterator:
+    """
+    JSONオブジェクトを受信しながら、指定キーの配列の要素を1件ずつ返す
+
+    配列以外のトップレベルの値 (total_count など) は meta に格納する。
+    要素をすべて返し終えた後、レスポンス全体を読み終えた時点で meta が確定する。
+
+    Args:
+        chunks: レスポンス本文のチャンク (bytes は UTF-8 としてデコードする)
+        key: 一覧を格納しているキー
+        meta: 配列以外のトップレベルの値を格納する辞書
+
+    Yields:
+        配列の要素
+    """
+    buf = _Buffer(chunks)
+    found = False
+
+    buf.expect('{')
+    if buf.skip_whitespace() == '}':
+        raise ValueError('不正なレスポンス')
+
+    while True:
+        name = buf.decode_value()
+        buf.expect(':')
+
+        if name == key:
+            # 一覧の配列: 要素を1件ずつデコードして返す
+            buf.expect('[')
+            found = True
+            if buf.skip_whitespace() == ']':
+                buf.pos += 1
+            else:
+                while True:
+                    yield buf.decode_value()
+                    char = buf.skip_whitespace()
+                    buf.pos += 1
+                    if char == ']':
+                        break
+                    if char != ',':
+                        raise ValueError('不正なレスポンス')
+        else:
+            meta[name] = buf.decode_value()
+
+        char = buf.skip_whitespace()
+        buf.pos += 1
+        if char == '}':
+            break
+        if char != ',':
+            raise ValueError('不正なレスポンス')
+
+    if not found:
+        raise ValueError('不正なレスポンス')
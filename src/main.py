@@ -1,32 +1,50 @@
 import argparse
+import datetime
 
-import check_specific_time
-import create_redmine_ticket
+import checkpoint
 import user_setting as us
 
+# 通信や集計を行うモジュール (requests/urllib3・numpy などを読み込む) は、チェックが必要な場合のみ各関数内で読み込む
+# チェック済みで処理がない場合は、これらを読み込まずに終了する
 
-def main() -> None:
-    """メイン処理: 前回チェック日の翌日を対象として、Redmineチケットを作成する"""
-    # 前回のチェック対象日の翌日を取得
-    specific_date = check_specific_time.get_last_target_date()
-    target_date, colect_users, e_users, e_projs = check_specific_time.get_specific_date_time(specific_date)
 
+def _ticket_spec(
+    target_date: str | None,
+    colect_users: dict | None,
+    e_users: dict | None,
+    e_projs: dict | None,
+    project_id: str | None = None,
+) -> tuple | None:
+    """
+    取得したデータを検証し、対象日のチケットの作成内容を返す
+
+    Args:
+        target_date: 対象日付
+        colect_users: プロジェクトメンバー {ID: 名前}
+        e_users: ユーザー別集計 {ID: 時間}
+        e_projs: プロジェクト別集計 {プロジェクト名: 時間}
+        project_id: チケットを作成するプロジェクトID (省略時は TARGET_PROJECT_ID)
+
+    Returns:
+        (対象日付, ターゲットユーザー, ユーザー別集計, プロジェクト別集計, プロジェクトID)、
+        またはデータが取得できていない場合はNone
+    """
     # データの妥当性チェック
     if target_date is None:
         print('エラー: 対象日付が取得できません')
-        return
+        return None
 
     if colect_users is None:
         print('エラー: 対象ユーザーリストが取得できません')
-        return
+        return None
 
     if e_users is None:
         print('エラー: ユーザー別集計が取得できません')
-        return
+        return None
 
     if e_projs is None:
         print('エラー: プロジェクト別集計が取得できません')
-        return
+        return None
 
     # ターゲットユーザーのみを抽出
     target_user = {k: colect_users[k] for k in us.TARGET_LIST if k in colect_users}
@@ -35,23 +53,256 @@ def main() -> None:
     print(f'ターゲットユーザー数: {len(target_user)}')
     print(f'入力済みユーザー数: {len(e_users)}')
 
+    return target_date, target_user, e_users, e_projs, project_id
+
+
+def _write_reports(specs: list[tuple]) -> None:
+    """
+    REPORT_DIR が指定されている場合、チェック結果のレポートをファイルに書き出す
+
+    Args:
+        specs: _ticket_spec が返すチケットの作成内容のリスト
+    """
+    if not us.REPORT_DIR or not specs:
+        return
+
+    import report
+
+    paths = report.write_reports(specs, us.REPORT_DIR, us.REPORT_FORMAT, us.REPORT_SORT, us.REPORT_LIMIT)
+    print(f'レポートを出力しました: {len(paths)}件 ({us.REPORT_DIR})')
+
+
+def _report(
+    target_date: str | None,
+    colect_users: dict | None,
+    e_users: dict | None,
+    e_projs: dict | None,
+    project_id: str | None = None,
+) -> None:
+    """
+    取得したデータを検証し、対象日のRedmineチケットを作成する
+
+    Args:
+        target_date: 対象日付
+        colect_users: プロジェクトメンバー {ID: 名前}
+        e_users: ユーザー別集計 {ID: 時間}
+        e_projs: プロジェクト別集計 {プロジェクト名: 時間}
+        project_id: チケットを作成するプロジェクトID (省略時は TARGET_PROJECT_ID)
+    """
+    spec = _ticket_spec(target_date, colect_users, e_users, e_projs, project_id)
+    if spec is None:
+        return
+    _write_reports([spec])
+
+    import create_redmine_ticket
+
     # Redmineチケットを作成
-    create_redmine_ticket.create_redmine_ticket(target_date, target_user, e_users, e_projs)
+    create_redmine_ticket.create_redmine_ticket(*spec)
+
+
+def _report_all(results: list[tuple]) -> None:
+    """
+    複数の日付・プロジェクトのデータを検証し、チケットをまとめて作成して結果を表示する
+
+    Args:
+        results: (対象日付, プロジェクトメンバー, ユーザー別集計, プロジェクト別集計, プロジェクトID) のリスト
+    """
+    specs = [spec for result in results if (spec := _ticket_spec(*result)) is not None]
+    if not specs:
+        return
+    _write_reports(specs)
+
+    import create_redmine_ticket
+
+    print(f'Redmineチケットを作成中... ({len(specs)}件)')
+    summary = create_redmine_ticket.create_redmine_tickets(specs)
+
+    labels = {'created': '作成', 'existing': '既存', 'failed': '失敗'}
+    for ticket in summary['tickets']:
+        line = f'  {ticket["project_id"]} ({ticket["date"]}): {labels[ticket["status"]]}'
+        if ticket['issue_id'] is not None:
+            line += f' Issue ID: {ticket["issue_id"]}'
+        if ticket['watchers']:
+            line += f' (ウォッチャー追加数: {ticket["watchers"]}名)'
+        if ticket['error']:
+            line += f' {ticket["error"]}'
+        print(line)
+    print(f'チケット作成結果: 作成 {summary["created"]}件 / 既存 {summary["existing"]}件 / 失敗 {summary["failed"]}件')
+
+
+def main_multi_project(project_ids: list, refresh_members: bool = False) -> None:
+    """
+    複数プロジェクトモードのメイン処理: プロジェクトごとに前回チェック日の翌日のチケットを作成する
+
+    作業時間エントリの取得は全プロジェクトで1回にまとめ、チケットはまとめて並行作成する。
+
+    Args:
+        project_ids: 対象プロジェクトIDのリスト
+        refresh_members: True の場合、メンバーキャッシュを使わずに再取得する
+    """
+    # 昨日までチェック済みのプロジェクトは対象外とする
+    project_ids = [pid for pid in project_ids if checkpoint.is_pending(us.REDMINE_URL, pid)]
+    if not project_ids:
+        print('全プロジェクトが昨日までチェック済みのため、終了します')
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    import check_specific_time
+
+    with ThreadPoolExecutor(max_workers=us.MAX_WORKERS) as executor:
+        target_dates = dict(zip(project_ids, executor.map(check_specific_time.get_last_target_date, project_ids), strict=True))
+
+    results = check_specific_time.get_projects_date_time(target_dates, refresh_members)
+    if results is None:
+        print('エラー: データ取得に失敗しました')
+        return
+
+    _report_all([(*result, project_id) for project_id, result in results.items() if result is not None])
+
+
+def main(backfill: bool = False, refresh_members: bool = False) -> None:
+    """
+    メイン処理: 前回チェック日の翌日を対象として、Redmineチケットを作成する
+
+    Args:
+        backfill: True の場合、前回チェック日の翌日から昨日までの全日を対象とする
+        refresh_members: True の場合、メンバーキャッシュを使わずに再取得する
+    """
+    if not checkpoint.is_pending(us.REDMINE_URL, us.TARGET_PROJECT_ID):
+        print('昨日までチェック済みのため、終了します')
+        return
+
+    import check_specific_time
+
+    # メンバー取得は対象日付に依存しないため、前回チェック日の検索と並行して開始する
+    members_future = check_specific_time.prefetch_project_members(refresh_members)
+
+    # 前回のチェック対象日の翌日を取得
+    specific_date = check_specific_time.get_last_target_date()
+
+    if backfill:
+        # 未チェックの期間をまとめて取得し、日ごとにチケットを作成する
+        yesterday = datetime.date.today() - datetime.timedelta(days=1)
+        results = check_specific_time.get_date_range_time(specific_date, yesterday, members_future)
+        if results is None:
+            print('エラー: データ取得に失敗しました')
+            return
+
+        _report_all([(*result, us.TARGET_PROJECT_ID) for result in results])
+        return
+
+    _report(*check_specific_time.get_specific_date_time(specific_date, members_future))
+
+
+def main_update(date_str: str | None = None, refresh_members: bool = False) -> None:
+    """
+    更新モードのメイン処理: チェック済みの日のチケットを、後から入力された作業時間に合わせて更新する
+
+    新しいチケットは作成せず、対象日の既存のチェックチケットに変更点のみを反映する。
+
+    Args:
+        date_str: 対象日付 (YYYY-MM-DD形式、省略時は最後にチェックした日)
+        refresh_members: True の場合、メンバーキャッシュを使わずに再取得する
+    """
+    saved = checkpoint.load(us.REDMINE_URL, us.TARGET_PROJECT_ID)
+    if date_str is None:
+        if saved is None:
+            print('エラー: 更新するチェック済みの日がありません')
+            return
+        date_str = saved['last_checked_date']
+
+    import check_specific_time
+    import create_redmine_ticket
+
+    # 対象日のチケットは、チェックポイントになければ Redmine 上で検索する
+    issue_id = saved['tickets'].get(date_str) if saved is not None else None
+    if issue_id is None:
+        try:
+            issue_id = create_redmine_ticket.find_existing_tickets(us.TARGET_PROJECT_ID, [date_str]).get(date_str)
+        except Exception as e:
+            print(f'既存チケットの確認エラー: {e}')
+            return
+    if issue_id is None:
+        print(f'エラー: {date_str} のチェックチケットが見つかりません')
+        return
+
+    members_future = check_specific_time.prefetch_project_members(refresh_members)
+    spec = _ticket_spec(*check_specific_time.get_specific_date_time(datetime.date.fromisoformat(date_str), members_future))
+    if spec is None:
+        return
+
+    create_redmine_ticket.update_redmine_ticket(issue_id, *spec[:4])
 
 
 if __name__ == '__main__':
     # 引数の解析処理
     parser = argparse.ArgumentParser(description='Redmine作業時間チェックツール')
     parser.add_argument('api_key', help='RedmineのAPIキーを指定してください')
+    parser.add_argument('--backfill', action='store_true', help='前回チェック日の翌日から昨日までをまとめてチェックする')
+    parser.add_argument('--refresh-members', action='store_true', help='メンバーキャッシュを使わずに再取得する')
+    parser.add_argument('--multi-project', action='store_true', help='TARGET_PROJECT_IDS の全プロジェクトをまとめてチェックする')
+    parser.add_argument(
+        '--update',
+        nargs='?',
+        const='',
+        type=datetime.date.fromisoformat,
+        metavar='DATE',
+        help='指定日 (省略時は最後にチェックした日) の既存チケットを最新の入力状況に更新する',
+    )
+    parser.add_argument('--daemon', action='store_true', help='常駐し、設定時刻に日次チェックとリマインドを実行する')
+    parser.add_argument('--report-dir', help='チェック結果のレポートをプロジェクト・日付ごとに書き出すディレクトリ')
+    parser.add_argument('--report-format', choices=['textile', 'markdown', 'csv', 'json'], help='レポートの出力形式 (省略時は REPORT_FORMAT)')
+    parser.add_argument('--metrics-report', help='工程ごとの所要時間とHTTP通信の実行レポート (JSON) の出力先')
+    parser.add_argument('--metrics-textfile', help='Prometheus の textfile collector 向けファイルの出力先')
 
     try:
         args = parser.parse_args()
 
         # 取得した引数で更新
         us.REDMINE_API_KEY = args.api_key
+        if args.report_dir:
+            us.REPORT_DIR = args.report_dir
+        if args.report_format:
+            us.REPORT_FORMAT = args.report_format
+        if args.metrics_report:
+            us.METRICS_REPORT_PATH = args.metrics_report
+        if args.metrics_textfile:
+            us.METRICS_TEXTFILE_PATH = args.metrics_textfile
+
+        if args.daemon:
+            import functools
+
+            import daemon
+
+            # 常駐モード: 計測は実行ごとに行う
+            if args.multi_project:
+                daily_check = functools.partial(main_multi_project, us.TARGET_PROJECT_IDS, refresh_members=args.refresh_members)
+                project_ids = us.TARGET_PROJECT_IDS
+            else:
+                daily_check = functools.partial(main, backfill=args.backfill, refresh_members=args.refresh_members)
+                project_ids = [us.TARGET_PROJECT_ID]
+            daemon.Daemon(daily_check, project_ids).run()
+
+        else:
+            # 出力先が指定されている場合のみ計測する
+            measure = bool(us.METRICS_REPORT_PATH or us.METRICS_TEXTFILE_PATH)
+            if measure:
+                import metrics
+
+                metrics.start()
 
-        # メイン処理実行
-        main()
+            # メイン処理実行
+            try:
+                if args.update is not None:
+                    main_update(args.update.isoformat() if args.update else None, refresh_members=args.refresh_members)
+                elif args.multi_project:
+                    main_multi_project(us.TARGET_PROJECT_IDS, refresh_members=args.refresh_members)
+                else:
+                    main(backfill=args.backfill, refresh_members=args.refresh_members)
+            finally:
+                if measure:
+                    metrics.finish(us.METRICS_REPORT_PATH, us.METRICS_TEXTFILE_PATH)
 
     except SystemExit:
         # 引数不足などで終了した場合
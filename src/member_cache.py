@@ -0,0 +1,110 @@
+"""
+プロジェクトメンバーのローカルキャッシュを管理するモジュール
+RedmineのURLとプロジェクトIDごとにメンバー一覧をファイルへ保存する
+"""
+
+import hashlib
+import os
+import time
+
+import atomic_file
+import user_setting as us
+
+
+def _cache_path(redmine_url: str, project_id: str) -> str:
+    """
+    キャッシュファイルのパスを返す
+
+    Args:
+        redmine_url: RedmineのURL
+        project_id: プロジェクトID
+
+    Returns:
+        キャッシュファイルのパス
+    """
+    key = hashlib.sha256(f'{redmine_url.rstrip("/")}|{project_id}'.encode()).hexdigest()[:16]
+    return os.path.join(us.CACHE_DIR, f'members_{key}.json')
+
+
+def load(redmine_url: str, project_id: str) -> dict | None:
+    """
+    キャッシュを読み込む
+
+    Args:
+        redmine_url: RedmineのURL
+        project_id: プロジェクトID
+
+    Returns:
+        {'members': {ユーザーID: ユーザー名}, 'etags': [ページごとのETag], 'limit': 取得時の1ページ件数,
+        'fetched_at': 取得(再検証)時刻} の辞書、またはキャッシュがない・壊れている場合はNone
+    """
+    data = atomic_file.read_json(_cache_path(redmine_url, project_id))
+    if data is None or data.get('redmine_url') != redmine_url or data.get('project_id') != project_id:
+        return None
+
+    try:
+        # JSON のキーは文字列になるため、[ID, 名前] の組で保存している
+        members = {int(uid): str(name) for uid, name in data['members']}
+        fetched_at = float(data['fetched_at'])
+    except (KeyError, TypeError, ValueError):
+        # 項目が欠けている・形式が異なるキャッシュは、ないものとして再取得させる
+        return None
+    etags = data.get('etags')
+
+    return {
+        'members': members,
+        'etags': etags if isinstance(etags, list) else [],
+        'limit': data.get('limit'),
+        'fetched_at': fetched_at,
+    }
+
+
+def save(redmine_url: str, project_id: str, members: dict, etags: list) -> None:
+    """
+    キャッシュを保存する (保存に失敗しても処理は継続する)
+
+    Args:
+        redmine_url: RedmineのURL
+        project_id: プロジェクトID
+        members: {ユーザーID: ユーザー名} の辞書
+        etags: memberships.json のページごとのETag (取得できなかったページは None)
+    """
+    data = {
+        'redmine_url': redmine_url,
+        'project_id': project_id,
+        'fetched_at': time.time(),
+        'limit': us.PAGE_LIMIT,
+        'etags': etags,
+        'members': list(members.items()),
+    }
+    try:
+        atomic_file.write_json_atomic(_cache_path(redmine_url, project_id), data)
+    except OSError as e:
+        print(f'メンバーキャッシュ保存エラー: {e}')
+
+
+def is_fresh(cache: dict) -> bool:
+    """
+    キャッシュが有効期限内かどうかを判定する
+
+    Args:
+        cache: load で読み込んだキャッシュ
+
+    Returns:
+        有効期限内であれば True
+    """
+    fetched_at: float = cache['fetched_at']
+    return time.time() - fetched_at < us.MEMBER_CACHE_TTL
+
+
+def can_revalidate(cache: dict) -> bool:
+    """
+    キャッシュを条件付きリクエストで再検証できるかどうかを判定する
+
+    Args:
+        cache: load で読み込んだキャッシュ
+
+    Returns:
+        全ページのETagがあり、ページ分割が現在の設定と同じであれば True
+    """
+    return cache['limit'] == us.PAGE_LIMIT and bool(cache['etags']) and all(cache['etags'])
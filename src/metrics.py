@@ -0,0 +1,358 @@
+"""
+処理時間と HTTP 通信の計測を行うモジュール
+工程ごとの所要時間と Redmine API へのリクエスト (応答時間・受信バイト数・ステータス) を記録し、
+JSON の実行レポートおよび Prometheus の textfile collector 形式のファイルとして出力する
+計測を開始していない間は何も記録せず、計測箇所の負荷は有効かどうかの判定1回のみとなる
+"""
+
+import datetime
+import functools
+import re
+import threading
+import time
+import weakref
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import atomic_file
+
+# Prometheus のメトリクス名の接頭辞
+PROMETHEUS_PREFIX = 'redmine_monitor'
+
+# エンドポイント名に含めない数値ID (/groups/12.json → /groups/:id.json)
+_ID_PATTERN = re.compile(r'/\d+(?=[/.]|$)')
+
+
+class _Run:
+    """1回の実行で記録した計測値"""
+
+    def __init__(self) -> None:
+        self.started_at = datetime.datetime.now(datetime.UTC)
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.phases: list[dict] = []
+        self.requests: list[dict] = []
+        self.plans: list[dict] = []
+        # ストリーミング受信中のレスポンスと、受信完了時に受信バイト数を書き込む記録
+        self.streams: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+_run: _Run | None = None
+
+
+def start() -> None:
+    """計測を開始する (記録済みの内容は破棄する)"""
+    global _run
+    _run = _Run()
+
+
+def is_enabled() -> bool:
+    """計測中であれば True を返す"""
+    return _run is not None
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    with ブロックの所要時間を工程として記録する
+
+    Args:
+        name: 工程名
+    """
+    run = _run
+    if run is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        record = {
+            'name': name,
+            'thread': threading.current_thread().name,
+            'start': started - run.started,
+            'seconds': time.perf_counter() - started,
+            'ok': ok,
+        }
+        with run.lock:
+            run.phases.append(record)
+
+
+def timed(name: str) -> Callable:
+    """
+    関数の所要時間を工程として記録するデコレーター
+
+    計測していない場合は元の関数をそのまま呼び出す。
+
+    Args:
+        name: 工程名
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _run is None:
+                return func(*args, **kwargs)
+            with phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def endpoint(path: str) -> str:
+    """
+    リクエストのパスから集計に使うエンドポイント名を求める
+
+    Args:
+        path: RedmineのURLからの相対パス
+
+    Returns:
+        数値IDを :id に置き換えたパス
+    """
+    return _ID_PATTERN.sub('/:id', path)
+
+
+def _received_bytes(resp: Any) -> int | None:
+    """レスポンスの受信済みバイト数 (圧縮されている場合は圧縮後のサイズ) を返す"""
+    tell = getattr(getattr(resp, 'raw', None), 'tell', None)
+    return tell() if callable(tell) else None
+
+
+def record_request(
+    method: str,
+    path: str,
+    params: dict | None,
+    resp: Any,
+    seconds: float,
+    error: BaseException | None = None,
+    attempt: int = 0,
+    stream: bool = False,
+    hedge: bool = False,
+) -> None:
+    """
+    Redmine API へのリクエストを1件記録する
+
+    stream=True のレスポンスは本文の受信前に呼ばれるため、受信バイト数は finish_stream で記録する。
+
+    Args:
+        method: HTTPメソッド
+        path: RedmineのURLからの相対パス
+        params: クエリパラメータ
+        resp: レスポンス (例外発生時は None)
+        seconds: リクエスト送信からレスポンスヘッダー受信までの秒数
+        error: 発生した例外
+        attempt: 再試行の回数 (初回は 0)
+        stream: レスポンス本文をストリーミングで受信するかどうか
+        hedge: 応答の遅いリクエストを複製して送ったもの (ヘッジ) かどうか
+    """
+    run = _run
+    if run is None:
+        return
+
+    record = {
+        'method': method,
+        'endpoint': endpoint(path),
+        'status': None if resp is None else resp.status_code,
+        'seconds': seconds,
+        'bytes': None if resp is None or stream else _received_bytes(resp),
+        'page': params is not None and 'offset' in params,
+        'attempt': attempt,
+        'hedge': hedge,
+        'error': None if error is None else type(error).__name__,
+    }
+    with run.lock:
+        run.requests.append(record)
+        if stream and resp is not None:
+            run.streams[resp] = record
+
+
+def finish_stream(resp: Any) -> None:
+    """
+    ストリーミングで受信したレスポンスの受信バイト数を記録する
+
+    Args:
+        resp: 本文を読み終えたレスポンス
+    """
+    run = _run
+    if run is None:
+        return
+
+    with run.lock:
+        record = run.streams.pop(resp, None)
+    if record is not None:
+        record['bytes'] = _received_bytes(resp)
+
+
+def record_plan(target: str, chosen: str, estimates: dict[str, dict], probes: int) -> None:
+    """
+    取得計画の選択結果を記録する
+
+    Args:
+        target: 取得対象 (例: 'time_entries')
+        chosen: 選択した取得方法
+        estimates: {取得方法: {'rows': 見積もり件数, 'requests': 見積もりリクエスト数}}
+        probes: 見積もりのために送った件数問い合わせの数
+    """
+    run = _run
+    if run is None:
+        return
+
+    record = {'target': target, 'chosen': chosen, 'estimates': estimates, 'probes': probes}
+    with run.lock:
+        run.plans.append(record)
+
+
+def _percentile(values: list[float], ratio: float) -> float:
+    """昇順に並んだ値の百分位数 (最近傍法) を返す"""
+    return values[min(len(values) - 1, int(ratio * len(values)))]
+
+
+def report() -> dict | None:
+    """
+    記録した内容を実行レポートにまとめる
+
+    Returns:
+        実行レポート、または計測していない場合はNone
+    """
+    run = _run
+    if run is None:
+        return None
+
+    with run.lock:
+        phases = list(run.phases)
+        requests = [dict(r) for r in run.requests]
+        plans = list(run.plans)
+
+    phase_totals: dict[str, dict] = {}
+    for p in phases:
+        total = phase_totals.setdefault(p['name'], {'calls': 0, 'seconds': 0.0})
+        total['calls'] += 1
+        total['seconds'] += p['seconds']
+
+    endpoints: dict[str, dict] = {}
+    latencies: dict[str, list[float]] = {}
+    for r in requests:
+        summary = endpoints.setdefault(
+            r['endpoint'],
+            {'requests': 0, 'pages': 0, 'retries': 0, 'hedges': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0, 'statuses': {}},
+        )
+        summary['requests'] += 1
+        summary['pages'] += r['page']
+        summary['retries'] += r['attempt'] > 0
+        summary['hedges'] += r['hedge']
+        summary['bytes'] += r['bytes'] or 0
+        summary['seconds'] += r['seconds']
+        if r['status'] is None:
+            summary['errors'] += 1
+        else:
+            status = str(r['status'])
+            summary['statuses'][status] = summary['statuses'].get(status, 0) + 1
+        latencies.setdefault(r['endpoint'], []).append(r['seconds'])
+
+    for name, values in latencies.items():
+        values.sort()
+        endpoints[name].update({'p50_seconds': _percentile(values, 0.5), 'p95_seconds': _percentile(values, 0.95), 'max_seconds': values[-1]})
+
+    return {
+        'started_at': run.started_at.isoformat(),
+        'duration_seconds': time.perf_counter() - run.started,
+        'phases': phases,
+        'phase_totals': phase_totals,
+        'endpoints': endpoints,
+        'requests': requests,
+        'plans': plans,
+    }
+
+
+def _label_value(value: str) -> str:
+    """Prometheus のラベル値をエスケープする"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def to_prometheus(run_report: dict) -> str:
+    """
+    実行レポートを Prometheus の textfile collector 形式に変換する
+
+    ファイルは実行ごとに上書きするため、値はすべて直近の実行1回分の gauge として出力する。
+
+    Args:
+        run_report: report() が返す実行レポート
+
+    Returns:
+        textfile collector 形式の文字列
+    """
+    lines: list[str] = []
+
+    def metric(name: str, help_text: str, samples: list[tuple[dict, float]]) -> None:
+        full_name = f'{PROMETHEUS_PREFIX}_{name}'
+        lines.append(f'# HELP {full_name} {help_text}')
+        lines.append(f'# TYPE {full_name} gauge')
+        for labels, value in samples:
+            label_text = ','.join(f'{k}="{_label_value(v)}"' for k, v in labels.items())
+            lines.append(f'{full_name}{{{label_text}}} {value}' if label_text else f'{full_name} {value}')
+
+    started_at = datetime.datetime.fromisoformat(run_report['started_at'])
+    metric('last_run_timestamp_seconds', '直近の実行の開始時刻 (UNIX時間)', [({}, started_at.timestamp())])
+    metric('run_duration_seconds', '直近の実行の所要時間', [({}, run_report['duration_seconds'])])
+
+    phase_totals = run_report['phase_totals']
+    metric('phase_duration_seconds', '工程ごとの所要時間の合計', [({'phase': n}, t['seconds']) for n, t in phase_totals.items()])
+    metric('phase_calls', '工程ごとの実行回数', [({'phase': n}, t['calls']) for n, t in phase_totals.items()])
+
+    endpoints = run_report['endpoints']
+    metric(
+        'http_requests',
+        'エンドポイント・ステータスごとのリクエスト数 (status="error" は応答なし)',
+        [
+            ({'endpoint': n, 'status': status}, count)
+            for n, s in endpoints.items()
+            for status, count in {**s['statuses'], 'error': s['errors']}.items()
+            if count
+        ],
+    )
+    metric('http_request_duration_seconds', 'エンドポイントごとの応答時間の合計', [({'endpoint': n}, s['seconds']) for n, s in endpoints.items()])
+    metric(
+        'http_request_duration_p95_seconds',
+        'エンドポイントごとの応答時間の95パーセンタイル',
+        [({'endpoint': n}, s['p95_seconds']) for n, s in endpoints.items()],
+    )
+    metric('http_response_bytes', 'エンドポイントごとの受信バイト数', [({'endpoint': n}, s['bytes']) for n, s in endpoints.items()])
+    metric('http_pages', 'エンドポイントごとの一覧ページの取得数', [({'endpoint': n}, s['pages']) for n, s in endpoints.items()])
+    metric('http_retries', 'エンドポイントごとの再試行の回数', [({'endpoint': n}, s['retries']) for n, s in endpoints.items()])
+    metric('http_hedges', 'エンドポイントごとのヘッジリクエストの数', [({'endpoint': n}, s['hedges']) for n, s in endpoints.items()])
+
+    return '\n'.join(lines) + '\n'
+
+
+def finish(report_path: str | None = None, textfile_path: str | None = None) -> dict | None:
+    """
+    計測を終了し、実行レポートを出力する
+
+    Args:
+        report_path: 実行レポート (JSON) の出力先
+        textfile_path: Prometheus の textfile collector 向けファイルの出力先
+
+    Returns:
+        実行レポート、または計測していない場合はNone
+    """
+    global _run
+
+    run_report = report()
+    _run = None
+    if run_report is None:
+        return None
+
+    try:
+        if report_path:
+            atomic_file.write_json_atomic(report_path, run_report)
+        if textfile_path:
+            atomic_file.write_text_atomic(textfile_path, to_prometheus(run_report))
+    except OSError as e:
+        print(f'計測結果の出力エラー: {e}')
+    return run_report
@@ -0,0 +1,545 @@
+"""
+Redmine APIへの接続を管理するモジュール
+1つのセッションを全モジュールで共有し、Keep-Alive によりコネクション(TLSセッション)を再利用する
+"""
+
+import datetime
+import email.utils
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any
+
+import json_stream
+import metrics
+import user_setting as us
+
+if TYPE_CHECKING:
+    import requests  # type: ignore
+    from requests import Response  # type: ignore  # 他モジュールの型注釈用
+
+# ストリーミング受信時に1回で読み込むバイト数
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+# 過負荷・一時的な障害を表し、再試行の対象とするステータスコード
+_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# 再試行してよい (冪等な) メソッド
+_IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD'})
+
+
+class RequestBudgetExceededError(RuntimeError):
+    """1回の実行で送信できるリクエスト数の上限に達したことを表す例外"""
+
+
+def _retry_after_seconds(resp: 'requests.Response') -> float | None:
+    """
+    Retry-After ヘッダーから待機秒数を求める
+
+    Args:
+        resp: レスポンス
+
+    Returns:
+        待機秒数 (秒数・HTTP日付のいずれの形式にも対応)、またはヘッダーがない・解析できない場合はNone
+    """
+    value = resp.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        until = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=datetime.UTC)
+    return max(0.0, (until - datetime.datetime.now(datetime.UTC)).total_seconds())
+
+
+def _backoff_seconds(attempt: int) -> float:
+    """再試行までの待機秒数 (指数バックオフの範囲内でランダムに分散させる)"""
+    return random.uniform(0, min(us.HTTP_BACKOFF_MAX, us.HTTP_BACKOFF_BASE * 2**attempt))
+
+
+class ConcurrencyLimiter:
+    """
+    同時に送信するリクエスト数を AIMD (加算増加・乗算減少) で調整するリミッター
+
+    正常な応答が続く間は上限を1往復あたり約1ずつ増やし、429/503 などの過負荷の応答、
+    接続エラー、閾値を超える応答時間を検知すると上限を半分にする。
+    同時に送信していたリクエストの失敗で何度も減らさないよう、減少は前回の減少以降に
+    送信したリクエストの結果でのみ行う。
+    Retry-After を受け取った場合は、その時刻 (HTTP_BACKOFF_MAX 秒後まで) 全スレッドの新規送信を止める。
+    """
+
+    def __init__(self, initial: int, maximum: int, latency_threshold: float) -> None:
+        """
+        Args:
+            initial: 同時リクエスト数の初期値
+            maximum: 同時リクエスト数の上限
+            latency_threshold: 過負荷とみなす応答時間 (秒)
+        """
+        self.maximum = max(1, maximum)
+        self.limit = float(min(max(1, initial), self.maximum))
+        self.latency_threshold = latency_threshold
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> float:
+        """
+        送信枠が空くまで待機して確保する
+
+        Returns:
+            確保した時刻 (release に渡す)
+        """
+        with self._cond:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self._in_flight < int(self.limit):
+                    self._in_flight += 1
+                    return time.monotonic()
+                self._cond.wait(wait if wait > 0 else None)
+
+    def release(self, started: float, overloaded: bool) -> None:
+        """
+        送信枠を返却し、結果に応じて上限を調整する
+
+        Args:
+            started: acquire が返した時刻
+            overloaded: 過負荷の応答または接続エラーであれば True
+        """
+        now = time.monotonic()
+        with self._cond:
+            self._in_flight -= 1
+            if overloaded or now - started > self.latency_threshold:
+                if started >= self._last_decrease:
+                    self.limit = max(1.0, self.limit / 2)
+                    self._last_decrease = now
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def try_acquire(self) -> float | None:
+        """
+        送信枠が空いていれば待たずに確保する
+
+        Returns:
+            確保した時刻 (release に渡す)、または空きがない場合はNone
+        """
+        with self._cond:
+            if self._paused_until > time.monotonic() or self._in_flight >= int(self.limit):
+                return None
+            self._in_flight += 1
+            return time.monotonic()
+
+    def pause(self, seconds: float) -> None:
+        """
+        指定秒数の間、新規の送信を止める
+
+        Args:
+            seconds: 停止する秒数
+        """
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class HedgePolicy:
+    """
+    ヘッジリクエスト (応答が遅い GET の複製) を送るまでの待ち時間と、送れる数を管理する
+
+    待ち時間はエンドポイントごとの直近の応答時間の上位パーセンタイルとし、
+    十分な数の応答時間を観測するまではヘッジしない。
+    ヘッジの数は通常のリクエスト数に対する割合 (max_ratio) までに抑える。
+    """
+
+    # 応答時間を保持する件数 (エンドポイントごと)
+    WINDOW = 200
+
+    # 連続して送れるヘッジの最大数
+    MAX_BURST = 5.0
+
+    def __init__(self, percentile: float, min_samples: int, min_delay: float, max_ratio: float) -> None:
+        """
+        Args:
+            percentile: 待ち時間とする応答時間のパーセンタイル (0.0 ~ 1.0)
+            min_samples: ヘッジを始めるのに必要な応答時間の観測数
+            min_delay: 待ち時間の下限 (秒)
+            max_ratio: 通常のリクエスト数に対するヘッジの割合の上限
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self._latencies: dict[str, deque] = {}
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, seconds: float) -> None:
+        """
+        通常のリクエストの応答時間を記録し、ヘッジを送れる数を増やす
+
+        Args:
+            key: エンドポイント名
+            seconds: 応答時間
+        """
+        with self._lock:
+            samples = self._latencies.get(key)
+            if samples is None:
+                samples = self._latencies[key] = deque(maxlen=self.WINDOW)
+            samples.append(seconds)
+            self._tokens = min(self.MAX_BURST, self._tokens + self.max_ratio)
+
+    def delay(self, key: str) -> float | None:
+        """
+        ヘッジを送るまでの待ち時間を返す
+
+        Args:
+            key: エンドポイント名
+
+        Returns:
+            待ち時間 (秒)、または観測数が足りない場合はNone
+        """
+        with self._lock:
+            samples = sorted(self._latencies.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return max(self.min_delay, float(samples[min(len(samples) - 1, int(self.percentile * len(samples)))]))
+
+    def try_spend(self) -> bool:
+        """ヘッジを1つ送れる場合は枠を消費して True を返す"""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def refund(self) -> None:
+        """消費した枠を戻す (ヘッジを送らなかった場合)"""
+        with self._lock:
+            self._tokens = min(self.MAX_BURST, self._tokens + 1)
+
+
+def _discard(future: Future) -> None:
+    """使わなかったリクエストを取り消す (実行中の場合は完了時にレスポンスを閉じて接続を解放する)"""
+    if future.cancel():
+        return
+
+    def close(done: Future) -> None:
+        if done.exception() is None:
+            done.result().close()
+
+    future.add_done_callback(close)
+
+
+class RedmineClient:
+    """
+    Redmine API 用の HTTP クライアント
+
+    認証ヘッダーや証明書検証の設定はセッションに一度だけ設定し、
+    各リクエストはコネクションプールを通して送信する。
+    同時リクエスト数は ConcurrencyLimiter で調整し、GET は一時的な障害の際に再試行する。
+    HTTP_HEDGE_ENABLED の場合、応答が遅い GET は HedgePolicy に従って複製して送り、先に返った応答を使う。
+    送信枠は元のリクエスト・ヘッジともに、使わなかった側も含めて送信が完了した時点で返却する。
+    送信したリクエスト数 (再試行を含む) が上限に達した場合は RequestBudgetExceededError を送出する。
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        pool_size: int | None = None,
+        timeout: float | tuple[float, float] | None = None,
+    ) -> None:
+        """
+        Args:
+            base_url: RedmineのURL
+            api_key: RedmineのAPIキー
+            pool_size: 同時に保持するコネクション数 (省略時は設定値)
+            timeout: リクエストごとのタイムアウト秒数 (接続, 読み込み) (省略時は設定値)
+        """
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = us.HTTP_TIMEOUT if timeout is None else timeout
+
+        # requests/urllib3 は読み込みに時間がかかるため、モジュールの読み込み時ではなく
+        # 通信が必要になった時点 (クライアントの生成時) で読み込む
+        import requests  # type: ignore
+        import urllib3
+        from requests.adapters import HTTPAdapter  # type: ignore
+
+        # 自己署名証明書の警告(InsecureRequestWarning)を非表示にする設定
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+        # 再試行の対象とする例外 (接続エラー・タイムアウト)
+        self._transient_errors = (requests.ConnectionError, requests.Timeout)
+
+        self.session = requests.Session()
+        self.session.headers.update(
+            {
+                'X-Redmine-API-Key': api_key,
+                'Accept': 'application/json',
+                'Accept-Encoding': 'gzip, deflate',
+                'Connection': 'keep-alive',
+            }
+        )
+        # 自己署名証明書のため検証しない
+        self.session.verify = False
+
+        # 並列取得時もコネクションを使い回せるよう、保持する接続数をワーカー数に合わせる
+        # ストリーミング受信中のレスポンスは接続を占有するため、上限を超えた分は待たずに一時的な接続を使う
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=us.HTTP_POOL_SIZE if pool_size is None else pool_size,
+            pool_block=False,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.limiter = ConcurrencyLimiter(us.HTTP_CONCURRENCY_INITIAL, us.HTTP_CONCURRENCY_MAX, us.HTTP_LATENCY_THRESHOLD)
+        self.request_budget: int | None = us.HTTP_REQUEST_BUDGET
+        self.requests_sent = 0
+        self._budget_lock = threading.Lock()
+
+        self.hedge: HedgePolicy | None = None
+        self._hedge_executor: ThreadPoolExecutor | None = None
+        if us.HTTP_HEDGE_ENABLED:
+            self.hedge = HedgePolicy(us.HTTP_HEDGE_PERCENTILE, us.HTTP_HEDGE_MIN_SAMPLES, us.HTTP_HEDGE_MIN_DELAY, us.HTTP_HEDGE_MAX_RATIO)
+            # 元のリクエストとヘッジを並行して待つためのスレッド
+            # 送信中のリクエストは送信枠を確保しているため、同時に使うスレッドは同時リクエスト数の上限までに収まる
+            self._hedge_executor = ThreadPoolExecutor(max_workers=2 * us.HTTP_CONCURRENCY_MAX, thread_name_prefix='hedge')
+
+    def _try_consume_budget(self) -> bool:
+        """リクエスト数が上限未満であれば送信数を1増やして True を返す"""
+        with self._budget_lock:
+            if self.request_budget is not None and self.requests_sent >= self.request_budget:
+                return False
+            self.requests_sent += 1
+            return True
+
+    def _consume_budget(self) -> None:
+        """リクエスト数の上限を確認し、送信数を1増やす"""
+        if not self._try_consume_budget():
+            raise RequestBudgetExceededError(f'リクエスト数が上限 ({self.request_budget}) に達しました')
+
+    def _send(self, method: str, path: str, attempt: int, kwargs: dict, hedge: bool = False) -> 'requests.Response':
+        """リクエストを1回送信する (計測中は結果を記録する)"""
+        if not metrics.is_enabled():
+            return self.session.request(method, f'{self.base_url}{path}', **kwargs)
+
+        started = time.perf_counter()
+        try:
+            resp = self.session.request(method, f'{self.base_url}{path}', **kwargs)
+        except Exception as e:
+            metrics.record_request(method, path, kwargs.get('params'), None, time.perf_counter() - started, error=e, attempt=attempt, hedge=hedge)
+            raise
+        metrics.record_request(
+            method, path, kwargs.get('params'), resp, time.perf_counter() - started, attempt=attempt, stream=bool(kwargs.get('stream')), hedge=hedge
+        )
+        return resp
+
+    def _send_acquired(self, method: str, path: str, attempt: int, kwargs: dict, started: float, hedge: bool = False) -> 'requests.Response':
+        """
+        確保済みの送信枠でリクエストを1回送信し、完了時 (失敗時を含む) に送信枠を返却する
+
+        Args:
+            method: HTTPメソッド
+            path: RedmineのURLからの相対パス
+            attempt: 再試行の回数 (初回は0)
+            kwargs: requests に渡す追加オプション
+            started: limiter が送信枠を確保した時刻
+            hedge: ヘッジであれば True
+
+        Returns:
+            レスポンス
+        """
+        try:
+            resp = self._send(method, path, attempt, kwargs, hedge=hedge)
+        except self._transient_errors:
+            self.limiter.release(started, overloaded=True)
+            raise
+        except BaseException:
+            self.limiter.release(started, overloaded=False)
+            raise
+        self.limiter.release(started, resp.status_code in _RETRY_STATUSES)
+        return resp
+
+    def _send_observed(self, policy: HedgePolicy, method: str, path: str, attempt: int, kwargs: dict, started: float) -> 'requests.Response':
+        """確保済みの送信枠でリクエストを1回送信し、応答時間をヘッジの待ち時間の算出に使う"""
+        sent = time.perf_counter()
+        resp = self._send_acquired(method, path, attempt, kwargs, started)
+        policy.observe(metrics.endpoint(path), time.perf_counter() - sent)
+        return resp
+
+    def _send_hedged(self, method: str, path: str, attempt: int, kwargs: dict, started: float) -> 'requests.Response':
+        """
+        確保済みの送信枠で GET を送信し、待ち時間を過ぎても応答がなければ同じリクエストをもう1つ送る
+
+        先に返った応答を使い、もう一方は取り消す (送信済みの場合は完了後に接続ごと破棄する)。
+        使わなかった側も送信枠は完了するまで返却しないため、遅いリクエストが残っている間は
+        同時リクエスト数に数えられ、ConcurrencyLimiter の上限を超えて送信することはない。
+        残ったリクエストも HTTP_TIMEOUT で打ち切られる。
+        ヘッジは送れる数の上限 (HedgePolicy)、同時リクエスト数の空き、リクエスト数の上限の
+        いずれかに余裕がない場合は送らない。
+        """
+        policy, executor = self.hedge, self._hedge_executor
+        if policy is None or executor is None:
+            return self._send_acquired(method, path, attempt, kwargs, started)
+        delay = policy.delay(metrics.endpoint(path))
+        if delay is None:
+            return self._send_observed(policy, method, path, attempt, kwargs, started)
+
+        primary = executor.submit(self._send_observed, policy, method, path, attempt, kwargs, started)
+        done, _ = wait([primary], timeout=delay)
+        if done or not policy.try_spend():
+            return primary.result()
+        hedge_started = self.limiter.try_acquire()
+        if hedge_started is None or not self._try_consume_budget():
+            if hedge_started is not None:
+                self.limiter.release(hedge_started, overloaded=False)
+            policy.refund()
+            return primary.result()
+
+        hedge = executor.submit(self._send_acquired, method, path, attempt, kwargs, hedge_started, True)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winners = [f for f in done if f.exception() is None]
+            if winners:
+                # 同時に完了した場合は元のリクエストを優先する
+                winner = primary if primary in winners else winners[0]
+                for future in {primary, hedge} - {winner}:
+                    _discard(future)
+                return winner.result()
+        # 両方とも失敗した場合は元のリクエストの例外を送出する
+        return primary.result()
+
+    def request(self, method: str, path: str, **kwargs: Any) -> 'requests.Response':
+        """
+        Redmine API にリクエストを送信する
+
+        GET は 429/502/503/504 の応答や接続エラー・タイムアウトの際に HTTP_MAX_RETRIES 回まで再試行する。
+        待機時間は Retry-After があればそれに従い、なければ指数バックオフの範囲でランダムに決める。
+        Retry-After は HTTP_BACKOFF_MAX 秒までとし、極端に長い指定で全スレッドが止まり続けないようにする。
+        再試行しても解消しない場合は最後のレスポンスを返す (接続エラーは例外を送出する)。
+
+        Args:
+            method: HTTPメソッド
+            path: RedmineのURLからの相対パス (例: '/issues.json')
+            **kwargs: requests に渡す追加オプション
+
+        Returns:
+            レスポンス
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        max_retries = us.HTTP_MAX_RETRIES if method in _IDEMPOTENT_METHODS else 0
+
+        attempt = -1
+        while True:
+            attempt += 1
+            self._consume_budget()
+            # 送信枠は送信の完了時に返却される (ヘッジした場合は使わなかったリクエストの完了時)
+            started = self.limiter.acquire()
+            try:
+                if self.hedge is not None and method in _IDEMPOTENT_METHODS:
+                    resp = self._send_hedged(method, path, attempt, kwargs, started)
+                else:
+                    resp = self._send_acquired(method, path, attempt, kwargs, started)
+            except self._transient_errors as e:
+                if attempt >= max_retries:
+                    raise
+                delay = _backoff_seconds(attempt)
+                print(f'通信エラーのため {delay:.1f} 秒後に再試行します ({attempt + 1}/{max_retries}): {e}')
+                time.sleep(delay)
+                continue
+
+            if resp.status_code not in _RETRY_STATUSES:
+                return resp
+
+            # Retry-After の間は他のスレッドからの送信も止める
+            retry_after = _retry_after_seconds(resp)
+            if retry_after is not None:
+                retry_after = min(retry_after, us.HTTP_BACKOFF_MAX)
+                self.limiter.pause(retry_after)
+            if attempt >= max_retries:
+                return resp
+
+            resp.close()
+            delay = _backoff_seconds(attempt) if retry_after is None else retry_after
+            print(f'HTTP {resp.status_code} のため {delay:.1f} 秒後に再試行します ({attempt + 1}/{max_retries}): {path}')
+            time.sleep(delay)
+
+    def get(self, path: str, params: dict | None = None, **kwargs: Any) -> 'requests.Response':
+        """GET リクエストを送信する"""
+        return self.request('GET', path, params=params, **kwargs)
+
+    def post(self, path: str, json: dict | None = None, **kwargs: Any) -> 'requests.Response':
+        """POST リクエストを送信する (JSON ボディ)"""
+        return self.request('POST', path, json=json, **kwargs)
+
+    def put(self, path: str, json: dict | None = None, **kwargs: Any) -> 'requests.Response':
+        """PUT リクエストを送信する (JSON ボディ)"""
+        return self.request('PUT', path, json=json, **kwargs)
+
+    def delete(self, path: str, **kwargs: Any) -> 'requests.Response':
+        """DELETE リクエストを送信する"""
+        return self.request('DELETE', path, **kwargs)
+
+    def reset_budget(self) -> None:
+        """送信したリクエスト数を0に戻す (常駐モードで実行ごとに上限を適用するため)"""
+        with self._budget_lock:
+            self.requests_sent = 0
+
+    def close(self) -> None:
+        """保持しているコネクションをすべて閉じる"""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+def iter_json_items(resp: 'requests.Response', key: str, meta: dict) -> Iterator:
+    """
+    一覧APIのレスポンスから一覧の要素を1件ずつ返す
+
+    stream=True で取得したレスポンスを受信しながら逐次デコードする。
+
+    Args:
+        resp: レスポンス
+        key: 一覧を格納しているキー (例: 'time_entries')
+        meta: 一覧以外のトップレベルの値 (total_count など) を格納する辞書
+
+    Yields:
+        一覧の要素
+    """
+    yield from json_stream.iter_array_items(resp.iter_content(chunk_size=_STREAM_CHUNK_SIZE), key, meta)
+    metrics.finish_stream(resp)
+
+
+_client: RedmineClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> RedmineClient:
+    """
+    プロセス内で共有する Redmine クライアントを取得する
+
+    APIキーは起動引数で後から設定されるため、初回呼び出し時に生成する。
+    接続先またはAPIキーが変更されていれば作り直す。
+
+    Returns:
+        共有の Redmine クライアント
+    """
+    global _client
+
+    with _client_lock:
+        if _client is None or _client.base_url != us.REDMINE_URL.rstrip('/') or _client.api_key != us.REDMINE_API_KEY:
+            if _client is not None:
+                _client.close()
+            _client = RedmineClient(us.REDMINE_URL, us.REDMINE_API_KEY)
+        return _client
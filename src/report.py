@@ -0,0 +1,309 @@
+"""
+作業時間入力チェックの結果をレポートとして出力するモジュール
+チケットの説明欄 (Textile) のほか、Markdown・CSV・JSON 形式で出力する
+
+見出しや表の行の書式は読み込み時に str.format のバインド済みメソッドとして用意し、
+1つのバッファーに順に書き込んで文字列を組み立てる。
+多数のプロジェクト・日付のレポートは、ワーカープロセスで並列に生成できる。
+"""
+
+import csv
+import functools
+import io
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from typing import Any
+
+import atomic_file
+import user_setting as us
+
+# 出力形式と、ファイルに書き出す際の拡張子
+FORMATS = {'textile': 'textile', 'markdown': 'md', 'csv': 'csv', 'json': 'json'}
+
+# 表の並び順 (None の場合はメンバー・プロジェクトの取得順)
+SORT_KEYS = ('name', 'hours')
+
+# Textile 形式 (チケットの説明欄) の書式
+_TEXTILE: dict[str, Any] = {
+    'title': 'h3. 対象日: {}\n\n'.format,
+    'heading': 'h4. {}\n\n'.format,
+    'all_entered': 'h4. 全員の入力が完了しています\n',
+    'user_header': '|_. 氏名 |_. 時間 |\n',
+    'project_header': '|_. プロジェクト名 |_. 合計時間 |\n',
+    'missing_row': '|{}|---|'.format,
+    'hours_row': '|{}|{:.2f}|'.format,
+    'omitted_row': '|(他 {}件)| |'.format,
+    'escape': None,
+}
+
+# Markdown 形式の書式
+_MARKDOWN: dict[str, Any] = {
+    'title': '### 対象日: {}\n\n'.format,
+    'heading': '#### {}\n\n'.format,
+    'all_entered': '#### 全員の入力が完了しています\n',
+    'user_header': '| 氏名 | 時間 |\n|---|---:|\n',
+    'project_header': '| プロジェクト名 | 合計時間 |\n|---|---:|\n',
+    'missing_row': '| {} | --- |'.format,
+    'hours_row': '| {} | {:.2f} |'.format,
+    'omitted_row': '| (他 {}件) | |'.format,
+    'escape': lambda text: text.replace('|', '\\|'),
+}
+
+# CSV 形式の列
+CSV_COLUMNS = ('date', 'section', 'name', 'hours')
+
+
+def _tables(
+    target_users: dict, entered_users: dict, entered_projects: dict, sort: str | None, limit: int | None
+) -> tuple[list, list, list, dict[str, int]]:
+    """
+    レポートの表 (未入力者・入力済み者・プロジェクト別集計) の行データを求める
+
+    Args:
+        target_users: チェック対象ユーザー {ID: 名前}
+        entered_users: 入力済みユーザー {ID: 時間}
+        entered_projects: プロジェクト別集計 {プロジェクト名: 時間}
+        sort: 並び順 ('name': 名前順、'hours': 時間の降順、None: 取得順)
+        limit: 各表の最大行数 (None の場合は制限しない)
+
+    Returns:
+        (未入力者の名前のリスト, 入力済み者の (名前, 時間) のリスト, プロジェクトの (名前, 時間) のリスト,
+        表ごとの省略した行数 {'missing' / 'entered' / 'projects': 行数})
+    """
+    missing = [name for uid, name in target_users.items() if uid not in entered_users]
+    entered = [(name, entered_users[uid]) for uid, name in target_users.items() if uid in entered_users]
+    projects = list(entered_projects.items())
+
+    if sort == 'name':
+        missing.sort()
+        entered.sort(key=itemgetter(0))
+        projects.sort(key=itemgetter(0))
+    elif sort == 'hours':
+        # 未入力者には時間がないため名前順とする
+        missing.sort()
+        entered.sort(key=lambda row: (-row[1], row[0]))
+        projects.sort(key=lambda row: (-row[1], row[0]))
+
+    omitted = {}
+    if limit is not None:
+        for key, rows in (('missing', missing), ('entered', entered), ('projects', projects)):
+            if len(rows) > limit:
+                omitted[key] = len(rows) - limit
+                del rows[limit:]
+    return missing, entered, projects, omitted
+
+
+def _render_markup(template: dict, date_str: str, missing: list, entered: list, projects: list, omitted: dict[str, int]) -> str:
+    """
+    Textile / Markdown 形式のレポートを生成する
+
+    Args:
+        template: 書式 (_TEXTILE または _MARKDOWN)
+        date_str: 対象日付
+        missing: 未入力者の名前のリスト
+        entered: 入力済み者の (名前, 時間) のリスト
+        projects: プロジェクトの (名前, 時間) のリスト
+        omitted: 表ごとの省略した行数
+
+    Returns:
+        レポートの文字列
+    """
+    escape = template['escape']
+    if escape is not None:
+        missing = [escape(name) for name in missing]
+        entered = [(escape(name), hours) for name, hours in entered]
+        projects = [(escape(name), hours) for name, hours in projects]
+
+    buffer = io.StringIO()
+    write = buffer.write
+
+    def write_rows(rows: list[str], key: str) -> None:
+        if key in omitted:
+            rows.append(template['omitted_row'](omitted[key]))
+        write('\n'.join(rows))
+        write('\n')
+
+    write(template['title'](date_str))
+
+    # 未入力者セクション
+    if missing or 'missing' in omitted:
+        write(template['heading']('未入力のメンバー'))
+        write('入力お願いします。\n\n')
+        write(template['user_header'])
+        write_rows(list(map(template['missing_row'], missing)), 'missing')
+    else:
+        write(template['all_entered'])
+
+    write('\n')
+
+    # 入力済み者セクション
+    if entered or 'entered' in omitted:
+        write(template['heading']('入力済みのメンバー'))
+        write(template['user_header'])
+        write_rows(list(itertools.starmap(template['hours_row'], entered)), 'entered')
+
+    # プロジェクト別集計セクション
+    if projects or 'projects' in omitted:
+        write('\n')
+        write(template['heading']('プロジェクト別集計'))
+        write(template['project_header'])
+        write_rows(list(itertools.starmap(template['hours_row'], projects)), 'projects')
+
+    return buffer.getvalue()
+
+
+def render_reminder(missing_users: dict) -> str:
+    """
+    未入力者へのリマインドの注記 (Textile 形式) を生成する
+
+    Args:
+        missing_users: まだ入力していないユーザー {ID: 名前}
+
+    Returns:
+        注記の文字列
+    """
+    buffer = io.StringIO()
+    write = buffer.write
+    write(_TEXTILE['heading']('未入力のメンバー (リマインド)'))
+    write('入力お願いします。\n\n')
+    write(_TEXTILE['user_header'])
+    write('\n'.join(map(_TEXTILE['missing_row'], missing_users.values())))
+    write('\n')
+    return buffer.getvalue()
+
+
+def _render_csv(date_str: str, missing: list, entered: list, projects: list) -> str:
+    """CSV 形式のレポートを生成する (1行に1名・1プロジェクト。省略した行は出力しない)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(CSV_COLUMNS)
+    writer.writerows((date_str, 'missing', name, '') for name in missing)
+    writer.writerows((date_str, 'entered', name, f'{hours:.2f}') for name, hours in entered)
+    writer.writerows((date_str, 'project', name, f'{hours:.2f}') for name, hours in projects)
+    return buffer.getvalue()
+
+
+def _render_json(date_str: str, missing: list, entered: list, projects: list, omitted: dict[str, int]) -> str:
+    """JSON 形式のレポートを生成する"""
+    data = {
+        'date': date_str,
+        'missing': missing,
+        'entered': [{'name': name, 'hours': round(hours, 2)} for name, hours in entered],
+        'projects': [{'name': name, 'hours': round(hours, 2)} for name, hours in projects],
+        'omitted': omitted,
+    }
+    return json.dumps(data, ensure_ascii=False)
+
+
+def render(
+    date_str: str,
+    target_users: dict,
+    entered_users: dict,
+    entered_projects: dict,
+    fmt: str = 'textile',
+    sort: str | None = None,
+    limit: int | None = None,
+) -> str:
+    """
+    1日分のチェック結果のレポートを生成する
+
+    既定 (Textile・取得順・行数制限なし) の出力はチケットの説明欄と同じ内容になる。
+
+    Args:
+        date_str: 対象日付 (YYYY-MM-DD形式)
+        target_users: チェック対象ユーザー {ID: 名前}
+        entered_users: 入力済みユーザー {ID: 時間}
+        entered_projects: プロジェクト別集計 {プロジェクト名: 時間}
+        fmt: 出力形式 (FORMATS のキー)
+        sort: 表の並び順 (SORT_KEYS のいずれか、または None)
+        limit: 各表の最大行数 (超えた分は省略し、Textile / Markdown では省略した件数の行を加える)
+
+    Returns:
+        レポートの文字列
+
+    Raises:
+        ValueError: 出力形式・並び順・最大行数が不正な場合
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'不正な出力形式: {fmt}')
+    if sort is not None and sort not in SORT_KEYS:
+        raise ValueError(f'不正な並び順: {sort}')
+    if limit is not None and limit < 1:
+        raise ValueError(f'不正な最大行数: {limit}')
+
+    missing, entered, projects, omitted = _tables(target_users, entered_users, entered_projects, sort, limit)
+    if fmt == 'textile':
+        return _render_markup(_TEXTILE, date_str, missing, entered, projects, omitted)
+    if fmt == 'markdown':
+        return _render_markup(_MARKDOWN, date_str, missing, entered, projects, omitted)
+    if fmt == 'csv':
+        return _render_csv(date_str, missing, entered, projects)
+    return _render_json(date_str, missing, entered, projects, omitted)
+
+
+def _render_spec(spec: tuple, fmt: str, sort: str | None, limit: int | None) -> str:
+    """(対象日付, チェック対象ユーザー, 入力済みユーザー, プロジェクト別集計, ...) のレポートを生成する"""
+    date_str, target_users, entered_users, entered_projects = spec[:4]
+    return render(date_str, target_users, entered_users, entered_projects, fmt=fmt, sort=sort, limit=limit)
+
+
+def render_many(specs: list[tuple], fmt: str = 'textile', sort: str | None = None, limit: int | None = None, workers: int | None = None) -> list[str]:
+    """
+    複数のレポートを生成する
+
+    ワーカープロセス数が2以上で、REPORT_PARALLEL_MIN 件以上の場合はワーカープロセスで並列に生成する。
+    1件あたりの生成はプロセス間の受け渡しと同程度に軽いため、並列化が有効なのは
+    メンバー数の多いレポートを大量に生成する場合に限られる (benchmarks/bench_report.py で確認できる)。
+    ワーカーはスレッドを使う親プロセスを fork しないよう spawn で起動する。
+
+    Args:
+        specs: (対象日付, チェック対象ユーザー, 入力済みユーザー, プロジェクト別集計, ...) のリスト
+        fmt: 出力形式
+        sort: 表の並び順
+        limit: 各表の最大行数
+        workers: ワーカープロセス数 (省略時は REPORT_WORKERS。0 の場合は CPU 数)
+
+    Returns:
+        specs の順のレポートの文字列のリスト
+    """
+    render_spec = functools.partial(_render_spec, fmt=fmt, sort=sort, limit=limit)
+    workers = us.REPORT_WORKERS if workers is None else workers
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or len(specs) < us.REPORT_PARALLEL_MIN:
+        return [render_spec(spec) for spec in specs]
+
+    # プロセス間の受け渡しの回数を減らすため、ワーカーごとに数回に分けてまとめて渡す
+    chunksize = max(1, len(specs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return list(executor.map(render_spec, specs, chunksize=chunksize))
+
+
+def write_reports(specs: list[tuple], directory: str, fmt: str, sort: str | None = None, limit: int | None = None) -> list[str]:
+    """
+    レポートを生成し、プロジェクト・日付ごとのファイルに書き出す
+
+    Args:
+        specs: (対象日付, チェック対象ユーザー, 入力済みユーザー, プロジェクト別集計, プロジェクトID) のリスト。
+            プロジェクトIDが None の場合は TARGET_PROJECT_ID とする
+        directory: 出力先のディレクトリ
+        fmt: 出力形式
+        sort: 表の並び順
+        limit: 各表の最大行数
+
+    Returns:
+        書き出したファイルのパスのリスト ({プロジェクトID}_{日付}.{拡張子})
+    """
+    paths = []
+    for spec, text in zip(specs, render_many(specs, fmt, sort, limit), strict=True):
+        path = os.path.join(directory, f'{spec[4] or us.TARGET_PROJECT_ID}_{spec[0]}.{FORMATS[fmt]}')
+        try:
+            atomic_file.write_text_atomic(path, text)
+        except OSError as e:
+            print(f'レポート保存エラー: {e}')
+            continue
+        paths.append(path)
+    return paths
@@ -0,0 +1,124 @@
+"""
+作業時間エントリのレコードを定義するモジュール
+Redmine の JSON 形式のエントリから、モニターが使う項目だけを保持する軽量なレコードに変換する
+"""
+
+from collections.abc import Iterable, Iterator
+
+
+class TimeEntry:
+    """
+    作業時間エントリ
+
+    コメントやカスタムフィールドなど使わない項目は保持せず、入れ子の辞書も平坦にする。
+    __slots__ によりインスタンスごとの辞書を持たないため、JSON の辞書より大幅に小さい。
+    """
+
+    # 並び順はエクスポートの列順・ローカルストアの列順を兼ねるため、名前順にしない
+    __slots__ = (  # noqa: RUF023
+        'id',
+        'spent_on',
+        'hours',
+        'user_id',
+        'user_name',
+        'project_id',
+        'project_name',
+        'activity_id',
+        'activity_name',
+        'issue_id',
+        'updated_on',
+    )
+
+    def __init__(
+        self,
+        id: int,
+        spent_on: str,
+        hours: float,
+        user_id: int,
+        user_name: str | None = None,
+        project_id: int | None = None,
+        project_name: str | None = None,
+        activity_id: int | None = None,
+        activity_name: str | None = None,
+        issue_id: int | None = None,
+        updated_on: str | None = None,
+    ) -> None:
+        self.id = id
+        self.spent_on = spent_on
+        self.hours = hours
+        self.user_id = user_id
+        self.user_name = user_name
+        self.project_id = project_id
+        self.project_name = project_name
+        self.activity_id = activity_id
+        self.activity_name = activity_name
+        self.issue_id = issue_id
+        self.updated_on = updated_on
+
+    def as_tuple(self) -> tuple:
+        """項目を __slots__ の順に並べたタプルを返す"""
+        return tuple([getattr(self, name) for name in self.__slots__])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TimeEntry):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f'TimeEntry(id={self.id}, spent_on={self.spent_on!r}, hours={self.hours}, user_id={self.user_id}, project_name={self.project_name!r})'
+
+
+def from_json(data: dict, strings: dict[str, str]) -> TimeEntry:
+    """
+    Redmine の JSON 形式のエントリをレコードに変換する
+
+    Args:
+        data: Redmine の JSON 形式のエントリ
+        strings: 文字列を共有するための辞書 (同じ取得処理の中で使い回す)
+
+    Returns:
+        作業時間エントリ
+    """
+    user = data['user']
+    project = data.get('project') or {}
+    activity = data.get('activity') or {}
+    issue = data.get('issue') or {}
+    spent_on = data['spent_on']
+    user_name = user.get('name')
+    project_name = project.get('name')
+    activity_name = activity.get('name')
+    # 日付や名前は多くのエントリで同じ値になるため、1つのオブジェクトを共有する
+    intern = strings.setdefault
+
+    return TimeEntry(
+        data['id'],
+        intern(spent_on, spent_on),
+        data['hours'],
+        user['id'],
+        user_name and intern(user_name, user_name),
+        project.get('id'),
+        project_name and intern(project_name, project_name),
+        activity.get('id'),
+        activity_name and intern(activity_name, activity_name),
+        issue.get('id'),
+        data.get('updated_on'),
+    )
+
+
+def decode(items: Iterable[dict]) -> Iterator[TimeEntry]:
+    """
+    Redmine の JSON 形式のエントリを順にレコードに変換する
+
+    文字列の共有は呼び出し1回分 (1回の取得処理) の範囲で行う。
+
+    Args:
+        items: Redmine の JSON 形式のエントリのイテラブル
+
+    Yields:
+        作業時間エントリ
+    """
+    strings: dict[str, str] = {}
+    for data in items:
+        yield from_json(data, strings)
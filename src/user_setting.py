@@ -3,15 +3,159 @@ Redmineタイム監視ツールの設定ファイル
 全体で使用される定数やAPI設定をここに集約する
 """
 
+import os
+
 # === Redmine接続設定 ===
 REDMINE_URL = 'https://your-redmine-url.com'  # RedmineのURL
 REDMINE_API_KEY = 'YOUR_API_KEY'  # RedmineのAPIキー
 
+# === API取得設定 ===
+# 1リクエストあたりの取得件数 (Redmine側の上限は既定で100件)
+PAGE_LIMIT = 100
+
+# 2ページ目以降を並列取得する際の最大ワーカー数
+MAX_WORKERS = 8
+
+# === HTTP接続設定 ===
+# コネクションプールで保持する接続数 (並列取得のワーカー数以上を推奨)
+HTTP_POOL_SIZE = 8
+
+# リクエストごとのタイムアウト秒数 (接続, 読み込み)
+HTTP_TIMEOUT = (5, 30)
+
+# 同時に送信するリクエスト数の初期値と上限
+# 応答状況に応じて 1 ~ 上限の間で自動調整する (過負荷の応答で半減し、正常な応答で少しずつ増やす)
+HTTP_CONCURRENCY_INITIAL = 4
+HTTP_CONCURRENCY_MAX = 8
+
+# 応答時間がこの秒数を超えた場合は過負荷とみなし、同時リクエスト数を減らす
+HTTP_LATENCY_THRESHOLD = 10.0
+
+# GET の再試行回数 (429/502/503/504 の応答、接続エラー、タイムアウトの場合)
+HTTP_MAX_RETRIES = 4
+
+# 再試行までの待機秒数の基準値と上限 (Retry-After がある場合はそちらを優先する。ただし Retry-After も上限までとする)
+HTTP_BACKOFF_BASE = 0.5
+HTTP_BACKOFF_MAX = 30.0
+
+# 1回の実行で送信するリクエスト数の上限 (再試行を含む)。None の場合は無制限
+# 長い期間の取得・エクスポート・常駐実行の途中で止まらないよう、既定では上限を設けない
+HTTP_REQUEST_BUDGET: int | None = None
+
+# True の場合、GET の応答が最近の応答時間の上位パーセンタイルを過ぎても返らなければ
+# 同じリクエストをもう1つ送り、先に返った応答を使う (ヘッジリクエスト)
+HTTP_HEDGE_ENABLED = False
+
+# ヘッジを送るまでの待ち時間とする応答時間のパーセンタイルと、その下限 (秒)
+HTTP_HEDGE_PERCENTILE = 0.95
+HTTP_HEDGE_MIN_DELAY = 0.05
+
+# ヘッジを始めるのに必要な応答時間の観測数 (エンドポイントごと)
+HTTP_HEDGE_MIN_SAMPLES = 20
+
+# 通常のリクエスト数に対するヘッジの割合の上限 (サーバーへの追加の負荷を抑える)
+HTTP_HEDGE_MAX_RATIO = 0.05
+
+# === 作業時間エントリの取得計画設定 ===
+# True の場合、limit=1 の件数問い合わせで取得方法ごとの件数を見積もり、最も安価な方法で取得する
+# (全体 / プロジェクト配下 (ENTRY_QUERY_SCOPE に応じて選ぶ) / メンバーのユーザーIDでの絞り込み)
+ENTRY_QUERY_PLANNER = False
+
+# 集計対象とする作業時間エントリの範囲
+#   'all': メンバーが入力した全プロジェクトのエントリ (従来の動作)
+#   'project': 対象プロジェクト (サブプロジェクトを含む) のエントリのみ
+# ローカルストア使用時は 'all' として扱う
+ENTRY_QUERY_SCOPE = 'all'
+
+# ユーザーIDで絞り込む際に1クエリで指定するユーザー数 (URL長の制限のため分割する)
+USER_FILTER_BATCH_SIZE = 50
+
+# 1リクエストあたりのオーバーヘッドをエントリ件数に換算した値 (取得計画のコスト見積もりに使用)
+PLANNER_REQUEST_COST = 20
+
+# === 集計設定 ===
+# 作業時間エントリの集計方法
+#   'auto': ローカルストア使用時かつ numpy が導入されていれば列指向の集計、それ以外は Python の集計
+#   'numpy': 常に列指向の集計 (numpy が必要)
+#   'python': Python の集計
+AGGREGATION_BACKEND = 'auto'
+
+# === ローカルキャッシュ設定 ===
+# キャッシュファイルの保存先 (リポジトリ直下の .cache)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache')
+
+# プロジェクトメンバーキャッシュの有効期限 (秒)
+# 期限切れ後は条件付きリクエストで再検証し、変更がなければ再ダウンロードしない
+MEMBER_CACHE_TTL = 24 * 60 * 60
+
+# === 作業時間エントリのローカルストア設定 ===
+# True の場合、作業時間エントリを SQLite のローカルストアへ差分同期し、ローカルのデータから集計する
+USE_ENTRY_STORE = False
+
+# 初回同期で取得する過去の日数
+ENTRY_STORE_HISTORY_DAYS = 31
+
+# 削除されたエントリを検出する件数照合の実行間隔 (秒)
+ENTRY_STORE_RECONCILE_INTERVAL = 24 * 60 * 60
+
+# === レポート出力設定 ===
+# 指定した場合、チェック結果のレポートをプロジェクト・日付ごとのファイルとしてこのディレクトリに書き出す
+REPORT_DIR: str | None = None
+
+# レポートの出力形式 ('textile' / 'markdown' / 'csv' / 'json')
+REPORT_FORMAT = 'markdown'
+
+# レポートの表の並び順 ('name': 名前順 / 'hours': 時間の降順 / None: 取得順)
+REPORT_SORT: str | None = None
+
+# レポートの各表の最大行数 (None の場合は制限しない)
+REPORT_LIMIT: int | None = None
+
+# 複数のレポートを生成する際のワーカープロセス数 (1 の場合はプロセスを起動しない、0 の場合は CPU 数)
+# 1件あたりの生成はプロセス間の受け渡しと同程度に軽いため、既定では並列化しない
+REPORT_WORKERS = 1
+
+# この件数以上のレポートをまとめて生成する場合のみワーカープロセスを使う (プロセス起動の負荷を避けるため)
+REPORT_PARALLEL_MIN = 32
+
+# === エクスポート設定 (export.py) ===
+# 出力先のディレクトリ
+EXPORT_DIR = 'export'
+
+# 作業時間エントリを取得・集計する単位の日数 (集計結果はこの日数ごとに書き出すため、保持するのはこの期間分のみ)
+EXPORT_CHUNK_DAYS = 7
+
+# === 計測設定 ===
+# 工程ごとの所要時間と Redmine API へのリクエストを記録した実行レポート (JSON) の出力先
+# None の場合は出力しない (--metrics-report でも指定可能)
+METRICS_REPORT_PATH: str | None = None
+
+# Prometheus の textfile collector 向けファイルの出力先 (例: '/var/lib/node_exporter/textfile/redmine_monitor.prom')
+# None の場合は出力しない (--metrics-textfile でも指定可能)
+# いずれの出力先も指定しない場合は計測自体を行わない
+METRICS_TEXTFILE_PATH: str | None = None
+
+# === 常駐モード設定 (--daemon) ===
+# 日次チェックを実行する時刻 ('HH:MM')
+DAEMON_CHECK_TIMES = ['09:00']
+
+# 直近のチェックチケットに未入力者を注記 (ウォッチャーへ通知) する時刻 ('HH:MM')。空の場合は行わない
+DAEMON_REMINDER_TIMES: list[str] = []
+
+# 最後の実行結果 (所要時間・工程ごとの時間・HTTP 通信の集計) と次回の予定を書き出すステータスファイル
+# None の場合は CACHE_DIR の daemon_status.json
+DAEMON_STATUS_PATH: str | None = None
+
 # === プロジェクト設定 ===
 # 対象プロジェクトの識別子 (URLの projects/ の後ろにある文字列)
 # 例: https://.../projects/system_dev/settings -> 'system_dev'
 TARGET_PROJECT_ID = 'test251115'
 
+# 複数プロジェクトモード (--multi-project) で監視するプロジェクトの識別子
+TARGET_PROJECT_IDS = [
+    TARGET_PROJECT_ID,
+]
+
 # === ターゲットユーザー設定 ===
 # チェック対象のユーザーID(ユーザーは定期的に作業時間を入力すべき対象者)
 TARGET_LIST = [
@@ -29,5 +173,11 @@ TRACKER_ID = 3
 # 親チケットにしたいチケットID
 PARENT_TICKET_ID = 44
 
+# プロジェクトごとの親チケットID (未指定のプロジェクトは PARENT_TICKET_ID を使用)
+PROJECT_PARENT_TICKET_IDS: dict = {}
+
+# 複数の日付・プロジェクトのチケット (バックフィル・複数プロジェクトモード) を並行作成する際の最大ワーカー数
+TICKET_WORKERS = 4
+
 # チケットの件名キーワード
 SUBJECT_KEYWORD = '作業時間入力チェック'
@@ -1,5 +1,6 @@
 """pytest の共通設定とフィクスチャ"""
 
+import json
 import sys
 from pathlib import Path
 from unittest.mock import MagicMock
@@ -9,9 +10,20 @@ import pytest
 # src ディレクトリを Python パスに追加
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
+from fake_redmine import FakeRedmine
+
+import redmine_client
 import user_setting as us
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """ローカルキャッシュの保存先をテストごとの一時ディレクトリにする"""
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(us, 'CACHE_DIR', str(cache_dir))
+    return cache_dir
+
+
 @pytest.fixture
 def mock_redmine_api_key():
     """Redmine API キーのモック設定"""
@@ -21,20 +33,84 @@ def mock_redmine_api_key():
     us.REDMINE_API_KEY = original_key
 
 
+def stub_response(data=None, status_code=200, headers=None):
+    """
+    Redmine のレスポンスのスタブを生成する
+
+    json() と、ストリーミング受信 (stream=True) で使う iter_content() はどちらも data を返し、
+    headers は実際のレスポンスと同じく辞書とする。本文は生成後に json.return_value を設定して変更してもよい。
+    """
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = dict(headers or {})
+    response.json.return_value = data
+    response.raise_for_status.return_value = None
+    response.iter_content.side_effect = lambda chunk_size=1: iter([json.dumps(response.json.return_value).encode('utf-8')])
+    return response
+
+
+class StubRedmineClient:
+    """RedmineClient のローカルスタンドイン (通信を行わず get/post を MagicMock で受ける)"""
+
+    def __init__(self):
+        self.get = MagicMock(return_value=stub_response())
+        self.post = MagicMock(return_value=stub_response())
+
+
+@pytest.fixture
+def make_response():
+    """Redmine のレスポンスのスタブを生成する関数 (stub_response)"""
+    return stub_response
+
+
 @pytest.fixture
-def mock_requests_get(monkeypatch):
-    """requests.get をモック"""
-    mock_get = MagicMock()
-    monkeypatch.setattr('requests.get', mock_get)
-    return mock_get
+def stub_redmine_client(monkeypatch):
+    """共有 Redmine クライアントをスタンドインに差し替える"""
+    stub = StubRedmineClient()
+    monkeypatch.setattr('redmine_client.get_client', lambda: stub)
+    return stub
 
 
 @pytest.fixture
-def mock_requests_post(monkeypatch):
-    """requests.post をモック"""
-    mock_post = MagicMock()
-    monkeypatch.setattr('requests.post', mock_post)
-    return mock_post
+def fake_redmine(monkeypatch):
+    """
+    プロセス内で起動した Redmine スタンドインサーバーに接続先を切り替える
+
+    データ量・遅延・エラー率はテスト内でサーバーの属性を変更して指定する。
+    """
+    with FakeRedmine() as server:
+        monkeypatch.setattr(us, 'REDMINE_URL', server.url)
+        monkeypatch.setattr(us, 'REDMINE_API_KEY', server.api_key)
+        monkeypatch.setattr(us, 'TARGET_PROJECT_ID', server.project_id)
+        yield server
+        # サーバー停止前に、共有クライアントが保持している接続を閉じる
+        if redmine_client._client is not None:
+            redmine_client._client.close()
+
+
+@pytest.fixture
+def mock_requests_get(stub_redmine_client):
+    """Redmine への GET (旧 requests.get) をモック"""
+    return stub_redmine_client.get
+
+
+@pytest.fixture
+def mock_requests_post(stub_redmine_client):
+    """Redmine への POST (旧 requests.post) をモック"""
+    return stub_redmine_client.post
+
+
+@pytest.fixture
+def route_get_responses(mock_requests_get):
+    """GET のレスポンスを呼び出し順ではなくパスの末尾で振り分ける (並行取得で順序が不定になるため)"""
+
+    def route(routes: dict):
+        def fake_get(path, params=None, **kwargs):
+            return stub_response(next(data for suffix, data in routes.items() if path.endswith(suffix)))
+
+        mock_requests_get.side_effect = fake_get
+
+    return route
 
 
 @pytest.fixture
@@ -56,10 +132,10 @@ def sample_time_entries_response():
     """作業時間エントリのレスポンスサンプル"""
     return {
         'time_entries': [
-            {'user': {'id': 6}, 'hours': 8.0, 'project': {'name': 'Project A'}},
-            {'user': {'id': 7}, 'hours': 7.5, 'project': {'name': 'Project A'}},
-            {'user': {'id': 8}, 'hours': 6.0, 'project': {'name': 'Project B'}},
-            {'user': {'id': 6}, 'hours': 2.0, 'project': {'name': 'Project B'}},
+            {'id': 1, 'spent_on': '2025-12-18', 'user': {'id': 6}, 'hours': 8.0, 'project': {'name': 'Project A'}},
+            {'id': 2, 'spent_on': '2025-12-18', 'user': {'id': 7}, 'hours': 7.5, 'project': {'name': 'Project A'}},
+            {'id': 3, 'spent_on': '2025-12-18', 'user': {'id': 8}, 'hours': 6.0, 'project': {'name': 'Project B'}},
+            {'id': 4, 'spent_on': '2025-12-18', 'user': {'id': 6}, 'hours': 2.0, 'project': {'name': 'Project B'}},
         ]
     }
 
@@ -0,0 +1,582 @@
+"""
+テスト用の Redmine スタンドインサーバー
+モニターが使う Redmine API (メンバー・作業時間・チケット・ユーザー・グループ) を、
+プロセス内で起動するローカルの HTTP サーバーで再現する
+
+作業時間エントリは ID から決まった内容を手続き的に生成するため、大量のデータでもメモリに保持しない。
+一覧の1ページを返す際も、そのページのエントリだけを生成する。
+応答の遅延・エラー・429 (Retry-After 付き) を指定した割合で発生させられる。
+
+単体で起動する場合:
+    python tests/fake_redmine.py --port 3000 --entries-per-day 1000
+"""
+
+import argparse
+import contextlib
+import datetime
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PROJECT_NAMES = ['Project A', 'Project B', 'Project C', 'Project D']
+ACTIVITIES = [(8, '設計'), (9, '開発'), (10, 'テスト')]
+HOURS = [0.5, 1.0, 1.5, 2.0, 4.0, 8.0]
+
+# 絞り込み (ユーザー・プロジェクト) に一致したエントリIDを保持する検索条件の数
+_MATCH_CACHE_SIZE = 16
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(value: int) -> int:
+    """64ビットの整数ハッシュ (splitmix64)。エントリの内容を ID から直接決めるために使う"""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class FakeRedmine:
+    """
+    Redmine のスタンドインサーバー
+
+    with 文で起動・停止する。url と api_key を設定に指定して使う。
+    """
+
+    def __init__(
+        self,
+        api_key: str = 'fake_api_key',
+        project_id: str = 'test251115',
+        users: int = 20,
+        members: int = 12,
+        groups: int = 2,
+        entries_per_day: int = 50,
+        history_days: int = 60,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: int = 0,
+    ) -> None:
+        """
+        Args:
+            api_key: 受け付ける APIキー
+            project_id: 対象プロジェクトの識別子
+            users: ユーザー数 (ID は 1 から連番)
+            members: 対象プロジェクトのメンバー数 (先頭から members 人。一部はグループ経由で所属する)
+            groups: メンバーを所属させるグループ数
+            entries_per_day: 1日あたりの作業時間エントリ数
+            history_days: 作業時間エントリが存在する過去の日数 (今日を含む)
+            latency: 各リクエストの応答までの遅延秒数
+            error_rate: 500 エラーを返す割合 (0.0-1.0)
+            throttle_rate: 429 を返す割合 (0.0-1.0)
+            retry_after: 429 の Retry-After ヘッダーの秒数
+            seed: 乱数のシード (データとエラー発生の再現用)
+        """
+        self.api_key = api_key
+        self.project_id = project_id
+        self.users = users
+        self.members = members
+        self.groups = groups
+        self.entries_per_day = entries_per_day
+        self.history_days = history_days
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.seed = seed
+
+        # 受け付けたリクエスト (メソッド, パス, クエリ) と接続元 (TCP 接続ごとに1件)
+        self.requests: list[tuple[str, str, dict]] = []
+        self.connections: list[tuple[str, int]] = []
+        # 応答本文の合計バイト数
+        self.bytes_sent = 0
+        # POST で作成されたチケット
+        self.issues: list[dict] = []
+
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        # 検索条件 -> 一致したエントリIDのリスト (ページ送りのたびに全件を走査しないよう、直近の条件を保持する)
+        self._matches: OrderedDict[tuple, list[int]] = OrderedDict()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+        # 開いている接続 (停止時に Keep-Alive で待機中のハンドラーを終了させるため)
+        self._sockets: set[socket.socket] = set()
+        self._stopping = False
+
+    # === 起動・停止 ===
+
+    @property
+    def url(self) -> str:
+        """サーバーのURL"""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeRedmine':
+        """サーバーを別スレッドで起動する (ポートは空いているものを使う)"""
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        # 停止時にハンドラーのスレッドの終了を待つ (server_close で join する)
+        self._server.daemon_threads = False
+        self._server.fake = self
+        self._stopping = False
+        # 停止要求をすぐに検知できるよう、ポーリング間隔を短くする
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """サーバーを停止する"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._thread.join()
+            # Keep-Alive で次のリクエストを待っている接続は受信側を閉じて終了させる
+            # (応答中の接続は書き終えてから終了するため、書き込み中にソケットが閉じられることはない)
+            with self._lock:
+                self._stopping = True
+                sockets = list(self._sockets)
+            for sock in sockets:
+                _shutdown_read(sock)
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self) -> 'FakeRedmine':
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def requests_to(self, path: str) -> list[dict]:
+        """指定したパスへのリクエストのクエリを受け付けた順に返す"""
+        with self._lock:
+            return [query for _, p, query in self.requests if p == path]
+
+    # === データ ===
+
+    def user_name(self, user_id: int) -> str:
+        """ユーザー名"""
+        return f'ユーザー{user_id:03d}'
+
+    def group_users(self, group_id: int) -> list[int]:
+        """グループに所属するユーザーID (グループIDは 1001 から連番。偶数IDのメンバーをグループに振り分ける)"""
+        index = group_id - 1001
+        return [uid for uid in self.member_ids() if uid % 2 == 0 and (uid // 2) % self.groups == index]
+
+    def member_ids(self) -> list[int]:
+        """対象プロジェクトのメンバー (グループ経由を含む) のユーザーID"""
+        return list(range(1, self.members + 1))
+
+    def memberships(self) -> list[dict]:
+        """対象プロジェクトのメンバーシップ (グループに所属するユーザーはグループとして登録する)"""
+        grouped = {uid for gid in range(1001, 1001 + self.groups) for uid in self.group_users(gid)}
+        items = [
+            {
+                'id': uid,
+                'project': {'id': 1, 'name': self.project_id},
+                'user': {'id': uid, 'name': self.user_name(uid)},
+                'roles': [{'id': 4, 'name': '開発者'}],
+            }
+            for uid in self.member_ids()
+            if uid not in grouped
+        ]
+        items += [
+            {
+                'id': gid,
+                'project': {'id': 1, 'name': self.project_id},
+                'group': {'id': gid, 'name': f'グループ{gid}'},
+                'roles': [{'id': 4, 'name': '開発者'}],
+            }
+            for gid in range(1001, 1001 + self.groups)
+        ]
+        return items
+
+    def _attributes(self, entry_id: int) -> tuple[int, int, int, int, float]:
+        """エントリの (ユーザーID, プロジェクト番号, 作業分類番号, チケットID, 時間) を ID とシードのハッシュから決める"""
+        h = _mix(self.seed * 1_000_003 + entry_id)
+        return (
+            h % self.users + 1,
+            (h >> 16) % len(PROJECT_NAMES),
+            (h >> 24) % len(ACTIVITIES),
+            100 + (h >> 32) % 50,
+            HOURS[(h >> 40) % len(HOURS)],
+        )
+
+    def entry(self, entry_id: int) -> dict:
+        """
+        作業時間エントリを ID から生成する (同じ ID には常に同じ内容を返す)
+
+        ID は「作業日の序数 * 1日あたりの件数 + その日の中での番号」とする。
+        内容は ID だけから決まるため、その日の他のエントリを生成せずに任意の位置のエントリを求められる。
+
+        Args:
+            entry_id: エントリID
+
+        Returns:
+            Redmine の JSON 形式の作業時間エントリ
+        """
+        spent_on = datetime.date.fromordinal(entry_id // self.entries_per_day).isoformat()
+        user_id, project_index, activity_index, issue_id, hours = self._attributes(entry_id)
+        activity_id, activity_name = ACTIVITIES[activity_index]
+        return {
+            'id': entry_id,
+            'project': {'id': project_index + 1, 'name': PROJECT_NAMES[project_index]},
+            'issue': {'id': issue_id},
+            'user': {'id': user_id, 'name': self.user_name(user_id)},
+            'activity': {'id': activity_id, 'name': activity_name},
+            'hours': hours,
+            'comments': f'作業 {entry_id}',
+            'spent_on': spent_on,
+            'created_on': f'{spent_on}T09:00:00Z',
+            'updated_on': f'{spent_on}T18:00:00Z',
+            'custom_fields': [],
+        }
+
+    def _ids_between(self, start: datetime.date, end: datetime.date) -> range:
+        """期間内のエントリIDを、作業日の降順・ID の降順に返す (エントリが存在する期間外の日は含めない)"""
+        today = datetime.date.today()
+        start = max(start, today - datetime.timedelta(days=self.history_days - 1))
+        end = min(end, today)
+        if start > end or self.entries_per_day <= 0:
+            return range(0)
+        return range((end.toordinal() + 1) * self.entries_per_day - 1, start.toordinal() * self.entries_per_day - 1, -1)
+
+    def entries_for_day(self, day: datetime.date) -> list[dict]:
+        """
+        指定日の作業時間エントリを生成する (同じ日付には常に同じ内容を返す)
+
+        Args:
+            day: 作業日
+
+        Returns:
+            Redmine の JSON 形式の作業時間エントリのリスト (ID の降順)
+        """
+        return self.entries_between(day, day)
+
+    def entries_between(self, start: datetime.date, end: datetime.date) -> list[dict]:
+        """期間内の作業時間エントリを、作業日の降順に返す"""
+        return [self.entry(entry_id) for entry_id in self._ids_between(start, end)]
+
+    def _matching_ids(self, start: datetime.date, end: datetime.date, user_ids: frozenset[int] | None, project_scoped: bool) -> list[int]:
+        """
+        期間内でユーザー・プロジェクトの絞り込みに一致するエントリIDを返す
+
+        同じ条件のページ送りでは走査し直さないよう、直近の条件の結果を保持する。
+        """
+        key = (start, end, user_ids, project_scoped, self.seed, self.users, self.entries_per_day)
+        with self._lock:
+            if key in self._matches:
+                self._matches.move_to_end(key)
+                return self._matches[key]
+
+        ids = []
+        for entry_id in self._ids_between(start, end):
+            user_id, project_index, *_ = self._attributes(entry_id)
+            if user_ids is not None and user_id not in user_ids:
+                continue
+            # 対象プロジェクトは Project A とその配下 (Project B) とする
+            if project_scoped and project_index > 1:
+                continue
+            ids.append(entry_id)
+
+        with self._lock:
+            self._matches[key] = ids
+            if len(self._matches) > _MATCH_CACHE_SIZE:
+                self._matches.popitem(last=False)
+        return ids
+
+    # === リクエスト処理 ===
+
+    def _inject_failure(self) -> tuple[int, dict, dict] | None:
+        """指定された割合で 429 または 500 の応答を返す"""
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.throttle_rate:
+            return 429, {'errors': ['Too Many Requests']}, {'Retry-After': str(self.retry_after)}
+        if roll < self.throttle_rate + self.error_rate:
+            return 500, {'errors': ['Internal error']}, {}
+        return None
+
+    def handle(self, method: str, path: str, query: dict, headers: dict, body: dict | None) -> tuple[int, dict | None, dict]:
+        """
+        リクエストを処理する
+
+        Returns:
+            (ステータスコード, 応答の JSON, 追加のヘッダー)
+        """
+        with self._lock:
+            self.requests.append((method, path, query))
+
+        if self.latency:
+            time.sleep(self.latency)
+        if headers.get('X-Redmine-API-Key') != self.api_key:
+            return 401, None, {}
+        failure = self._inject_failure()
+        if failure is not None:
+            return failure
+
+        if method == 'GET':
+            if path == f'/projects/{self.project_id}/memberships.json':
+                return self._paginate('memberships', self.memberships(), query, headers)
+            if path in ('/time_entries.json', f'/projects/{self.project_id}/time_entries.json'):
+                return self._time_entries(query, path.startswith('/projects/'), headers)
+            if path == '/issues.json':
+                return self._search_issues(query, headers)
+            if match := re.fullmatch(r'/issues/(\d+)\.json', path):
+                return self._show_issue(int(match.group(1)), query)
+            if path == '/users.json':
+                users = [{'id': uid, 'login': f'user{uid}', 'firstname': self.user_name(uid), 'lastname': ''} for uid in range(1, self.users + 1)]
+                return self._paginate('users', users, query, headers)
+            if match := re.fullmatch(r'/users/(\d+)\.json', path):
+                uid = int(match.group(1))
+                if 1 <= uid <= self.users:
+                    return 200, {'user': {'id': uid, 'login': f'user{uid}', 'firstname': self.user_name(uid), 'lastname': ''}}, {}
+            if match := re.fullmatch(r'/groups/(\d+)\.json', path):
+                gid = int(match.group(1))
+                if 1001 <= gid < 1001 + self.groups:
+                    users = [{'id': uid, 'name': self.user_name(uid)} for uid in self.group_users(gid)]
+                    return 200, {'group': {'id': gid, 'name': f'グループ{gid}', 'users': users}}, {}
+        elif method == 'POST' and path == '/issues.json':
+            return self._create_issue(body)
+        elif method == 'PUT' and (match := re.fullmatch(r'/issues/(\d+)\.json', path)):
+            return self._update_issue(int(match.group(1)), body)
+        elif method == 'DELETE' and (match := re.fullmatch(r'/issues/(\d+)/watchers/(\d+)\.json', path)):
+            return self._remove_watcher(int(match.group(1)), int(match.group(2)))
+
+        return 404, None, {}
+
+    @staticmethod
+    def _page_range(query: dict) -> tuple[int, int]:
+        """クエリの offset / limit (limit は Redmine と同じく最大 100)"""
+        return int(query.get('offset', 0)), min(int(query.get('limit', 25)), 100)
+
+    def _paginate(self, key: str, items: list, query: dict, headers: dict) -> tuple[int, dict | None, dict]:
+        """offset / limit に従って一覧の1ページを返す"""
+        offset, limit = self._page_range(query)
+        return self._respond_page(key, items[offset : offset + limit], len(items), query, headers)
+
+    def _respond_page(self, key: str, page: list, total_count: int, query: dict, headers: dict) -> tuple[int, dict | None, dict]:
+        """一覧の1ページを返す (ETag 付き。If-None-Match が一致すれば 304)"""
+        offset, limit = self._page_range(query)
+        body = {key: page, 'total_count': total_count, 'offset': offset, 'limit': limit}
+        etag = '"' + hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()[:16] + '"'
+        if headers.get('If-None-Match') == etag:
+            return 304, None, {'ETag': etag}
+        return 200, body, {'ETag': etag}
+
+    def _time_entries(self, query: dict, project_scoped: bool, headers: dict) -> tuple[int, dict | None, dict]:
+        """作業時間エントリの一覧 (spent_on / updated_on / user_id で絞り込み)"""
+        today = datetime.date.today()
+        start, end = today - datetime.timedelta(days=self.history_days - 1), today
+
+        spent_on = query.get('spent_on')
+        if spent_on:
+            if spent_on.startswith('><'):
+                first, last = spent_on[2:].split('|')
+                start, end = datetime.date.fromisoformat(first), datetime.date.fromisoformat(last)
+            elif spent_on.startswith('>='):
+                start = datetime.date.fromisoformat(spent_on[2:])
+            else:
+                start = end = datetime.date.fromisoformat(spent_on)
+
+        updated_on = query.get('updated_on')
+        if updated_on and updated_on.startswith('>='):
+            # 生成するエントリの更新日時は作業日の 18:00 のため、日付の下限に置き換えられる
+            threshold = datetime.datetime.fromisoformat(updated_on[2:].replace('Z', '+00:00'))
+            day = threshold.date()
+            start = max(start, day if threshold.time() <= datetime.time(18, 0) else day + datetime.timedelta(days=1))
+
+        if 'user_id' not in query and not project_scoped:
+            # 絞り込みがなければ ID が連続するため、ページの範囲の ID だけを生成する
+            ids: range | list[int] = self._ids_between(start, end)
+        else:
+            user_ids = frozenset(int(uid) for uid in query['user_id'].split('|')) if 'user_id' in query else None
+            ids = self._matching_ids(start, end, user_ids, project_scoped)
+
+        offset, limit = self._page_range(query)
+        page = [self.entry(entry_id) for entry_id in ids[offset : offset + limit]]
+        return self._respond_page('time_entries', page, len(ids), query, headers)
+
+    def _search_issues(self, query: dict, headers: dict) -> tuple[int, dict | None, dict]:
+        """チケット検索 (project_id / tracker_id / subject の「含む」検索 / created_on の「以降」検索、作成日時の降順)"""
+        with self._lock:
+            issues = list(self.issues)
+        if 'project_id' in query:
+            issues = [i for i in issues if i['project']['name'] == query['project_id']]
+        if 'tracker_id' in query:
+            issues = [i for i in issues if str(i['tracker']['id']) == str(query['tracker_id'])]
+        subject = query.get('subject', '')
+        if subject.startswith('~'):
+            issues = [i for i in issues if subject[1:] in i['subject']]
+        created_on = query.get('created_on', '')
+        if created_on.startswith('>='):
+            issues = [i for i in issues if i['created_on'][:10] >= created_on[2:12]]
+        issues.sort(key=lambda i: (i['created_on'], i['id']), reverse=True)
+        return self._paginate('issues', issues, query, headers)
+
+    def _create_issue(self, body: dict | None) -> tuple[int, dict | None, dict]:
+        """チケット作成"""
+        issue = (body or {}).get('issue') or {}
+        if not issue.get('subject') or not issue.get('project_id'):
+            return 422, {'errors': ['件名を入力してください']}, {}
+
+        with self._lock:
+            created = {
+                'id': 1000 + len(self.issues),
+                'project': {'id': 1, 'name': issue['project_id']},
+                'tracker': {'id': issue.get('tracker_id')},
+                'priority': {'id': issue.get('priority_id')},
+                'parent': {'id': issue.get('parent_issue_id')},
+                'subject': issue['subject'],
+                'description': issue.get('description', ''),
+                'watcher_user_ids': list(issue.get('watcher_user_ids', [])),
+                'created_on': datetime.datetime.now(datetime.UTC).strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            }
+            self.issues.append(created)
+        return 201, {'issue': {k: v for k, v in created.items() if k != 'watcher_user_ids'}}, {}
+
+    def _show_issue(self, issue_id: int, query: dict) -> tuple[int, dict | None, dict]:
+        """チケット取得 (include=watchers でウォッチャーを含める)"""
+        with self._lock:
+            issue = next((i for i in self.issues if i['id'] == issue_id), None)
+            if issue is None:
+                return 404, None, {}
+            shown = {k: v for k, v in issue.items() if k not in ('watcher_user_ids', 'journals')}
+            if 'watchers' in query.get('include', '').split(','):
+                shown['watchers'] = [{'id': uid, 'name': self.user_name(uid)} for uid in issue['watcher_user_ids']]
+        return 200, {'issue': shown}, {}
+
+    def _update_issue(self, issue_id: int, body: dict | None) -> tuple[int, dict | None, dict]:
+        """チケット更新 (注記は journals に追加する。Redmine と同じく成功時は 204)"""
+        changes = (body or {}).get('issue') or {}
+        with self._lock:
+            issue = next((i for i in self.issues if i['id'] == issue_id), None)
+            if issue is None:
+                return 404, None, {}
+            notes = changes.pop('notes', None)
+            if notes:
+                issue.setdefault('journals', []).append({'notes': notes})
+            issue.update(changes)
+        return 204, None, {}
+
+    def _remove_watcher(self, issue_id: int, user_id: int) -> tuple[int, dict | None, dict]:
+        """ウォッチャーの削除"""
+        with self._lock:
+            issue = next((i for i in self.issues if i['id'] == issue_id), None)
+            if issue is None:
+                return 404, None, {}
+            if user_id in issue['watcher_user_ids']:
+                issue['watcher_user_ids'].remove(user_id)
+        return 204, None, {}
+
+
+def _shutdown_read(sock: socket.socket) -> None:
+    """接続の受信側を閉じる (接続が既に閉じられている場合は何もしない)"""
+    with contextlib.suppress(OSError):
+        sock.shutdown(socket.SHUT_RD)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """HTTP/1.1 (Keep-Alive) でリクエストを受け、FakeRedmine に処理を委ねるハンドラー"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self) -> None:
+        super().setup()
+        fake = self.server.fake
+        with fake._lock:
+            fake.connections.append(self.client_address)
+            if fake._stopping:
+                _shutdown_read(self.request)
+            else:
+                fake._sockets.add(self.request)
+
+    def finish(self) -> None:
+        super().finish()
+        fake = self.server.fake
+        with fake._lock:
+            fake._sockets.discard(self.request)
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        body = None
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = json.loads(self.rfile.read(length))
+
+        status, payload, extra_headers = self.server.fake.handle(method, url.path, query, dict(self.headers), body)
+
+        data = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in extra_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+            with self.server.fake._lock:
+                self.server.fake.bytes_sent += len(data)
+
+    def do_GET(self) -> None:
+        self._dispatch('GET')
+
+    def do_POST(self) -> None:
+        self._dispatch('POST')
+
+    def do_PUT(self) -> None:
+        self._dispatch('PUT')
+
+    def do_DELETE(self) -> None:
+        self._dispatch('DELETE')
+
+    def log_message(self, format: str, *args: object) -> None:
+        # テスト出力を汚さないよう、アクセスログは出力しない
+        pass
+
+
+def main() -> None:
+    """スタンドインサーバーを単体で起動する (負荷試験など)"""
+    parser = argparse.ArgumentParser(description='Redmine のスタンドインサーバー')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--api-key', default='fake_api_key')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--members', type=int, default=12)
+    parser.add_argument('--entries-per-day', type=int, default=50)
+    parser.add_argument('--history-days', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeRedmine(
+        api_key=args.api_key,
+        users=args.users,
+        members=args.members,
+        entries_per_day=args.entries_per_day,
+        history_days=args.history_days,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+    )
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), _Handler)
+    server.daemon_threads = True
+    server.fake = fake
+    print(f'Redmine スタンドインサーバー: http://127.0.0.1:{args.port} (APIキー: {args.api_key})')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
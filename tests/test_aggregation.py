@@ -0,0 +1,131 @@
+"""aggregation モジュールのテスト"""
+
+import pytest
+
+import aggregation
+import time_entry
+
+
+def _item(entry_id, spent_on, hours, user_id, project_name, activity_name, issue_id=None):
+    """Redmine の JSON 形式の作業時間エントリ (チケットは省略可)"""
+    item = {
+        'id': entry_id,
+        'spent_on': spent_on,
+        'hours': hours,
+        'user': {'id': user_id},
+        'project': {'name': project_name},
+        'activity': {'name': activity_name},
+    }
+    if issue_id is not None:
+        item['issue'] = {'id': issue_id}
+    return item
+
+
+@pytest.fixture
+def entries():
+    """複数の日付・作業分類・チケットを含む作業時間エントリ"""
+    items = [
+        _item(1, '2025-12-18', 8.0, 6, 'Project A', '設計', 100),
+        _item(2, '2025-12-18', 2.0, 6, 'Project B', '開発'),
+        _item(3, '2025-12-19', 7.5, 7, 'Project A', '設計', 100),
+        _item(4, '2025-12-19', 0.5, 6, 'Project A', '設計', 100),
+    ]
+    return list(time_entry.decode(items))
+
+
+@pytest.fixture(params=['python', 'numpy'])
+def group_by(request):
+    """Python の集計と列指向の集計の両方で同じテストを実行する"""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+        return aggregation.ColumnarGroupBy
+    return aggregation.GroupBy
+
+
+class TestGroupBy:
+    """GroupBy / ColumnarGroupBy クラスのテスト"""
+
+    def test_rollups_from_single_pass(self, group_by, entries):
+        """1回の走査で複数の集計軸の集計を求める"""
+        # エントリは1回しか走査できないイテレータとして渡す
+        groups = group_by(('user', 'project', 'activity', 'issue', 'day')).add(iter(entries))
+
+        # 実行
+        by_user, by_project, by_activity, by_issue, by_day = groups.rollups([('user',), ('project',), ('activity',), ('issue',), ('day',)])
+
+        # 検証
+        assert by_user == {6: 10.5, 7: 7.5}
+        assert by_project == {'Project A': 16.0, 'Project B': 2.0}
+        assert by_activity == {'設計': 16.0, '開発': 2.0}
+        assert by_issue == {100: 16.0, None: 2.0}
+        assert by_day == {'2025-12-18': 10.0, '2025-12-19': 8.0}
+        assert len(groups) == 4
+
+    def test_rollup_multiple_dimensions_with_filter(self, group_by, entries):
+        """複数の集計軸の組み合わせと絞り込み"""
+        groups = group_by(('day', 'user', 'project')).add(entries)
+
+        # 実行
+        result = groups.rollup(('user', 'project'), where={'day': {'2025-12-19'}, 'user': {6: '水城 瑞希'}})
+
+        # 検証
+        assert result == {(6, 'Project A'): 0.5}
+
+    def test_counts_and_incremental_add(self, group_by, entries):
+        """追加で積算したエントリも含めて件数を集計する"""
+        groups = group_by(('user',)).add(entries[:2])
+        groups.add(entries[2:])
+
+        # 実行
+        result = groups.rollup(('user',), counts=True)
+
+        # 検証
+        assert result == {6: 3, 7: 1}
+
+    @pytest.mark.parametrize('other_user', [7, 2**62], ids=['narrow', 'wider_than_int64'])
+    def test_combinations_in_first_appearance_order(self, group_by, other_user):
+        """組み合わせの範囲が int64 を超える場合も取り違えずに集計し、初出順に並べる"""
+        items = [
+            _item(1, '2025-12-18', 1.0, 6, 'Project A', '設計'),
+            _item(2, '2025-12-20', 2.0, other_user, 'Project A', '設計'),
+            _item(3, '2025-12-19', 4.0, 6, 'Project A', '設計'),
+            _item(4, '2025-12-20', 8.0, other_user, 'Project A', '設計'),
+        ]
+        groups = group_by(('user', 'day')).add(time_entry.decode(items))
+
+        # 実行
+        result = groups.rollup(('user', 'day'))
+
+        # 検証
+        assert list(result.items()) == [((6, '2025-12-18'), 1.0), ((other_user, '2025-12-20'), 10.0), ((6, '2025-12-19'), 4.0)]
+
+    def test_unknown_dimension(self, group_by):
+        """未知の集計軸は ValueError とする"""
+        with pytest.raises(ValueError, match='未知の集計軸: tracker'):
+            group_by(('user', 'tracker'))
+
+
+class TestNewGroupBy:
+    """new_group_by 関数のテスト"""
+
+    def test_python_backend(self, monkeypatch):
+        """'python' 指定時は GroupBy を使う"""
+        monkeypatch.setattr('user_setting.AGGREGATION_BACKEND', 'python')
+
+        assert isinstance(aggregation.new_group_by(('user',)), aggregation.GroupBy)
+
+    def test_auto_falls_back_without_numpy(self, monkeypatch):
+        """'auto' 指定時、numpy がなければ GroupBy を使う"""
+        monkeypatch.setattr('user_setting.AGGREGATION_BACKEND', 'auto')
+        monkeypatch.setattr(aggregation, 'np', None)
+        monkeypatch.setattr(aggregation, '_numpy_loaded', True)
+
+        assert isinstance(aggregation.new_group_by(('user',), columnar_input=True), aggregation.GroupBy)
+
+    def test_auto_uses_numpy_for_columnar_input(self, monkeypatch):
+        """'auto' 指定時、列形式のデータを集計する場合のみ ColumnarGroupBy を使う"""
+        pytest.importorskip('numpy')
+        monkeypatch.setattr('user_setting.AGGREGATION_BACKEND', 'auto')
+
+        assert isinstance(aggregation.new_group_by(('user',), columnar_input=True), aggregation.ColumnarGroupBy)
+        assert isinstance(aggregation.new_group_by(('user',)), aggregation.GroupBy)
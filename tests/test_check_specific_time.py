@@ -1,22 +1,29 @@
 """check_specific_time モジュールのテスト"""
 
 import datetime
+import io
+import json
+from concurrent.futures import Future
 from unittest.mock import MagicMock
 
 import pytest
+import requests
 
+import aggregation
 import check_specific_time
+import checkpoint
+import metrics
+import time_entry
+import user_setting as us
 
 
 class TestGetProjectMembers:
     """_get_project_members 関数のテスト"""
 
-    def test_success(self, mock_requests_get, sample_members_response, mock_redmine_api_key):
+    def test_success(self, make_response, mock_requests_get, sample_members_response, mock_redmine_api_key):
         """メンバー取得成功"""
         # モックレスポンスの設定
-        mock_response = MagicMock()
-        mock_response.json.return_value = sample_members_response
-        mock_response.raise_for_status.return_value = None
+        mock_response = make_response(sample_members_response)
         mock_requests_get.return_value = mock_response
 
         # 実行
@@ -41,16 +48,104 @@ class TestGetProjectMembers:
         captured = capfd.readouterr()
         assert 'プロジェクトメンバー取得エラー' in captured.out
 
+    def test_pagination(self, make_response, mock_requests_get, mock_redmine_api_key, monkeypatch):
+        """total_count に従って全ページのメンバーを取得する"""
+        monkeypatch.setattr('user_setting.PAGE_LIMIT', 2)
+        memberships = [{'user': {'id': uid, 'name': f'user{uid}'}} for uid in range(1, 6)]
+
+        def fake_get(url, params, **kwargs):
+            offset = params['offset']
+            return make_response({'memberships': memberships[offset : offset + params['limit']], 'total_count': len(memberships)})
+
+        mock_requests_get.side_effect = fake_get
+
+        # 実行
+        result = check_specific_time._get_project_members()
+
+        # 検証
+        assert mock_requests_get.call_count == 3
+        assert list(result) == [1, 2, 3, 4, 5]
+
+    def test_group_expansion(self, make_response, mock_requests_get, mock_redmine_api_key, monkeypatch):
+        """グループメンバーシップを所属ユーザーに展開し、グループ取得はキャッシュする"""
+        monkeypatch.setattr(check_specific_time, '_group_users_cache', {})
+
+        def fake_get(url, params, **kwargs):
+            if url.endswith('/groups/20.json'):
+                return make_response({'group': {'id': 20, 'users': [{'id': 6, 'name': '水城 瑞希'}, {'id': 11, 'name': '小林 湊'}]}})
+            return make_response(
+                {
+                    'memberships': [
+                        {'user': {'id': 6, 'name': '水城 瑞希'}},
+                        {'group': {'id': 20, 'name': '開発グループ'}},
+                    ]
+                }
+            )
+
+        mock_requests_get.side_effect = fake_get
+
+        # 実行 (2回目はグループ取得がキャッシュから返る)
+        result = check_specific_time._get_project_members()
+        check_specific_time._get_project_members()
+
+        # 検証
+        assert result == {6: '水城 瑞希', 11: '小林 湊'}
+        group_calls = [c for c in mock_requests_get.call_args_list if c.args[0].endswith('/groups/20.json')]
+        assert len(group_calls) == 1
+
+    def test_cache_hit_skips_network(self, make_response, mock_requests_get, sample_members_response, mock_redmine_api_key):
+        """有効期限内のキャッシュがあれば通信しない"""
+        mock_response = make_response(sample_members_response)
+        mock_requests_get.return_value = mock_response
+
+        # 実行
+        first = check_specific_time._get_project_members()
+        second = check_specific_time._get_project_members()
+
+        # 検証
+        assert mock_requests_get.call_count == 1
+        assert second == first
+
+    def test_refresh_ignores_cache(self, make_response, mock_requests_get, sample_members_response, mock_redmine_api_key):
+        """refresh 指定時はキャッシュを使わずに再取得する"""
+        mock_response = make_response(sample_members_response)
+        mock_requests_get.return_value = mock_response
+
+        # 実行
+        check_specific_time._get_project_members()
+        check_specific_time._get_project_members(refresh=True)
+
+        # 検証
+        assert mock_requests_get.call_count == 2
+
+    def test_expired_cache_revalidated(self, make_response, mock_requests_get, sample_members_response, mock_redmine_api_key, monkeypatch):
+        """期限切れのキャッシュは If-None-Match で再検証し、304 ならキャッシュを返す"""
+        mock_response = make_response(sample_members_response, headers={'ETag': '"v1"'})
+        mock_requests_get.return_value = mock_response
+        check_specific_time._get_project_members()
+
+        # キャッシュを期限切れにし、再検証で 304 を返す
+        monkeypatch.setattr('user_setting.MEMBER_CACHE_TTL', 0)
+        not_modified = make_response(status_code=304)
+        mock_requests_get.return_value = not_modified
+
+        # 実行
+        result = check_specific_time._get_project_members()
+
+        # 検証
+        assert result[6] == '水城 瑞希'
+        assert len(result) == 5
+        assert mock_requests_get.call_args.kwargs['headers'] == {'If-None-Match': '"v1"'}
+        not_modified.json.assert_not_called()
+
 
 class TestGetTimeEntries:
     """_get_time_entries 関数のテスト"""
 
-    def test_success(self, mock_requests_get, sample_time_entries_response, mock_redmine_api_key):
+    def test_success(self, make_response, mock_requests_get, sample_time_entries_response, mock_redmine_api_key):
         """作業時間エントリ取得成功"""
         # モックレスポンスの設定
-        mock_response = MagicMock()
-        mock_response.json.return_value = sample_time_entries_response
-        mock_response.raise_for_status.return_value = None
+        mock_response = make_response(sample_time_entries_response)
         mock_requests_get.return_value = mock_response
 
         # 実行
@@ -59,8 +154,8 @@ class TestGetTimeEntries:
         # 検証
         assert result is not None
         assert len(result) == 4
-        assert result[0]['user']['id'] == 6
-        assert result[0]['hours'] == 8.0
+        assert result[0].user_id == 6
+        assert result[0].hours == 8.0
 
     def test_api_error(self, mock_requests_get, mock_redmine_api_key, capfd):
         """API エラー時"""
@@ -74,13 +169,146 @@ class TestGetTimeEntries:
         captured = capfd.readouterr()
         assert '作業時間エントリ取得エラー' in captured.out
 
+    def test_invalid_response(self, make_response, mock_requests_get, mock_redmine_api_key, capfd):
+        """一覧が list でないレスポンス"""
+        mock_response = make_response({'time_entries': None})
+        mock_requests_get.return_value = mock_response
+
+        # 実行
+        result = check_specific_time._get_time_entries('2025-12-18')
+
+        # 検証
+        assert result is None
+        captured = capfd.readouterr()
+        assert '作業時間エントリ取得エラー: 不正なレスポンス' in captured.out
+
+    def test_pagination(self, make_response, mock_requests_get, mock_redmine_api_key, monkeypatch):
+        """total_count に従って全ページを取得し、順序を保って重複を除去する"""
+        monkeypatch.setattr('user_setting.PAGE_LIMIT', 2)
+        all_entries = [{'id': i, 'spent_on': '2025-12-18', 'user': {'id': 6}, 'hours': 1.0, 'project': {'name': 'Project A'}} for i in range(5)]
+
+        def fake_get(url, params, **kwargs):
+            offset = params['offset']
+            items = all_entries[offset : offset + params['limit']]
+            # offset のずれで前ページ末尾の要素が重複して返るケースを再現
+            if offset == 4:
+                items = [all_entries[3], *items]
+            mock_response = make_response({'time_entries': items, 'total_count': len(all_entries)})
+            return mock_response
+
+        mock_requests_get.side_effect = fake_get
+
+        # 実行
+        result = check_specific_time._get_time_entries('2025-12-18')
+
+        # 検証：3ページ取得され、id 順で重複なし
+        assert mock_requests_get.call_count == 3
+        assert [e.id for e in result] == [0, 1, 2, 3, 4]
+
+    def test_streamed_pages(self, mock_requests_get, mock_redmine_api_key, monkeypatch):
+        """stream=True で取得したレスポンスを逐次デコードし、読み終えたレスポンスを閉じる"""
+        monkeypatch.setattr('user_setting.PAGE_LIMIT', 2)
+        all_entries = [{'id': i, 'spent_on': '2025-12-18', 'user': {'id': 6}, 'hours': 1.0, 'project': {'name': 'Project A'}} for i in range(5)]
+        responses = []
+
+        def fake_get(url, params, **kwargs):
+            offset = params['offset']
+            body = {'time_entries': all_entries[offset : offset + params['limit']], 'total_count': len(all_entries)}
+            response = requests.Response()
+            response.status_code = 200
+            response.raw = io.BytesIO(json.dumps(body).encode())
+            response.close = MagicMock()
+            responses.append((kwargs, response))
+            return response
+
+        mock_requests_get.side_effect = fake_get
+
+        # 実行
+        result = check_specific_time._get_time_entries('2025-12-18')
+
+        # 検証
+        assert [e.id for e in result] == [0, 1, 2, 3, 4]
+        assert all(kwargs['stream'] is True for kwargs, _ in responses)
+        assert all(response.close.called for _, response in responses)
+
+
+class TestPlanEntryQueries:
+    """_plan_entry_queries 関数 (作業時間エントリの取得計画) のテスト"""
+
+    @staticmethod
+    def _respond_counts(make_response, mock_requests_get, count_for):
+        def fake_get(path, params=None, **kwargs):
+            mock_response = make_response({'time_entries': [], 'total_count': count_for(path, params)})
+            return mock_response
+
+        mock_requests_get.side_effect = fake_get
+
+    def test_user_filter_chosen_for_large_instance(self, make_response, mock_requests_get, mock_redmine_api_key, monkeypatch):
+        """全体の件数が多い場合はユーザー絞り込みを分割して選び、選択結果を実行レポートに記録する"""
+        monkeypatch.setattr('user_setting.USER_FILTER_BATCH_SIZE', 2)
+        self._respond_counts(make_response, mock_requests_get, lambda path, params: 3 if 'user_id' in params else 5000)
+        metrics.start()
+
+        # 実行
+        try:
+            queries = check_specific_time._plan_entry_queries('2025-12-18', [8, 6, 7], ['prj'])
+            plans = metrics.report()['plans']
+        finally:
+            metrics.finish()
+
+        # 検証：limit=1 の問い合わせは絞り込みなしとユーザー絞り込み (最初の分割分) の1回ずつで、ユーザーID 2件ずつの2クエリになる
+        assert [c.kwargs['params'] for c in mock_requests_get.call_args_list] == [
+            {'spent_on': '2025-12-18', 'limit': 1},
+            {'spent_on': '2025-12-18', 'user_id': '6|7', 'limit': 1},
+        ]
+        assert [q[1]['user_id'] for q in queries] == ['6|7', '8']
+        assert plans == [
+            {
+                'target': 'time_entries',
+                'chosen': 'user',
+                'estimates': {'global': {'rows': 5000, 'requests': 50}, 'user': {'rows': 4, 'requests': 2}},
+                'probes': 2,
+            }
+        ]
+
+    def test_global_chosen_for_small_day(self, make_response, mock_requests_get, mock_redmine_api_key):
+        """全体でも1ページに収まる場合は絞り込みなしを選ぶ"""
+        self._respond_counts(make_response, mock_requests_get, lambda path, params: 10 if 'user_id' in params else 40)
+
+        # 実行
+        queries = check_specific_time._plan_entry_queries('2025-12-18', range(1, 200), ['prj'])
+
+        # 検証：ユーザー絞り込みではリクエスト数が減らないため、件数を問い合わせない
+        assert queries == [('/time_entries.json', {'spent_on': '2025-12-18'})]
+        assert mock_requests_get.call_count == 1
+
+    def test_no_members(self, mock_requests_get, mock_redmine_api_key):
+        """集計対象のメンバーがいなければ問い合わせずに取得しない"""
+        # 実行
+        queries = check_specific_time._plan_entry_queries('2025-12-18', [], ['prj'])
+
+        # 検証
+        assert queries == []
+        mock_requests_get.assert_not_called()
+
+    def test_project_scope(self, make_response, mock_requests_get, mock_redmine_api_key, monkeypatch):
+        """プロジェクト範囲ではプロジェクト配下のURLで取得し、0件のクエリは除く"""
+        monkeypatch.setattr('user_setting.ENTRY_QUERY_SCOPE', 'project')
+        self._respond_counts(make_response, mock_requests_get, lambda path, params: 0 if 'prj_b' in path else 30)
+
+        # 実行
+        queries = check_specific_time._plan_entry_queries('2025-12-18', [6], ['prj_a', 'prj_b'])
+
+        # 検証
+        assert [q[0] for q in queries] == ['/projects/prj_a/time_entries.json']
+
 
 class TestAggregateEntries:
     """_aggregate_entries 関数のテスト"""
 
     def test_aggregate(self, sample_time_entries_response):
         """集計のテスト"""
-        entries = sample_time_entries_response['time_entries']
+        entries = list(time_entry.decode(sample_time_entries_response['time_entries']))
         target_users = {6: '水城 瑞希', 7: '佐藤 陽翔', 8: '高橋 葵'}
 
         # 実行
@@ -109,7 +337,7 @@ class TestAggregateEntries:
 
     def test_aggregate_filters_non_target_users(self, sample_time_entries_response):
         """ターゲット外ユーザーを除外"""
-        entries = sample_time_entries_response['time_entries']
+        entries = list(time_entry.decode(sample_time_entries_response['time_entries']))
         # ユーザー6, 8 のみをターゲットに
         target_users = {6: '水城 瑞希', 8: '高橋 葵'}
 
@@ -121,28 +349,40 @@ class TestAggregateEntries:
         assert entered_users[6] == 10.0
         assert entered_users[8] == 6.0
 
+    def test_summarize_day(self, sample_time_entries_response):
+        """日付を含むグループ集計から、指定日のメンバー分を取り出す"""
+        entries = list(time_entry.decode(sample_time_entries_response['time_entries']))
+        entries[0].spent_on = '2025-12-19'
+
+        groups = aggregation.GroupBy(('day', 'user', 'project')).add(iter(entries))
+
+        # 実行
+        entered_users, project_totals = check_specific_time._summarize_day(groups, {6: '水城 瑞希'}, '2025-12-18')
+
+        # 検証
+        assert groups.rollup(('day', 'user', 'project'), {'day': {'2025-12-19'}}) == {('2025-12-19', 6, 'Project A'): 8.0}
+        assert entered_users == {6: 2.0}
+        assert project_totals == {'Project B': 2.0}
+
 
 class TestGetSpecificDateTime:
     """get_specific_date_time 関数のテスト"""
 
     def test_success(
         self,
-        mock_requests_get,
+        route_get_responses,
         sample_members_response,
         sample_time_entries_response,
         mock_redmine_api_key,
     ):
         """正常に日付とデータを取得"""
-        # 1回目の呼び出し（メンバー取得）と 2回目（エントリ取得）をシミュレート
-        mock_response1 = MagicMock()
-        mock_response1.json.return_value = sample_members_response
-        mock_response1.raise_for_status.return_value = None
-
-        mock_response2 = MagicMock()
-        mock_response2.json.return_value = sample_time_entries_response
-        mock_response2.raise_for_status.return_value = None
-
-        mock_requests_get.side_effect = [mock_response1, mock_response2]
+        # メンバー取得とエントリ取得は並行実行されるため、パスで応答を振り分ける
+        route_get_responses(
+            {
+                'memberships.json': sample_members_response,
+                'time_entries.json': sample_time_entries_response,
+            }
+        )
 
         # 実行
         specific_date = datetime.date(2025, 12, 18)
@@ -170,15 +410,100 @@ class TestGetSpecificDateTime:
         captured = capfd.readouterr()
         assert 'プロジェクトメンバー取得エラー' in captured.out
 
+    def test_with_prefetched_members(self, make_response, mock_requests_get, sample_time_entries_response, mock_redmine_api_key):
+        """開始済みのメンバー取得を使い、メンバーを再取得しない"""
+        members_future = Future()
+        members_future.set_result({6: '水城 瑞希', 7: '佐藤 陽翔'})
+
+        mock_response = make_response(sample_time_entries_response)
+        mock_requests_get.return_value = mock_response
+
+        # 実行
+        result = check_specific_time.get_specific_date_time(datetime.date(2025, 12, 18), members_future)
+
+        # 検証：GET はエントリ取得の1回のみ
+        assert mock_requests_get.call_count == 1
+        assert result[1] == {6: '水城 瑞希', 7: '佐藤 陽翔'}
+        assert result[2] == {6: 10.0, 7: 7.5}
+
+
+class TestGetDateRangeTime:
+    """get_date_range_time 関数のテスト"""
+
+    def test_single_range_query(self, route_get_responses, mock_requests_get, sample_members_response, mock_redmine_api_key):
+        """期間全体を1回の範囲検索で取得し、日ごとに集計する"""
+        route_get_responses(
+            {
+                'memberships.json': sample_members_response,
+                'time_entries.json': {
+                    'time_entries': [
+                        {'id': 1, 'spent_on': '2025-12-18', 'user': {'id': 6}, 'hours': 8.0, 'project': {'name': 'Project A'}},
+                        {'id': 2, 'spent_on': '2025-12-20', 'user': {'id': 7}, 'hours': 4.0, 'project': {'name': 'Project B'}},
+                        {'id': 3, 'spent_on': '2025-12-20', 'user': {'id': 6}, 'hours': 3.0, 'project': {'name': 'Project B'}},
+                    ]
+                },
+            }
+        )
+
+        # 実行
+        results = check_specific_time.get_date_range_time(datetime.date(2025, 12, 18), datetime.date(2025, 12, 20))
+
+        # 検証：エントリ取得は範囲検索1回のみ
+        entry_calls = [c for c in mock_requests_get.call_args_list if c.args[0] == '/time_entries.json']
+        assert len(entry_calls) == 1
+        assert entry_calls[0].kwargs['params']['spent_on'] == '><2025-12-18|2025-12-20'
+
+        # 検証：エントリがない日も含めて日付順に3日分
+        assert [r[0] for r in results] == ['2025-12-18', '2025-12-19', '2025-12-20']
+        assert results[0][2] == {6: 8.0}
+        assert results[1][2] == {}
+        assert results[2][2] == {7: 4.0, 6: 3.0}
+        assert results[2][3] == {'Project B': 7.0}
+
+    def test_fetch_error(self, mock_requests_get, mock_redmine_api_key):
+        """取得エラー時は None を返す"""
+        mock_requests_get.side_effect = Exception('API error')
+
+        # 実行
+        result = check_specific_time.get_date_range_time(datetime.date(2025, 12, 18), datetime.date(2025, 12, 20))
+
+        # 検証
+        assert result is None
+
+
+class TestGetProjectsDateTime:
+    """get_projects_date_time 関数のテスト"""
+
+    def test_shared_entry_fetch(self, route_get_responses, mock_requests_get, sample_time_entries_response, mock_redmine_api_key):
+        """エントリ取得は1回のみで、メンバーに従って各プロジェクトへ振り分ける"""
+        route_get_responses(
+            {
+                '/projects/prj_a/memberships.json': {'memberships': [{'user': {'id': 6, 'name': '水城 瑞希'}}]},
+                '/projects/prj_b/memberships.json': {
+                    'memberships': [{'user': {'id': 6, 'name': '水城 瑞希'}}, {'user': {'id': 8, 'name': '高橋 葵'}}]
+                },
+                'time_entries.json': sample_time_entries_response,
+            }
+        )
+        target_date = datetime.date(2025, 12, 18)
+
+        # 実行
+        results = check_specific_time.get_projects_date_time({'prj_a': target_date, 'prj_b': target_date})
+
+        # 検証
+        entry_calls = [c for c in mock_requests_get.call_args_list if c.args[0] == '/time_entries.json']
+        assert len(entry_calls) == 1
+        assert results['prj_a'] == ('2025-12-18', {6: '水城 瑞希'}, {6: 10.0}, {'Project A': 8.0, 'Project B': 2.0})
+        assert results['prj_b'][2] == {6: 10.0, 8: 6.0}
+        assert results['prj_b'][3] == {'Project A': 8.0, 'Project B': 8.0}
+
 
 class TestGetLastTargetDate:
     """get_last_target_date 関数のテスト"""
 
-    def test_success(self, mock_requests_get, sample_issues_response, mock_redmine_api_key):
+    def test_success(self, make_response, mock_requests_get, sample_issues_response, mock_redmine_api_key):
         """前回のチェック日付を正常に取得"""
-        mock_response = MagicMock()
-        mock_response.json.return_value = sample_issues_response
-        mock_response.raise_for_status.return_value = None
+        mock_response = make_response(sample_issues_response)
         mock_requests_get.return_value = mock_response
 
         # 実行
@@ -190,11 +515,9 @@ class TestGetLastTargetDate:
         # いずれにせよ前回チケットが見つかったことを確認
         assert isinstance(result, datetime.date)
 
-    def test_no_previous_ticket(self, mock_requests_get, mock_redmine_api_key, capfd):
+    def test_no_previous_ticket(self, make_response, mock_requests_get, mock_redmine_api_key, capfd):
         """過去のチケットがない場合は昨日を返す"""
-        mock_response = MagicMock()
-        mock_response.json.return_value = {'issues': []}
-        mock_response.raise_for_status.return_value = None
+        mock_response = make_response({'issues': []})
         mock_requests_get.return_value = mock_response
 
         # 実行
@@ -218,3 +541,28 @@ class TestGetLastTargetDate:
         assert result == yesterday
         captured = capfd.readouterr()
         assert '前回日付の取得エラー' in captured.out
+
+    def test_checkpoint_skips_search(self, mock_requests_get, mock_redmine_api_key):
+        """チェックポイントがあれば issues.json を検索しない"""
+        last_checked = datetime.date.today() - datetime.timedelta(days=3)
+        checkpoint.record(us.REDMINE_URL, us.TARGET_PROJECT_ID, f'{last_checked:%Y-%m-%d}', 100)
+
+        # 実行
+        result = check_specific_time.get_last_target_date()
+
+        # 検証
+        assert result == last_checked + datetime.timedelta(days=1)
+        mock_requests_get.assert_not_called()
+
+    def test_search_result_saved_to_checkpoint(self, make_response, mock_requests_get, sample_issues_response, mock_redmine_api_key):
+        """検索で特定した前回チェック日はチェックポイントに記録され、次回は検索しない"""
+        mock_response = make_response(sample_issues_response)
+        mock_requests_get.return_value = mock_response
+
+        # 実行
+        first = check_specific_time.get_last_target_date()
+        second = check_specific_time.get_last_target_date()
+
+        # 検証
+        assert first == second
+        assert mock_requests_get.call_count == 1
@@ -0,0 +1,56 @@
+"""checkpoint モジュールのテスト"""
+
+import datetime
+
+import atomic_file
+import checkpoint
+
+REDMINE_URL = 'https://redmine.example.com'
+
+
+class TestCheckpoint:
+    """checkpoint モジュールのテスト"""
+
+    def test_record_and_load(self):
+        """最終チェック日は記録済みの最新日付になり、チケットIDが蓄積される"""
+        checkpoint.record(REDMINE_URL, 'prj', '2025-12-18', 101)
+        checkpoint.record(REDMINE_URL, 'prj', '2025-12-17', 100)
+
+        # 実行
+        saved = checkpoint.load(REDMINE_URL, 'prj')
+
+        # 検証
+        assert saved['last_checked_date'] == '2025-12-18'
+        assert saved['tickets'] == {'2025-12-17': 100, '2025-12-18': 101}
+
+    def test_missing(self):
+        """チェックポイントがない場合は None"""
+        assert checkpoint.load(REDMINE_URL, 'prj') is None
+
+    def test_inconsistent(self):
+        """最終チェック日が未来日、またはチケットIDがない場合は None"""
+        path = checkpoint._checkpoint_path(REDMINE_URL, 'prj')
+        tomorrow = (datetime.date.today() + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+
+        atomic_file.write_json_atomic(
+            path,
+            {'redmine_url': REDMINE_URL, 'project_id': 'prj', 'last_checked_date': tomorrow, 'tickets': {tomorrow: 1}},
+        )
+        assert checkpoint.load(REDMINE_URL, 'prj') is None
+
+        atomic_file.write_json_atomic(
+            path,
+            {'redmine_url': REDMINE_URL, 'project_id': 'prj', 'last_checked_date': '2025-12-18', 'tickets': {}},
+        )
+        assert checkpoint.load(REDMINE_URL, 'prj') is None
+
+    def test_is_pending(self):
+        """昨日までチェック済みの場合のみ、チェックしていない日がないと判定する"""
+        yesterday = datetime.date.today() - datetime.timedelta(days=1)
+
+        # 検証
+        assert checkpoint.is_pending(REDMINE_URL, 'prj')
+        checkpoint.record(REDMINE_URL, 'prj', (yesterday - datetime.timedelta(days=1)).isoformat(), 100)
+        assert checkpoint.is_pending(REDMINE_URL, 'prj')
+        checkpoint.record(REDMINE_URL, 'prj', yesterday.isoformat(), 101)
+        assert not checkpoint.is_pending(REDMINE_URL, 'prj')
@@ -1,115 +1,10 @@
 """create_redmine_ticket モジュールのテスト"""
 
-from unittest.mock import MagicMock
-
 import pytest
 
+import checkpoint
 import create_redmine_ticket
-
-
-class TestBuildUserTableRows:
-    """_build_user_table_rows 関数のテスト"""
-
-    def test_with_missing_and_ok_users(self):
-        """未入力と入力済みユーザーが混在"""
-        target_users = {6: '水城 瑞希', 7: '佐藤 陽翔', 8: '高橋 葵'}
-        entered_users = {6: 8.0, 8: 6.0}
-
-        # 実行
-        missing_rows, ok_rows = create_redmine_ticket._build_user_table_rows(target_users, entered_users)
-
-        # 検証
-        assert len(missing_rows) == 1  # ユーザー7
-        assert len(ok_rows) == 2  # ユーザー6, 8
-        assert '|水城 瑞希|8.00|' in ok_rows
-        assert '|佐藤 陽翔|---|' in missing_rows
-
-    def test_all_users_entered(self):
-        """全員入力済み"""
-        target_users = {6: '水城 瑞希', 7: '佐藤 陽翔'}
-        entered_users = {6: 8.0, 7: 7.5}
-
-        # 実行
-        missing_rows, ok_rows = create_redmine_ticket._build_user_table_rows(target_users, entered_users)
-
-        # 検証
-        assert len(missing_rows) == 0
-        assert len(ok_rows) == 2
-
-    def test_no_users_entered(self):
-        """全員未入力"""
-        target_users = {6: '水城 瑞希', 7: '佐藤 陽翔'}
-        entered_users = {}
-
-        # 実行
-        missing_rows, ok_rows = create_redmine_ticket._build_user_table_rows(target_users, entered_users)
-
-        # 検証
-        assert len(missing_rows) == 2
-        assert len(ok_rows) == 0
-
-
-class TestBuildProjectTableRows:
-    """_build_project_table_rows 関数のテスト"""
-
-    def test_with_projects(self):
-        """複数プロジェクトの集計"""
-        entered_projects = {
-            'Project A': 15.5,
-            'Project B': 8.0,
-            'Project C': 5.5,
-        }
-
-        # 実行
-        result = create_redmine_ticket._build_project_table_rows(entered_projects)
-
-        # 検証
-        assert len(result) == 3
-        assert '|Project A|15.50|' in result
-        assert '|Project B|8.00|' in result
-
-    def test_empty_projects(self):
-        """プロジェクトなし"""
-        entered_projects = {}
-
-        # 実行
-        result = create_redmine_ticket._build_project_table_rows(entered_projects)
-
-        # 検証
-        assert result == []
-
-
-class TestBuildDescription:
-    """_build_description 関数のテスト"""
-
-    def test_with_missing_users(self):
-        """未入力者がいる場合"""
-        missing_rows = ['|佐藤 陽翔|---|']
-        ok_rows = ['|水城 瑞希|8.00|', '|高橋 葵|6.00|']
-        project_rows = ['|Project A|14.00|']
-
-        # 実行
-        result = create_redmine_ticket._build_description('2025-12-18', missing_rows, ok_rows, project_rows)
-
-        # 検証
-        assert 'h3. 対象日: 2025-12-18' in result
-        assert 'h4. 未入力のメンバー' in result
-        assert 'h4. 入力済みのメンバー' in result
-        assert 'h4. プロジェクト別集計' in result
-        assert '|佐藤 陽翔|---|' in result
-
-    def test_without_missing_users(self):
-        """全員入力済みの場合"""
-        missing_rows = []
-        ok_rows = ['|水城 瑞希|8.00|']
-        project_rows = []
-
-        # 実行
-        result = create_redmine_ticket._build_description('2025-12-18', missing_rows, ok_rows, project_rows)
-
-        # 検証
-        assert 'h4. 全員の入力が完了しています' in result
-        assert 'h4. 未入力のメンバー' not in result
+import user_setting as us
 
 
 class TestGetSubjectAndPriority:
@@ -141,11 +36,9 @@ class TestGetSubjectAndPriority:
 class TestCreateRedmineTicket:
     """create_redmine_ticket 関数のテスト"""
 
-    def test_success_with_missing_users(self, mock_requests_post, sample_create_issue_response, mock_redmine_api_key, capfd):
+    def test_success_with_missing_users(self, make_response, mock_requests_post, sample_create_issue_response, mock_redmine_api_key, capfd):
         """未入力者がいる場合、チケット作成成功"""
-        mock_response = MagicMock()
-        mock_response.json.return_value = sample_create_issue_response
-        mock_response.raise_for_status.return_value = None
+        mock_response = make_response(sample_create_issue_response)
         mock_requests_post.return_value = mock_response
 
         # データ準備
@@ -170,11 +63,9 @@ class TestCreateRedmineTicket:
         captured = capfd.readouterr()
         assert 'チケット作成成功' in captured.out
 
-    def test_success_without_missing_users(self, mock_requests_post, sample_create_issue_response, mock_redmine_api_key):
+    def test_success_without_missing_users(self, make_response, mock_requests_post, sample_create_issue_response, mock_redmine_api_key):
         """全員入力済み、チケット作成成功"""
-        mock_response = MagicMock()
-        mock_response.json.return_value = sample_create_issue_response
-        mock_response.raise_for_status.return_value = None
+        mock_response = make_response(sample_create_issue_response)
         mock_requests_post.return_value = mock_response
 
         # データ準備
@@ -209,3 +100,116 @@ class TestCreateRedmineTicket:
         # 検証：エラーメッセージが出力される
         captured = capfd.readouterr()
         assert 'チケット作成エラー' in captured.out
+
+    def test_records_checkpoint(self, make_response, mock_requests_post, sample_create_issue_response, mock_redmine_api_key):
+        """作成に成功したチケットはチェックポイントに記録される"""
+        mock_response = make_response(sample_create_issue_response)
+        mock_requests_post.return_value = mock_response
+
+        # 実行
+        issue_id = create_redmine_ticket.create_redmine_ticket('2025-12-18', {6: '水城 瑞希'}, {6: 8.0}, {'Project A': 8.0})
+
+        # 検証
+        assert issue_id == 101
+        saved = checkpoint.load(us.REDMINE_URL, us.TARGET_PROJECT_ID)
+        assert saved['last_checked_date'] == '2025-12-18'
+        assert saved['tickets'] == {'2025-12-18': 101}
+
+
+class TestCreateRedmineTickets:
+    """create_redmine_tickets 関数のテスト"""
+
+    def test_skips_existing_tickets(self, fake_redmine):
+        """既存のチケットがある日付は作成せず、既存チケットの確認はプロジェクトごとに1回の範囲検索で行う"""
+        users = {1: 'User 1', 2: 'User 2'}
+        first = create_redmine_ticket.create_redmine_tickets([('2025-12-17', users, {1: 8.0}, {}, None)])
+        fake_redmine.requests.clear()
+
+        # 実行
+        summary = create_redmine_ticket.create_redmine_tickets(
+            [(date_str, users, {1: 8.0}, {}, None) for date_str in ('2025-12-16', '2025-12-17', '2025-12-18')]
+        )
+
+        # 検証
+        assert (summary['created'], summary['existing'], summary['failed']) == (2, 1, 0)
+        assert [t['status'] for t in summary['tickets']] == ['created', 'existing', 'created']
+        assert summary['tickets'][1]['issue_id'] == first['tickets'][0]['issue_id']
+        assert summary['tickets'][0]['watchers'] == 1
+        assert len(fake_redmine.requests_to('/issues.json')) == 3  # 範囲検索1回 + 作成2回
+        assert len(fake_redmine.issues) == 3
+        assert checkpoint.load(us.REDMINE_URL, us.TARGET_PROJECT_ID)['last_checked_date'] == '2025-12-18'
+
+    def test_failures_in_summary(self, make_response, mock_requests_get, mock_requests_post, capfd):
+        """作成に失敗したチケットは出力せずに結果へ含め、他のチケットの作成は続ける"""
+        mock_requests_get.return_value.json.return_value = {'issues': [], 'total_count': 0}
+
+        def post(path, json):
+            if json['issue']['project_id'] == 'prj_b':
+                raise ConnectionError('connection refused')
+            return make_response({'issue': {'id': 200}})
+
+        mock_requests_post.side_effect = post
+
+        # 実行
+        summary = create_redmine_ticket.create_redmine_tickets(
+            [('2025-12-18', {6: '水城 瑞希'}, {}, {}, 'prj_a'), ('2025-12-18', {6: '水城 瑞希'}, {}, {}, 'prj_b')]
+        )
+
+        # 検証
+        assert (summary['created'], summary['failed']) == (1, 1)
+        failed = summary['tickets'][1]
+        assert (failed['project_id'], failed['status'], failed['error']) == ('prj_b', 'failed', 'connection refused')
+        assert mock_requests_get.call_count == 2  # プロジェクトごとに1回
+        assert capfd.readouterr().out == ''
+
+
+class TestUpdateRedmineTicket:
+    """update_redmine_ticket 関数のテスト"""
+
+    @pytest.fixture
+    def issue_id(self, fake_redmine):
+        """User 2 が未入力のチェックチケット"""
+        return create_redmine_ticket.create_redmine_ticket('2025-12-18', {1: 'User 1', 2: 'User 2'}, {1: 8.0}, {'Project A': 8.0})
+
+    def test_no_changes(self, fake_redmine, issue_id):
+        """入力状況が変わっていない場合は何も送信しない"""
+        fake_redmine.requests.clear()
+
+        # 実行
+        result = create_redmine_ticket.update_redmine_ticket(issue_id, '2025-12-18', {1: 'User 1', 2: 'User 2'}, {1: 8.0}, {'Project A': 8.0})
+
+        # 検証
+        assert result == {'issue_id': issue_id, 'entered': [], 'hours': {}, 'fields': [], 'watchers_removed': []}
+        assert [method for method, _, _ in fake_redmine.requests] == ['GET']
+
+    def test_late_entries(self, fake_redmine, issue_id):
+        """後から入力されたメンバーをウォッチャーから外し、件名を【完了】にして説明文を更新する"""
+        entered_users = {1: 7.5, 2: 6.0}
+
+        # 実行
+        result = create_redmine_ticket.update_redmine_ticket(issue_id, '2025-12-18', {1: 'User 1', 2: 'User 2'}, entered_users, {'Project A': 13.5})
+
+        # 検証
+        assert result['entered'] == ['User 2']
+        assert result['hours'] == {'User 1': (8.0, 7.5)}
+        assert result['fields'] == ['description', 'subject']
+        assert result['watchers_removed'] == [2]
+        issue = fake_redmine.issues[0]
+        assert issue['subject'].startswith('【完了】')
+        assert '|User 2|6.00|' in issue['description']
+        assert issue['watcher_user_ids'] == []
+        assert len(fake_redmine.issues) == 1
+
+    def test_keeps_watchers_outside_targets(self, fake_redmine, issue_id):
+        """チェック対象外のウォッチャー (手動で追加したユーザー) は入力済みでも外さない"""
+        fake_redmine.issues[0]['watcher_user_ids'].append(99)
+
+        # 実行
+        result = create_redmine_ticket.update_redmine_ticket(
+            issue_id, '2025-12-18', {1: 'User 1', 2: 'User 2'}, {1: 8.0, 2: 6.0, 99: 4.0}, {'Project A': 18.0}
+        )
+
+        # 検証
+        assert result['watchers_removed'] == [2]
+        assert fake_redmine.issues[0]['watcher_user_ids'] == [99]
+        assert not any(method == 'DELETE' and path.endswith('/watchers/99.json') for method, path, _ in fake_redmine.requests)
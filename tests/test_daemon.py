@@ -0,0 +1,150 @@
+"""daemon モジュールのテスト"""
+
+import datetime
+import json
+
+import pytest
+
+import daemon
+import main
+import user_setting as us
+
+
+@pytest.fixture
+def status_path(tmp_path):
+    """ステータスファイルのパス"""
+    return tmp_path / 'status.json'
+
+
+class TestNextJob:
+    """Daemon.next_job のテスト"""
+
+    def test_next_time_today_or_tomorrow(self, status_path):
+        """当日の残りの時刻のうち最も早いもの、なければ翌日の最初の時刻を返す"""
+        d = daemon.Daemon(lambda: None, ['p'], ['09:00'], ['13:00', '17:30'], str(status_path))
+
+        # 検証
+        assert d.next_job(datetime.datetime(2025, 12, 18, 8, 0)) == (datetime.datetime(2025, 12, 18, 9, 0), 'check')
+        assert d.next_job(datetime.datetime(2025, 12, 18, 9, 0)) == (datetime.datetime(2025, 12, 18, 13, 0), 'reminder')
+        assert d.next_job(datetime.datetime(2025, 12, 18, 18, 0)) == (datetime.datetime(2025, 12, 19, 9, 0), 'check')
+
+    def test_check_before_reminder_at_same_time(self, status_path):
+        """同じ時刻の場合は日次チェックを先に実行する"""
+        d = daemon.Daemon(lambda: None, ['p'], ['09:00'], ['09:00'], str(status_path))
+
+        # 検証
+        assert d.next_job(datetime.datetime(2025, 12, 18, 8, 0))[1] == 'check'
+
+    def test_no_schedule(self, status_path):
+        """時刻が設定されていない場合は None を返す"""
+        d = daemon.Daemon(lambda: None, ['p'], [], [], str(status_path))
+
+        # 検証
+        assert d.next_job(datetime.datetime(2025, 12, 18, 8, 0)) is None
+
+
+class TestRunJob:
+    """スタンドインサーバーに対する日次チェックとリマインドのテスト"""
+
+    @pytest.fixture
+    def daemon_for_fake(self, fake_redmine, status_path, monkeypatch):
+        """スタンドインサーバーのメンバー全員をチェック対象とする Daemon"""
+        monkeypatch.setattr(us, 'TARGET_LIST', fake_redmine.member_ids())
+        # 未入力のメンバーが出るよう、エントリを少なくする
+        fake_redmine.entries_per_day = 3
+        return daemon.Daemon(main.main, [fake_redmine.project_id], ['09:00'], ['13:00'], str(status_path))
+
+    def test_check_writes_status(self, daemon_for_fake, fake_redmine, status_path):
+        """日次チェックの結果と所要時間をステータスファイルに書き出す"""
+        # 実行
+        daemon_for_fake.run_job('check')
+
+        # 検証
+        assert len(fake_redmine.issues) == 1
+        status = json.loads(status_path.read_text(encoding='utf-8'))
+        assert status['state'] == 'idle'
+        assert status['runs'] == 1
+        last_run = status['last_run']
+        assert last_run['kind'] == 'check'
+        assert last_run['ok'] is True
+        assert 'create_ticket' in last_run['phases']
+        assert last_run['http']['/issues.json']['requests'] == 2
+
+    def test_check_skipped_when_done(self, daemon_for_fake, fake_redmine):
+        """昨日までチェック済みの場合は、再度チケットを作成しない"""
+        # 実行
+        daemon_for_fake.run_job('check')
+        daemon_for_fake.run_job('check')
+
+        # 検証
+        assert len(fake_redmine.issues) == 1
+
+    def test_reminder_adds_note(self, daemon_for_fake, fake_redmine):
+        """直近のチェックチケットに、まだ入力していないメンバーを注記する"""
+        daemon_for_fake.run_job('check')
+        missing_count = len(fake_redmine.issues[0]['watcher_user_ids'])
+        assert missing_count > 0
+
+        # 実行
+        last_run = daemon_for_fake.run_job('reminder')
+
+        # 検証
+        assert last_run['ok'] is True
+        journals = fake_redmine.issues[0]['journals']
+        assert len(journals) == 1
+        assert journals[0]['notes'].count('|---|') == missing_count
+
+    def test_reminder_without_ticket(self, daemon_for_fake, fake_redmine, capfd):
+        """チェックチケットがない場合はリマインドしない"""
+        # 実行
+        daemon_for_fake.run_job('reminder')
+
+        # 検証
+        assert 'リマインド対象のチェックチケットがありません' in capfd.readouterr().out
+        assert fake_redmine.requests == []
+
+
+class TestRun:
+    """Daemon.run のテスト"""
+
+    def test_stop_while_waiting(self, status_path, monkeypatch):
+        """待機中に停止を指示されると、ステータスを stopped にして終了する"""
+        monkeypatch.setattr(daemon.datetime, 'datetime', _FixedDateTime)
+        d = daemon.Daemon(lambda: None, ['p'], ['23:59'], [], str(status_path))
+        # 次回の予定を書き出した時点で停止を指示する
+        write_status = d._write_status
+
+        def stop_after_write():
+            write_status()
+            if d.status['next_run'] is not None:
+                d.stop()
+
+        d._write_status = stop_after_write
+
+        # 実行
+        d.run()
+
+        # 検証
+        status = json.loads(status_path.read_text(encoding='utf-8'))
+        assert status['state'] == 'stopped'
+        assert status['runs'] == 0
+
+    def test_default_status_path(self, tmp_path, monkeypatch):
+        """ステータスファイルの既定の出力先は、書き出し時点の CACHE_DIR から求める"""
+        d = daemon.Daemon(lambda: None, ['p'], [], [])
+        monkeypatch.setattr(us, 'CACHE_DIR', str(tmp_path / 'later'))
+
+        # 実行
+        d.run()
+
+        # 検証
+        status = json.loads((tmp_path / 'later' / 'daemon_status.json').read_text(encoding='utf-8'))
+        assert status['state'] == 'stopped'
+
+
+class _FixedDateTime(datetime.datetime):
+    """現在時刻を 00:00 に固定した datetime (起動時の日次チェックを行わせない)"""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.combine(datetime.date.today(), datetime.time(0, 0))
@@ -0,0 +1,113 @@
+"""Redmine スタンドインサーバーを使ったエンドツーエンドのテスト"""
+
+import datetime
+import time
+
+import pytest
+
+import check_specific_time
+import main
+import user_setting as us
+
+YESTERDAY = datetime.date.today() - datetime.timedelta(days=1)
+
+
+def _expected_totals(fake_redmine, day):
+    """スタンドインサーバーのデータから、メンバーのユーザー別・プロジェクト別集計を求める"""
+    members = set(fake_redmine.member_ids())
+    users: dict = {}
+    projects: dict = {}
+    for entry in fake_redmine.entries_for_day(day):
+        if entry['user']['id'] in members:
+            users[entry['user']['id']] = users.get(entry['user']['id'], 0) + entry['hours']
+            projects[entry['project']['name']] = projects.get(entry['project']['name'], 0) + entry['hours']
+    return users, projects
+
+
+class TestEndToEnd:
+    """実際の HTTP 通信を伴う取得・集計・チケット作成のテスト"""
+
+    def test_specific_date_totals(self, fake_redmine, monkeypatch):
+        """全ページを取得し、グループ経由のメンバーを含めて集計する"""
+        monkeypatch.setattr('user_setting.PAGE_LIMIT', 25)
+        fake_redmine.entries_per_day = 180
+
+        # 実行
+        str_date, target_users, entered_users, project_totals = check_specific_time.get_specific_date_time(YESTERDAY)
+
+        # 検証
+        expected_users, expected_projects = _expected_totals(fake_redmine, YESTERDAY)
+        assert str_date == YESTERDAY.isoformat()
+        assert sorted(target_users) == fake_redmine.member_ids()
+        assert entered_users == pytest.approx(expected_users)
+        assert project_totals == pytest.approx(expected_projects)
+        assert len(fake_redmine.requests_to('/time_entries.json')) == 8
+
+    def test_connections_reused(self, fake_redmine, monkeypatch):
+        """Keep-Alive により、リクエスト数より少ない接続で取得する"""
+        monkeypatch.setattr('user_setting.PAGE_LIMIT', 10)
+        fake_redmine.entries_per_day = 400
+
+        # 実行
+        check_specific_time.get_specific_date_time(YESTERDAY)
+        check_specific_time.get_specific_date_time(YESTERDAY - datetime.timedelta(days=1))
+
+        # 検証
+        assert len(fake_redmine.requests) > 80
+        assert len(fake_redmine.connections) <= us.HTTP_POOL_SIZE + us.MAX_WORKERS + 2
+
+    def test_pages_fetched_concurrently(self, fake_redmine, monkeypatch):
+        """応答に遅延がある場合も、2ページ目以降は並行して取得する"""
+        monkeypatch.setattr('user_setting.PAGE_LIMIT', 10)
+        fake_redmine.entries_per_day = 160
+        fake_redmine.latency = 0.05
+
+        # 実行
+        started = time.perf_counter()
+        check_specific_time.get_specific_date_time(YESTERDAY)
+        elapsed = time.perf_counter() - started
+
+        # 検証: 16ページを逐次取得した場合の半分未満の時間で終わる
+        assert len(fake_redmine.requests_to('/time_entries.json')) == 16
+        assert elapsed < 16 * 0.05 / 2
+
+    def test_throttled_requests_retried(self, fake_redmine, monkeypatch):
+        """429 が返されても再試行し、正しく集計する"""
+        monkeypatch.setattr('user_setting.PAGE_LIMIT', 25)
+        monkeypatch.setattr('user_setting.HTTP_MAX_RETRIES', 10)
+        fake_redmine.entries_per_day = 180
+        fake_redmine.throttle_rate = 0.3
+        fake_redmine.retry_after = 0
+
+        # 実行
+        _, _, entered_users, project_totals = check_specific_time.get_specific_date_time(YESTERDAY)
+
+        # 検証
+        expected_users, expected_projects = _expected_totals(fake_redmine, YESTERDAY)
+        assert entered_users == pytest.approx(expected_users)
+        assert project_totals == pytest.approx(expected_projects)
+        assert len(fake_redmine.requests_to('/time_entries.json')) > 8
+
+    def test_server_errors(self, fake_redmine, capfd):
+        """サーバーエラー時は取得失敗として扱う"""
+        fake_redmine.error_rate = 1.0
+
+        # 実行
+        result = check_specific_time.get_specific_date_time(YESTERDAY)
+
+        # 検証
+        assert result == (None, None, None, None)
+        assert 'プロジェクトメンバー取得エラー' in capfd.readouterr().out
+
+    def test_main_creates_ticket(self, fake_redmine):
+        """前回チェック日の検索からチケット作成までを通しで実行する"""
+        # 実行
+        main.main()
+
+        # 検証: 前回のチケットがないため昨日分のチケットを作成し、未入力のメンバーをウォッチャーにする
+        assert len(fake_redmine.issues) == 1
+        issue = fake_redmine.issues[0]
+        assert f'({YESTERDAY.isoformat()})' in issue['subject']
+        entered_users, _ = _expected_totals(fake_redmine, YESTERDAY)
+        assert issue['watcher_user_ids'] == [uid for uid in us.TARGET_LIST if uid not in entered_users]
+        assert issue['parent'] == {'id': us.PARENT_TICKET_ID}
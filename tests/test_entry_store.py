@@ -0,0 +1,188 @@
+"""entry_store モジュールとローカルストア同期のテスト"""
+
+import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+import aggregation
+import check_specific_time
+import entry_store
+import time_entry
+
+
+def _entry(entry_id, spent_on, user_id=6, hours=1.0, updated_on='2025-12-18T09:00:00Z'):
+    """Redmine の JSON 形式のエントリを生成する"""
+    return {
+        'id': entry_id,
+        'spent_on': spent_on,
+        'hours': hours,
+        'user': {'id': user_id, 'name': f'user{user_id}'},
+        'project': {'id': 1, 'name': 'Project A'},
+        'activity': {'id': 9, 'name': '開発'},
+        'updated_on': updated_on,
+    }
+
+
+def _record(*args, **kwargs):
+    """作業時間エントリのレコードを生成する"""
+    return time_entry.from_json(_entry(*args, **kwargs), {})
+
+
+@pytest.fixture
+def store(tmp_path):
+    """一時ディレクトリ上のストア"""
+    with entry_store.EntryStore(str(tmp_path / 'entries.sqlite3')) as s:
+        yield s
+
+
+class TestEntryStore:
+    """EntryStore クラスのテスト"""
+
+    def test_upsert_and_query(self, store):
+        """ID をキーに追加・更新され、レコードとして取得できる"""
+        store.upsert([_record(1, '2025-12-18'), _record(2, '2025-12-19')])
+        store.upsert([_record(1, '2025-12-18', hours=3.5, updated_on='2025-12-19T09:00:00Z')])
+
+        # 実行
+        entries = store.entries_between('2025-12-18', '2025-12-18')
+
+        # 検証
+        assert len(entries) == 1
+        assert entries[0] == _record(1, '2025-12-18', hours=3.5, updated_on='2025-12-19T09:00:00Z')
+        assert entries[0].user_name == 'user6'
+        assert entries[0].project_name == 'Project A'
+        assert store.count_between('2025-12-18', '2025-12-19') == 2
+        assert store.max_updated_on() == '2025-12-19T09:00:00Z'
+
+    def test_replace_day(self, store):
+        """指定日のエントリが取得結果で置き換わる"""
+        store.upsert([_record(1, '2025-12-18'), _record(2, '2025-12-18'), _record(3, '2025-12-19')])
+
+        # 実行
+        store.replace_day('2025-12-18', [_record(2, '2025-12-18')])
+
+        # 検証
+        assert [e.id for e in store.entries_between('2025-12-18', '2025-12-19')] == [2, 3]
+
+    def test_columns_between(self, store):
+        """集計軸ごとの列と時間の列として取得できる"""
+        store.upsert([_record(2, '2025-12-19', user_id=7, hours=2.5), _record(1, '2025-12-18'), _record(3, '2025-12-20')])
+
+        # 実行
+        columns, hours = store.columns_between('2025-12-18', '2025-12-19', ('day', 'user', 'project'))
+
+        # 検証
+        assert columns == {'day': ['2025-12-18', '2025-12-19'], 'user': [6, 7], 'project': ['Project A', 'Project A']}
+        assert hours == [1.0, 2.5]
+
+    def test_state(self, store):
+        """同期状態の保存と取得"""
+        assert store.get_state('high_water') is None
+        store.set_state('high_water', '2025-12-18T09:00:00Z')
+        assert store.get_state('high_water') == '2025-12-18T09:00:00Z'
+
+    def test_max_updated_on_uses_index(self, store):
+        """更新日時の最大値は索引から求める (全件を走査しない)"""
+        store.upsert([_record(1, '2025-12-18'), _record(2, '2025-12-19', updated_on='2025-12-19T09:00:00Z')])
+
+        # 実行
+        plan = store.conn.execute('EXPLAIN QUERY PLAN SELECT MAX(updated_on) FROM time_entries').fetchall()
+
+        # 検証
+        assert store.max_updated_on() == '2025-12-19T09:00:00Z'
+        assert any('idx_time_entries_updated_on' in row[-1] for row in plan)
+
+
+class TestEntryStoreSync:
+    """ローカルストアを使った作業時間エントリ取得のテスト"""
+
+    @pytest.fixture(autouse=True)
+    def use_store(self, monkeypatch, mock_redmine_api_key):
+        monkeypatch.setattr('user_setting.USE_ENTRY_STORE', True)
+
+    @staticmethod
+    def _respond(make_response, mock_requests_get, handler):
+        def fake_get(path, params=None, **kwargs):
+            entries = handler(params)
+            mock_response = make_response({'time_entries': entries[: params.get('limit', 100)], 'total_count': len(entries)})
+            return mock_response
+
+        mock_requests_get.side_effect = fake_get
+
+    def test_incremental_sync(self, make_response, mock_requests_get):
+        """初回は期間取得、2回目以降は updated_on の差分のみ取得する"""
+        today = datetime.date.today().strftime('%Y-%m-%d')
+        server = {1: _entry(1, today), 2: _entry(2, today)}
+        self._respond(make_response, mock_requests_get, lambda params: list(server.values()))
+
+        # 初回同期
+        first = check_specific_time._get_time_entries(today)
+        assert [e.id for e in first] == [1, 2]
+        assert mock_requests_get.call_args_list[0].kwargs['params']['spent_on'].startswith('>=')
+
+        # 2回目: 更新分のみを返す
+        mock_requests_get.reset_mock()
+        updated = _entry(3, today, updated_on='2025-12-19T10:00:00Z')
+        server[3] = updated
+        self._respond(make_response, mock_requests_get, lambda params: [updated])
+
+        second = check_specific_time._get_time_entries(today)
+
+        # 検証：high-water mark 以降の差分を要求し、ローカルのデータと合わせて返す
+        assert mock_requests_get.call_args_list[0].kwargs['params']['updated_on'] == '>=2025-12-18T09:00:00Z'
+        assert [e.id for e in second] == [1, 2, 3]
+
+    def test_reconcile_detects_deletion(self, make_response, mock_requests_get, monkeypatch):
+        """件数照合で削除されたエントリを取り除く"""
+        today = datetime.date.today().strftime('%Y-%m-%d')
+        server = {1: _entry(1, today), 2: _entry(2, today)}
+        self._respond(make_response, mock_requests_get, lambda params: list(server.values()))
+        check_specific_time._get_time_entries(today)
+
+        # サーバー側でエントリ2を削除し、照合を毎回実行する
+        del server[2]
+        monkeypatch.setattr('user_setting.ENTRY_STORE_RECONCILE_INTERVAL', 0)
+
+        # 実行
+        result = check_specific_time._get_time_entries(today)
+
+        # 検証
+        assert [e.id for e in result] == [1]
+
+    def test_held_store_synced_once_per_run(self, make_response, mock_requests_get):
+        """開いたままのストアは実行ごとに1回だけ差分同期する"""
+        today = datetime.date.today().strftime('%Y-%m-%d')
+        self._respond(make_response, mock_requests_get, lambda params: [_entry(1, today)])
+
+        with check_specific_time.hold_entry_store():
+            # 同じ実行内の2回目の参照は同期しない
+            check_specific_time._get_time_entries(today)
+            synced = mock_requests_get.call_count
+            assert [e.id for e in check_specific_time._get_time_entries(today)] == [1]
+            assert mock_requests_get.call_count == synced
+
+            # 次の実行では差分同期する
+            check_specific_time.reset_entry_store_sync()
+            check_specific_time._get_time_entries(today)
+            assert mock_requests_get.call_count > synced
+
+        # 検証 (終了後はストアを保持しない)
+        assert check_specific_time._held_store is None
+
+    def test_columnar_aggregation(self, make_response, mock_requests_get, monkeypatch):
+        """列指向の集計ではローカルストアの列をそのまま集計する"""
+        pytest.importorskip('numpy')
+        monkeypatch.setattr('user_setting.AGGREGATION_BACKEND', 'auto')
+        today = datetime.date.today().strftime('%Y-%m-%d')
+        server = [_entry(1, today, hours=2.0), _entry(2, today, hours=1.5), _entry(3, today, user_id=7)]
+        self._respond(make_response, mock_requests_get, lambda params: server)
+
+        # 実行
+        groups = check_specific_time._collect_time_totals({'prj': MagicMock()}, today)
+        entered_users, project_totals = check_specific_time._summarize_day(groups, {6: 'user6'})
+
+        # 検証
+        assert isinstance(groups, aggregation.ColumnarGroupBy)
+        assert entered_users == {6: 3.5}
+        assert project_totals == {'Project A': 3.5}
@@ -0,0 +1,109 @@
+"""export モジュールのテスト"""
+
+import csv
+import datetime
+import gzip
+import json
+
+import pytest
+import requests
+
+import check_specific_time
+import export
+import user_setting as us
+
+END = datetime.date.today() - datetime.timedelta(days=1)
+START = END - datetime.timedelta(days=4)
+
+
+def _expected(fake_redmine):
+    """スタンドインサーバーのデータから、期間内のエントリ数とユーザー別・日別の時間を求める"""
+    entries = fake_redmine.entries_between(START, END)
+    user_days: dict = {}
+    for e in entries:
+        key = (e['spent_on'], e['user']['id'])
+        user_days[key] = user_days.get(key, 0) + e['hours']
+    return entries, user_days
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    """区切りをまたぐ処理を確認するため、区切りの日数を短くする"""
+    monkeypatch.setattr(us, 'EXPORT_CHUNK_DAYS', 2)
+
+
+class TestExport:
+    """export 関数のテスト"""
+
+    def test_csv(self, fake_redmine, tmp_path):
+        """エントリとユーザー別・プロジェクト別の日別集計を CSV に書き出す"""
+        entries, user_days = _expected(fake_redmine)
+
+        # 実行
+        result = export.export(START, END, str(tmp_path))
+
+        # 検証
+        with open(result['entries']['path'], encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert result['entries']['rows'] == len(rows) == len(entries)
+        assert sorted(int(r['id']) for r in rows) == sorted(e['id'] for e in entries)
+
+        with open(result['user_day']['path'], encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert {(r['spent_on'], int(r['user_id'])): float(r['hours']) for r in rows} == pytest.approx({k: round(v, 2) for k, v in user_days.items()})
+        assert [r['spent_on'] for r in rows] == sorted(r['spent_on'] for r in rows)
+
+        with open(result['project_day']['path'], encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert sum(int(r['entries']) for r in rows) == len(entries)
+        assert {p.name for p in tmp_path.iterdir()} == {f'{kind}_{START}_{END}.csv' for kind in export.KINDS}
+
+    def test_jsonl_gzip(self, fake_redmine, tmp_path):
+        """gzip 形式の JSON Lines に書き出す"""
+        entries, user_days = _expected(fake_redmine)
+
+        # 実行
+        result = export.export(START, END, str(tmp_path), fmt='jsonl', compress=True, kinds=('user_day',))
+
+        # 検証
+        assert result['user_day']['path'].endswith('.jsonl.gz')
+        with gzip.open(result['user_day']['path'], 'rt', encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        assert len(rows) == result['user_day']['rows'] == len(user_days)
+        assert sum(r['entries'] for r in rows) == len(entries)
+        assert set(rows[0]) == set(export.KINDS['user_day'])
+
+    def test_store_source(self, fake_redmine, tmp_path):
+        """ローカルストアから読み出した場合も、Redmine から取得した場合と同じ集計になる"""
+        # 実行
+        from_redmine = export.export(START, END, str(tmp_path / 'redmine'), kinds=('project_day',))
+        from_store = export.export(START, END, str(tmp_path / 'store'), source='store', kinds=('project_day',))
+
+        # 検証
+        with open(from_redmine['project_day']['path'], encoding='utf-8') as a, open(from_store['project_day']['path'], encoding='utf-8') as b:
+            assert a.read() == b.read()
+
+    def test_store_synced_once(self, fake_redmine, tmp_path, monkeypatch):
+        """ローカルストアから読み出す場合は、区切りの数によらず同期は1回だけ行う"""
+        calls = []
+        sync = check_specific_time._sync_entry_store
+        monkeypatch.setattr(check_specific_time, '_sync_entry_store', lambda store, str_from: calls.append(str_from) or sync(store, str_from))
+
+        # 実行
+        result = export.export(START, END, str(tmp_path), source='store', kinds=('entries',))
+
+        # 検証
+        assert calls == [f'{START:%Y-%m-%d}']
+        assert result['entries']['rows'] == len(fake_redmine.entries_between(START, END))
+
+    def test_failure_keeps_no_partial_files(self, fake_redmine, tmp_path, monkeypatch):
+        """取得に失敗した場合は書きかけのファイルを残さない"""
+        monkeypatch.setattr(us, 'HTTP_MAX_RETRIES', 0)
+        fake_redmine.error_rate = 1.0
+
+        # 実行
+        with pytest.raises(requests.HTTPError):
+            export.export(START, END, str(tmp_path))
+
+        # 検証
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,82 @@
+"""json_stream モジュールのテスト"""
+
+import json
+
+import pytest
+
+import json_stream
+
+
+def _chunks(text: str, size: int) -> list[bytes]:
+    """テキストを UTF-8 のバイト列にし、指定サイズごとに分割する"""
+    data = text.encode('utf-8')
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestIterArrayItems:
+    """iter_array_items 関数のテスト"""
+
+    @pytest.mark.parametrize('size', [1, 2, 3, 7, 4096])
+    def test_split_chunks(self, size):
+        """チャンクの区切り位置 (マルチバイト文字や数値の途中を含む) によらず同じ結果になる"""
+        body = {
+            'time_entries': [
+                {'id': 1, 'hours': 8.25, 'user': {'id': 6, 'name': '水城 瑞希'}},
+                {'id': 2, 'hours': 12, 'user': {'id': 7, 'name': '佐藤 陽翔'}},
+            ],
+            'total_count': 120,
+            'offset': 0,
+            'limit': 100,
+        }
+        meta = {}
+
+        # 実行
+        items = list(json_stream.iter_array_items(_chunks(json.dumps(body, ensure_ascii=False, indent=1), size), 'time_entries', meta))
+
+        # 検証
+        assert items == body['time_entries']
+        assert meta == {'total_count': 120, 'offset': 0, 'limit': 100}
+
+    def test_meta_before_list(self):
+        """一覧より前にあるトップレベルの値も meta に格納する"""
+        meta = {}
+
+        # 実行
+        items = list(json_stream.iter_array_items([b'{"total_count": 0, "memberships": []}'], 'memberships', meta))
+
+        # 検証
+        assert items == []
+        assert meta == {'total_count': 0}
+
+    def test_yields_before_end_of_response(self):
+        """レスポンス全体を受信する前に、受信済みの要素を返す"""
+        received = []
+
+        def chunks():
+            for chunk in [b'{"time_entries": [{"id": 1}', b', {"id": 2}', b'], "total_count": 2}']:
+                received.append(chunk)
+                yield chunk
+
+        # 実行
+        items = json_stream.iter_array_items(chunks(), 'time_entries', {})
+        first = next(items)
+
+        # 検証
+        assert first == {'id': 1}
+        assert len(received) < 3
+
+    @pytest.mark.parametrize(
+        'body',
+        [
+            b'{"time_entries": null}',
+            b'{"total_count": 1}',
+            b'{}',
+            b'{"time_entries": [{"id": 1} {"id": 2}]}',
+            b'{"time_entries": [{"id": 1}',
+            b'<html></html>',
+        ],
+    )
+    def test_invalid_response(self, body):
+        """一覧がない、または構文が不正なレスポンスは ValueError とする"""
+        with pytest.raises(ValueError, match='不正なレスポンス'):
+            list(json_stream.iter_array_items([body], 'time_entries', {}))
@@ -1,7 +1,10 @@
 """main モジュールのテスト"""
 
 import datetime
-from unittest.mock import MagicMock, patch
+import os
+import subprocess
+import sys
+from unittest.mock import patch
 
 import pytest
 
@@ -13,6 +16,8 @@ class TestMain:
 
     def test_success_with_all_data(
         self,
+        make_response,
+        route_get_responses,
         mock_requests_get,
         mock_requests_post,
         sample_members_response,
@@ -24,30 +29,19 @@ class TestMain:
         """全データ取得成功、チケット作成成功"""
         # 3つのAPI呼び出しをシミュレート
         # 1. get_last_target_date の issues 取得
-        # 2. get_specific_date_time の memberships 取得
+        # 2. get_specific_date_time の memberships 取得 (1 と並行して開始)
         # 3. get_specific_date_time の time_entries 取得
         # 4. create_redmine_ticket の issues 作成
-
-        issues_response = {'issues': []}  # チケット検索結果なし -> 昨日を返す
-
-        mock_response1 = MagicMock()
-        mock_response1.json.return_value = issues_response
-        mock_response1.raise_for_status.return_value = None
-
-        mock_response2 = MagicMock()
-        mock_response2.json.return_value = sample_members_response
-        mock_response2.raise_for_status.return_value = None
-
-        mock_response3 = MagicMock()
-        mock_response3.json.return_value = sample_time_entries_response
-        mock_response3.raise_for_status.return_value = None
-
-        mock_requests_get.side_effect = [mock_response1, mock_response2, mock_response3]
+        route_get_responses(
+            {
+                'issues.json': {'issues': []},  # チケット検索結果なし -> 昨日を返す
+                'memberships.json': sample_members_response,
+                'time_entries.json': sample_time_entries_response,
+            }
+        )
 
         # POST レスポンスの設定
-        mock_post_response = MagicMock()
-        mock_post_response.json.return_value = sample_create_issue_response
-        mock_post_response.raise_for_status.return_value = None
+        mock_post_response = make_response(sample_create_issue_response)
         mock_requests_post.return_value = mock_post_response
 
         # 実行
@@ -82,6 +76,148 @@ class TestMain:
         assert 'エラー: データ取得に失敗しました' in captured.out or 'プロジェクトメンバー取得エラー' in captured.out
 
 
+class TestMainBackfill:
+    """main 関数のバックフィルモードのテスト"""
+
+    def test_creates_ticket_per_missing_day(
+        self,
+        make_response,
+        route_get_responses,
+        mock_requests_get,
+        mock_requests_post,
+        sample_members_response,
+        sample_create_issue_response,
+        mock_redmine_api_key,
+    ):
+        """前回チェック日の翌日から昨日までの日数分チケットを作成する"""
+        last_checked = datetime.date.today() - datetime.timedelta(days=4)
+        route_get_responses(
+            {
+                'issues.json': {'issues': [{'id': 100, 'subject': f'【完了】作業時間入力チェック ({last_checked:%Y-%m-%d})'}]},
+                'memberships.json': sample_members_response,
+                'time_entries.json': {'time_entries': []},
+            }
+        )
+        mock_post_response = make_response(sample_create_issue_response)
+        mock_requests_post.return_value = mock_post_response
+
+        # 実行
+        main.main(backfill=True)
+
+        # 検証：GET は issues (前回チェック日・既存チケットの範囲検索)/memberships/time_entries の4回のみで、チケットは3日分
+        assert mock_requests_get.call_count == 4
+        issue_calls = [c for c in mock_requests_get.call_args_list if c.args[0] == '/issues.json']
+        assert issue_calls[-1].kwargs['params']['created_on'] == f'>={last_checked + datetime.timedelta(days=1):%Y-%m-%d}'
+        assert mock_requests_post.call_count == 3
+        # チケットは並行作成するため、作成順は不定
+        subjects = sorted(c.kwargs['json']['issue']['subject'] for c in mock_requests_post.call_args_list)
+        expected_dates = [f'{last_checked + datetime.timedelta(days=d):%Y-%m-%d}' for d in (1, 2, 3)]
+        assert [s[-11:-1] for s in subjects] == expected_dates
+
+
+class TestMainMultiProject:
+    """main_multi_project 関数のテスト"""
+
+    def test_creates_ticket_per_project(
+        self,
+        make_response,
+        route_get_responses,
+        mock_requests_get,
+        mock_requests_post,
+        sample_members_response,
+        sample_time_entries_response,
+        sample_create_issue_response,
+        mock_redmine_api_key,
+    ):
+        """プロジェクトごとにチケットを作成し、エントリ取得は1回にまとめる"""
+        route_get_responses(
+            {
+                'issues.json': {'issues': []},
+                'memberships.json': sample_members_response,
+                'time_entries.json': sample_time_entries_response,
+            }
+        )
+        mock_post_response = make_response(sample_create_issue_response)
+        mock_requests_post.return_value = mock_post_response
+
+        # 実行
+        main.main_multi_project(['prj_a', 'prj_b', 'prj_c'])
+
+        # 検証
+        entry_calls = [c for c in mock_requests_get.call_args_list if c.args[0] == '/time_entries.json']
+        assert len(entry_calls) == 1
+        project_ids = sorted(c.kwargs['json']['issue']['project_id'] for c in mock_requests_post.call_args_list)
+        assert project_ids == ['prj_a', 'prj_b', 'prj_c']
+
+
+class TestMainUpdate:
+    """main_update 関数 (更新モード) のテスト"""
+
+    def test_updates_existing_ticket(self, fake_redmine, monkeypatch):
+        """後から作業時間が入力された場合、新しいチケットを作らずに既存のチケットを更新する"""
+        monkeypatch.setattr('user_setting.TARGET_LIST', fake_redmine.member_ids())
+        fake_redmine.entries_per_day = 3
+        main.main()
+        watchers_before = list(fake_redmine.issues[0]['watcher_user_ids'])
+        # 遅れて入力されたエントリを追加する
+        fake_redmine.entries_per_day = 50
+
+        # 実行
+        main.main_update()
+
+        # 検証
+        assert len(fake_redmine.issues) == 1
+        issue = fake_redmine.issues[0]
+        assert len(issue['watcher_user_ids']) < len(watchers_before)
+        assert set(issue['watcher_user_ids']) <= set(watchers_before)
+        assert len(fake_redmine.requests_to('/issues.json')) == 2  # 前回チェック日の検索とチケット作成のみ
+
+    def test_without_checked_day(self, mock_requests_get, mock_redmine_api_key, capfd):
+        """チェック済みの日がない場合は通信せずに終了する"""
+        # 実行
+        main.main_update()
+
+        # 検証
+        assert mock_requests_get.call_count == 0
+        assert '更新するチェック済みの日がありません' in capfd.readouterr().out
+
+
+class TestNothingPending:
+    """昨日までチェック済みの場合のテスト"""
+
+    def test_main_exits_without_requests(self, mock_requests_get, mock_requests_post, mock_redmine_api_key, capfd):
+        """通信せずに終了する"""
+        import checkpoint
+        import user_setting as us
+
+        yesterday = datetime.date.today() - datetime.timedelta(days=1)
+        checkpoint.record(us.REDMINE_URL, us.TARGET_PROJECT_ID, yesterday.isoformat(), 100)
+
+        # 実行
+        main.main()
+
+        # 検証
+        assert mock_requests_get.call_count == 0
+        assert mock_requests_post.call_count == 0
+        assert '昨日までチェック済みのため、終了します' in capfd.readouterr().out
+
+    def test_multi_project_all_checked(self, mock_requests_get, mock_redmine_api_key, capfd):
+        """全プロジェクトがチェック済みの場合は通信せずに終了する"""
+        import checkpoint
+        import user_setting as us
+
+        yesterday = datetime.date.today() - datetime.timedelta(days=1)
+        for pid in ('prj_a', 'prj_b'):
+            checkpoint.record(us.REDMINE_URL, pid, yesterday.isoformat(), 100)
+
+        # 実行
+        main.main_multi_project(['prj_a', 'prj_b'])
+
+        # 検証
+        assert mock_requests_get.call_count == 0
+        assert '全プロジェクトが昨日までチェック済み' in capfd.readouterr().out
+
+
 class TestMainWithArgumentParsing:
     """main エントリポイントのテスト（引数パース含む）"""
 
@@ -102,3 +238,21 @@ class TestMainWithArgumentParsing:
 
         # クリーンアップ
         us.REDMINE_API_KEY = original_key
+
+    def test_invalid_update_date(self):
+        """--update の日付が不正な場合はトレースバックではなく使い方のエラーを表示する"""
+        src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+        # 実行 (引数の解析で終了するため通信はしない)
+        result = subprocess.run(
+            [sys.executable, 'main.py', 'test_key', '--update', '2024-13-01'],
+            cwd=src_dir,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+
+        # 検証
+        assert 'argument --update' in result.stderr
+        assert "'2024-13-01'" in result.stderr
+        assert 'Traceback' not in result.stderr
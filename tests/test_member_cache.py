@@ -0,0 +1,82 @@
+"""member_cache モジュールと atomic_file モジュールのテスト"""
+
+import os
+
+import atomic_file
+import member_cache
+import user_setting as us
+
+REDMINE_URL = 'https://redmine.example.com'
+
+
+class TestWriteJsonAtomic:
+    """atomic_file.write_json_atomic 関数のテスト"""
+
+    def test_write_and_read(self, tmp_path):
+        """書き込んだ内容が読み込め、一時ファイルが残らない"""
+        path = tmp_path / 'sub' / 'data.json'
+
+        # 実行
+        atomic_file.write_json_atomic(str(path), {'name': '水城 瑞希'})
+
+        # 検証
+        assert atomic_file.read_json(str(path)) == {'name': '水城 瑞希'}
+        assert os.listdir(tmp_path / 'sub') == ['data.json']
+
+    def test_read_broken_file(self, tmp_path):
+        """壊れたファイルや存在しないファイルは None"""
+        path = tmp_path / 'broken.json'
+        path.write_text('{"name": ', encoding='utf-8')
+
+        # 検証
+        assert atomic_file.read_json(str(path)) is None
+        assert atomic_file.read_json(str(tmp_path / 'missing.json')) is None
+
+
+class TestMemberCache:
+    """member_cache モジュールのテスト"""
+
+    def test_save_and_load(self):
+        """保存したメンバーがユーザーID(int)をキーとして読み込める"""
+        member_cache.save(REDMINE_URL, 'prj', {6: '水城 瑞希', 7: '佐藤 陽翔'}, ['"abc"'])
+
+        # 実行
+        cache = member_cache.load(REDMINE_URL, 'prj')
+
+        # 検証
+        assert cache['members'] == {6: '水城 瑞希', 7: '佐藤 陽翔'}
+        assert cache['etags'] == ['"abc"']
+        assert member_cache.is_fresh(cache)
+        assert member_cache.can_revalidate(cache)
+
+    def test_keyed_by_url_and_project(self):
+        """URL またはプロジェクトが異なるキャッシュは使われない"""
+        member_cache.save(REDMINE_URL, 'prj', {6: '水城 瑞希'}, [])
+
+        # 検証
+        assert member_cache.load(REDMINE_URL, 'other') is None
+        assert member_cache.load('https://other.example.com', 'prj') is None
+
+    def test_broken_cache_is_miss(self):
+        """項目が欠けている・形式が異なるキャッシュは、ないものとして扱う"""
+        member_cache.save(REDMINE_URL, 'prj', {6: '水城 瑞希'}, [])
+        path = member_cache._cache_path(REDMINE_URL, 'prj')
+        data = atomic_file.read_json(path)
+
+        for broken in ({k: v for k, v in data.items() if k != 'members'}, {**data, 'members': [[6]]}, {**data, 'fetched_at': None}):
+            atomic_file.write_json_atomic(path, broken)
+
+            # 検証
+            assert member_cache.load(REDMINE_URL, 'prj') is None
+
+    def test_expired(self, monkeypatch):
+        """有効期限を過ぎたキャッシュは fresh でない"""
+        member_cache.save(REDMINE_URL, 'prj', {6: '水城 瑞希'}, [None])
+        monkeypatch.setattr(us, 'MEMBER_CACHE_TTL', 0)
+
+        # 実行
+        cache = member_cache.load(REDMINE_URL, 'prj')
+
+        # 検証：ETag がないページがあるため再検証もできない
+        assert not member_cache.is_fresh(cache)
+        assert not member_cache.can_revalidate(cache)
@@ -0,0 +1,120 @@
+"""metrics モジュールのテスト"""
+
+import datetime
+import json
+
+import pytest
+
+import main
+import metrics
+
+
+@pytest.fixture
+def recording():
+    """計測を開始し、テスト後に終了する"""
+    metrics.start()
+    yield
+    metrics.finish()
+
+
+class TestDisabled:
+    """計測していない場合のテスト"""
+
+    def test_nothing_recorded(self):
+        """工程やリクエストを記録せず、レポートも出力しない"""
+
+        @metrics.timed('work')
+        def work(value):
+            return value * 2
+
+        # 実行
+        with metrics.phase('outer'):
+            result = work(21)
+        metrics.record_request('GET', '/issues.json', None, None, 0.1)
+
+        # 検証
+        assert result == 42
+        assert not metrics.is_enabled()
+        assert metrics.report() is None
+        assert metrics.finish() is None
+
+
+class TestRecording:
+    """計測中の記録と集計のテスト"""
+
+    def test_phases(self, recording):
+        """工程ごとの所要時間と、例外で終了したかどうかを記録する"""
+
+        @metrics.timed('fail')
+        def fail():
+            raise ValueError('x')
+
+        # 実行
+        with metrics.phase('work'):
+            pass
+        with metrics.phase('work'):
+            pass
+        with pytest.raises(ValueError, match='x'):
+            fail()
+
+        # 検証
+        report = metrics.report()
+        assert [(p['name'], p['ok']) for p in report['phases']] == [('work', True), ('work', True), ('fail', False)]
+        assert report['phase_totals']['work']['calls'] == 2
+
+    def test_endpoint_summary(self, recording):
+        """数値IDをまとめたエンドポイントごとに、ページ数・エラー数・再試行数・応答時間を集計する"""
+        ok = type('Response', (), {'status_code': 200})()
+        # 実行
+        metrics.record_request('GET', '/time_entries.json', {'offset': 0, 'limit': 100}, ok, 0.2)
+        metrics.record_request('GET', '/time_entries.json', {'offset': 100, 'limit': 100}, ok, 0.4, attempt=1)
+        metrics.record_request('GET', '/groups/12.json', {'include': 'users'}, None, 1.0, error=TimeoutError())
+
+        # 検証
+        endpoints = metrics.report()['endpoints']
+        assert endpoints['/time_entries.json']['pages'] == 2
+        assert endpoints['/time_entries.json']['retries'] == 1
+        assert endpoints['/time_entries.json']['statuses'] == {'200': 2}
+        assert endpoints['/time_entries.json']['max_seconds'] == 0.4
+        assert endpoints['/groups/:id.json']['errors'] == 1
+
+    def test_prometheus_format(self, recording):
+        """工程とエンドポイントをラベルにした gauge として出力する"""
+        ok = type('Response', (), {'status_code': 200})()
+        with metrics.phase('members'):
+            metrics.record_request('GET', '/projects/a"b/memberships.json', {'offset': 0}, ok, 0.1)
+
+        # 実行
+        text = metrics.to_prometheus(metrics.report())
+
+        # 検証
+        assert '# TYPE redmine_monitor_run_duration_seconds gauge' in text
+        assert 'redmine_monitor_phase_calls{phase="members"} 1' in text
+        assert 'redmine_monitor_http_requests{endpoint="/projects/a\\"b/memberships.json",status="200"} 1' in text
+        assert text.endswith('\n')
+
+
+class TestEndToEnd:
+    """スタンドインサーバーに対するチェック処理の計測"""
+
+    def test_run_report(self, fake_redmine, tmp_path, monkeypatch):
+        """各工程と、一覧APIのページ数・受信バイト数を実行レポートに出力する"""
+        monkeypatch.setattr('user_setting.PAGE_LIMIT', 25)
+        fake_redmine.entries_per_day = 120
+        report_path = tmp_path / 'report.json'
+        textfile_path = tmp_path / 'metrics.prom'
+
+        # 実行
+        metrics.start()
+        main.main()
+        metrics.finish(str(report_path), str(textfile_path))
+
+        # 検証
+        report = json.loads(report_path.read_text(encoding='utf-8'))
+        assert {'members', 'time_entries', 'summarize', 'last_target_date', 'create_ticket'} <= set(report['phase_totals'])
+        entries = report['endpoints']['/time_entries.json']
+        assert entries['pages'] == len(fake_redmine.requests_to('/time_entries.json'))
+        assert entries['bytes'] > 0
+        assert report['endpoints']['/issues.json']['statuses'] == {'200': 1, '201': 1}
+        assert datetime.datetime.fromisoformat(report['started_at'])
+        assert 'redmine_monitor_http_pages{endpoint="/time_entries.json"}' in textfile_path.read_text(encoding='utf-8')
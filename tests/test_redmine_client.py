@@ -0,0 +1,319 @@
+"""redmine_client モジュールのテスト"""
+
+import datetime
+import email.utils
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+import redmine_client
+import user_setting as us
+
+
+@pytest.fixture
+def reset_client(monkeypatch):
+    """共有クライアントを初期状態に戻す"""
+    monkeypatch.setattr(redmine_client, '_client', None)
+    yield
+    if redmine_client._client is not None:
+        redmine_client._client.close()
+
+
+class TestRedmineClient:
+    """RedmineClient クラスのテスト"""
+
+    def test_session_settings(self):
+        """認証ヘッダー、gzip、証明書検証、プールサイズがセッションに設定される"""
+        client = redmine_client.RedmineClient('https://redmine.example.com/', 'key123', pool_size=4)
+
+        # 検証
+        assert client.base_url == 'https://redmine.example.com'
+        assert client.session.headers['X-Redmine-API-Key'] == 'key123'
+        assert 'gzip' in client.session.headers['Accept-Encoding']
+        assert client.session.verify is False
+        assert client.session.get_adapter('https://redmine.example.com')._pool_maxsize == 4
+        client.close()
+
+    def test_request_uses_base_url_and_timeout(self):
+        """相対パスが RedmineのURL と結合され、タイムアウトが付与される"""
+        client = redmine_client.RedmineClient('https://redmine.example.com', 'key123', timeout=(1, 2))
+        client.session.request = MagicMock()
+
+        # 実行
+        client.get('/issues.json', params={'limit': 1})
+        client.post('/issues.json', json={'issue': {}})
+
+        # 検証
+        get_call, post_call = client.session.request.call_args_list
+        assert get_call.args == ('GET', 'https://redmine.example.com/issues.json')
+        assert get_call.kwargs['params'] == {'limit': 1}
+        assert get_call.kwargs['timeout'] == (1, 2)
+        assert post_call.args == ('POST', 'https://redmine.example.com/issues.json')
+        assert post_call.kwargs['json'] == {'issue': {}}
+
+
+def _response(status, headers=None):
+    """ステータスコードとヘッダーのみを持つレスポンスのスタブを生成する"""
+    resp = MagicMock()
+    resp.status_code = status
+    resp.headers = headers or {}
+    return resp
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """再試行の待機を行わずに待機秒数を記録する"""
+    recorded = []
+    monkeypatch.setattr(redmine_client.time, 'sleep', recorded.append)
+    return recorded
+
+
+class TestRetry:
+    """再試行とリクエスト数の上限のテスト"""
+
+    def test_retry_after(self, sleeps):
+        """429 の場合は Retry-After の秒数だけ待って GET を再試行する"""
+        client = redmine_client.RedmineClient('https://redmine.example.com', 'key123')
+        client.session.request = MagicMock(side_effect=[_response(429, {'Retry-After': '0'}), _response(503), _response(200)])
+
+        # 実行
+        resp = client.get('/time_entries.json')
+
+        # 検証
+        assert resp.status_code == 200
+        assert client.session.request.call_count == 3
+        assert sleeps[0] == 0
+        assert 0 <= sleeps[1] <= us.HTTP_BACKOFF_BASE * 2
+        assert client.requests_sent == 3
+
+    def test_retry_after_capped(self, sleeps, monkeypatch):
+        """Retry-After が長すぎる場合は HTTP_BACKOFF_MAX 秒までの待機・送信停止にとどめる"""
+        monkeypatch.setattr('user_setting.HTTP_BACKOFF_MAX', 0.05)
+        client = redmine_client.RedmineClient('https://redmine.example.com', 'key123')
+        client.session.request = MagicMock(side_effect=[_response(429, {'Retry-After': '86400'}), _response(200)])
+
+        # 実行
+        started = time.monotonic()
+        resp = client.get('/time_entries.json')
+
+        # 検証
+        assert resp.status_code == 200
+        assert sleeps == [0.05]
+        assert client.limiter._paused_until <= started + 1
+
+    def test_post_not_retried(self, sleeps):
+        """冪等でない POST は再試行せず、そのままレスポンスを返す"""
+        client = redmine_client.RedmineClient('https://redmine.example.com', 'key123')
+        client.session.request = MagicMock(return_value=_response(503))
+
+        # 実行
+        resp = client.post('/issues.json', json={'issue': {}})
+
+        # 検証
+        assert resp.status_code == 503
+        assert client.session.request.call_count == 1
+        assert sleeps == []
+
+    def test_connection_error_gives_up(self, sleeps, monkeypatch):
+        """接続エラーが続く場合は再試行回数の上限で例外を送出する"""
+        monkeypatch.setattr('user_setting.HTTP_MAX_RETRIES', 2)
+        client = redmine_client.RedmineClient('https://redmine.example.com', 'key123')
+        client.session.request = MagicMock(side_effect=requests.ConnectionError('refused'))
+
+        # 実行・検証
+        with pytest.raises(requests.ConnectionError):
+            client.get('/issues.json')
+        assert client.session.request.call_count == 3
+        assert len(sleeps) == 2
+
+    def test_request_budget(self, monkeypatch):
+        """送信数が上限に達した後のリクエストは送信せずに例外を送出する"""
+        monkeypatch.setattr('user_setting.HTTP_REQUEST_BUDGET', 2)
+        client = redmine_client.RedmineClient('https://redmine.example.com', 'key123')
+        client.session.request = MagicMock(return_value=_response(200))
+
+        # 実行・検証
+        client.get('/issues.json')
+        client.get('/issues.json')
+        with pytest.raises(redmine_client.RequestBudgetExceededError):
+            client.get('/issues.json')
+        assert client.session.request.call_count == 2
+
+    def test_retry_after_http_date(self):
+        """Retry-After が HTTP日付の場合は現在時刻からの秒数に変換する"""
+        until = datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=30)
+        resp = _response(429, {'Retry-After': email.utils.format_datetime(until, usegmt=True)})
+
+        # 検証
+        assert 25 <= redmine_client._retry_after_seconds(resp) <= 30
+        assert redmine_client._retry_after_seconds(_response(429, {'Retry-After': 'soon'})) is None
+        assert redmine_client._retry_after_seconds(_response(429)) is None
+
+
+class TestConcurrencyLimiter:
+    """ConcurrencyLimiter クラスのテスト"""
+
+    def test_additive_increase(self):
+        """正常な応答ごとに上限を少しずつ増やし、最大値を超えない"""
+        limiter = redmine_client.ConcurrencyLimiter(2, 3, latency_threshold=10)
+
+        # 実行
+        for _ in range(20):
+            limiter.release(limiter.acquire(), overloaded=False)
+
+        # 検証
+        assert limiter.limit == 3
+
+    def test_multiplicative_decrease_once_per_window(self):
+        """同時に送信していたリクエストが過負荷になっても、上限の半減は1回のみ"""
+        limiter = redmine_client.ConcurrencyLimiter(8, 8, latency_threshold=10)
+        started = [limiter.acquire() for _ in range(4)]
+
+        # 実行
+        for s in started:
+            limiter.release(s, overloaded=True)
+
+        # 検証
+        assert limiter.limit == 4
+        limiter.release(limiter.acquire(), overloaded=True)
+        assert limiter.limit == 2
+
+    def test_slow_response_decreases(self):
+        """応答時間が閾値を超えた場合も過負荷とみなす"""
+        limiter = redmine_client.ConcurrencyLimiter(4, 8, latency_threshold=0)
+
+        # 実行
+        limiter.release(limiter.acquire() - 1, overloaded=False)
+
+        # 検証
+        assert limiter.limit == 2
+
+    def test_pause(self):
+        """停止中は送信枠を確保しない"""
+        limiter = redmine_client.ConcurrencyLimiter(4, 8, latency_threshold=10)
+
+        # 実行
+        limiter.pause(0.2)
+        started = limiter.acquire()
+
+        # 検証
+        assert started >= limiter._paused_until
+
+
+class TestHedgePolicy:
+    """HedgePolicy クラスのテスト"""
+
+    def test_delay_from_percentile(self):
+        """観測数が足りるまではヘッジせず、その後は応答時間のパーセンタイルを待ち時間とする"""
+        policy = redmine_client.HedgePolicy(percentile=0.9, min_samples=10, min_delay=0.05, max_ratio=0.1)
+        for i in range(9):
+            policy.observe('/time_entries.json', (i + 1) / 10)
+
+        # 検証
+        assert policy.delay('/time_entries.json') is None
+        policy.observe('/time_entries.json', 1.0)
+        assert policy.delay('/time_entries.json') == 1.0
+        assert policy.delay('/issues.json') is None
+
+    def test_ratio_cap(self):
+        """ヘッジの数は通常のリクエスト数に対する割合までに抑える"""
+        policy = redmine_client.HedgePolicy(percentile=0.9, min_samples=1, min_delay=0.05, max_ratio=0.25)
+
+        # 実行
+        for _ in range(8):
+            policy.observe('/time_entries.json', 0.1)
+
+        # 検証
+        assert policy.try_spend()
+        assert policy.try_spend()
+        assert not policy.try_spend()
+
+
+class TestHedgedRequest:
+    """ヘッジリクエストのテスト"""
+
+    @pytest.fixture
+    def hedged_client(self, monkeypatch):
+        """ヘッジを有効にし、待ち時間 0.05 秒でヘッジを送れる状態のクライアント"""
+        monkeypatch.setattr('user_setting.HTTP_HEDGE_ENABLED', True)
+        client = redmine_client.RedmineClient('https://redmine.example.com', 'key123')
+        for _ in range(us.HTTP_HEDGE_MIN_SAMPLES * 20):
+            client.hedge.observe('/time_entries.json', 0.01)
+        yield client
+        client.close()
+
+    def test_first_response_wins(self, hedged_client):
+        """元のリクエストが遅い場合はヘッジの応答を使い、遅れて返った応答は閉じて送信枠を返却する"""
+        release = threading.Event()
+        slow, fast = _response(200), _response(200)
+
+        def request(method, url, **kwargs):
+            if hedged_client.session.request.call_count == 1:
+                release.wait(5)
+                return slow
+            return fast
+
+        hedged_client.session.request = MagicMock(side_effect=request)
+
+        # 実行
+        resp = hedged_client.get('/time_entries.json')
+        # 元のリクエストは送信中のため、送信枠を確保したままとなる
+        in_flight = hedged_client.limiter._in_flight
+        release.set()
+
+        # 検証
+        assert resp is fast
+        assert in_flight == 1
+        assert hedged_client.session.request.call_count == 2
+        assert hedged_client.requests_sent == 2
+        for _ in range(100):
+            if slow.close.called:
+                break
+            time.sleep(0.01)
+        slow.close.assert_called_once()
+        fast.close.assert_not_called()
+        assert hedged_client.limiter._in_flight == 0
+
+    def test_no_hedge_when_fast(self, hedged_client):
+        """待ち時間内に応答があればヘッジを送らない"""
+        hedged_client.session.request = MagicMock(return_value=_response(200))
+
+        # 実行
+        hedged_client.get('/time_entries.json')
+
+        # 検証
+        assert hedged_client.session.request.call_count == 1
+
+    def test_post_not_hedged(self, hedged_client):
+        """POST はヘッジしない"""
+        hedged_client.hedge.observe('/issues.json', 0.0)
+        hedged_client.session.request = MagicMock(return_value=_response(201))
+
+        # 実行
+        hedged_client.post('/issues.json', json={'issue': {}})
+
+        # 検証
+        assert hedged_client.session.request.call_count == 1
+
+
+class TestGetClient:
+    """get_client 関数のテスト"""
+
+    def test_shared_instance(self, reset_client, mock_redmine_api_key):
+        """同じ設定の間は同一インスタンスを返す"""
+        assert redmine_client.get_client() is redmine_client.get_client()
+
+    def test_recreated_when_api_key_changes(self, reset_client, mock_redmine_api_key):
+        """APIキーが変わった場合は作り直す"""
+        first = redmine_client.get_client()
+        us.REDMINE_API_KEY = 'another_key'
+
+        # 実行
+        second = redmine_client.get_client()
+
+        # 検証
+        assert second is not first
+        assert second.session.headers['X-Redmine-API-Key'] == 'another_key'
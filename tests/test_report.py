@@ -0,0 +1,153 @@
+"""report モジュールのテスト"""
+
+import csv
+import io
+import json
+
+import pytest
+
+import report
+import user_setting as us
+
+TARGET_USERS = {6: '水城 瑞希', 7: '佐藤 陽翔', 8: '高橋 葵', 9: '山田 蓮'}
+
+
+class TestTextile:
+    """Textile 形式 (チケットの説明欄) のテスト"""
+
+    @pytest.mark.parametrize(
+        ('entered_users', 'entered_projects', 'expected'),
+        [
+            (
+                {6: 8.0, 8: 6.0},
+                {'Project A': 10.0, 'Project B': 4.0},
+                'h3. 対象日: 2025-12-18\n\n'
+                'h4. 未入力のメンバー\n\n入力お願いします。\n\n|_. 氏名 |_. 時間 |\n|佐藤 陽翔|---|\n|山田 蓮|---|\n\n'
+                'h4. 入力済みのメンバー\n\n|_. 氏名 |_. 時間 |\n|水城 瑞希|8.00|\n|高橋 葵|6.00|\n\n'
+                'h4. プロジェクト別集計\n\n|_. プロジェクト名 |_. 合計時間 |\n|Project A|10.00|\n|Project B|4.00|\n',
+            ),
+            (
+                {6: 8.0, 7: 7.5, 8: 6.0, 9: 0.25},
+                {'Project A': 21.75},
+                'h3. 対象日: 2025-12-18\n\n'
+                'h4. 全員の入力が完了しています\n\n'
+                'h4. 入力済みのメンバー\n\n|_. 氏名 |_. 時間 |\n'
+                '|水城 瑞希|8.00|\n|佐藤 陽翔|7.50|\n|高橋 葵|6.00|\n|山田 蓮|0.25|\n\n'
+                'h4. プロジェクト別集計\n\n|_. プロジェクト名 |_. 合計時間 |\n|Project A|21.75|\n',
+            ),
+            (
+                {},
+                {},
+                'h3. 対象日: 2025-12-18\n\n'
+                'h4. 未入力のメンバー\n\n入力お願いします。\n\n|_. 氏名 |_. 時間 |\n'
+                '|水城 瑞希|---|\n|佐藤 陽翔|---|\n|高橋 葵|---|\n|山田 蓮|---|\n\n',
+            ),
+            (
+                {6: 8.0},
+                {},
+                'h3. 対象日: 2025-12-18\n\n'
+                'h4. 未入力のメンバー\n\n入力お願いします。\n\n|_. 氏名 |_. 時間 |\n|佐藤 陽翔|---|\n|高橋 葵|---|\n|山田 蓮|---|\n\n'
+                'h4. 入力済みのメンバー\n\n|_. 氏名 |_. 時間 |\n|水城 瑞希|8.00|\n',
+            ),
+        ],
+        ids=['mixed', 'all_entered', 'none_entered', 'no_projects'],
+    )
+    def test_description(self, entered_users, entered_projects, expected):
+        """既定の出力はチケットの説明欄の Textile とバイト単位で一致する"""
+        # 実行
+        result = report.render('2025-12-18', TARGET_USERS, entered_users, entered_projects)
+
+        # 検証
+        assert result == expected
+
+    def test_sort_and_limit(self):
+        """時間の降順に並べ、最大行数を超えた分は省略した件数の行にする"""
+        # 実行
+        result = report.render('2025-12-18', TARGET_USERS, {6: 2.0, 7: 8.0, 8: 5.0}, {}, sort='hours', limit=2)
+
+        # 検証
+        assert '|佐藤 陽翔|8.00|\n|高橋 葵|5.00|\n|(他 1件)| |\n' in result
+        assert '水城 瑞希' not in result
+
+
+class TestReminder:
+    """render_reminder 関数のテスト"""
+
+    def test_textile(self):
+        """未入力者の一覧を Textile の表として出力する"""
+        # 実行
+        result = report.render_reminder({7: '佐藤 陽翔', 9: '山田 蓮'})
+
+        # 検証
+        assert result == 'h4. 未入力のメンバー (リマインド)\n\n入力お願いします。\n\n|_. 氏名 |_. 時間 |\n|佐藤 陽翔|---|\n|山田 蓮|---|\n'
+
+
+class TestOtherFormats:
+    """Markdown・CSV・JSON 形式のテスト"""
+
+    def test_markdown(self):
+        """Markdown の表として出力し、名前の | はエスケープする"""
+        # 実行
+        result = report.render('2025-12-18', {1: 'A|B', 2: 'C'}, {2: 1.5}, {'Project A': 1.5}, fmt='markdown')
+
+        # 検証
+        assert result.startswith('### 対象日: 2025-12-18\n\n#### 未入力のメンバー\n')
+        assert '| A\\|B | --- |\n' in result
+        assert '| C | 1.50 |\n' in result
+        assert '#### プロジェクト別集計\n\n| プロジェクト名 | 合計時間 |\n|---|---:|\n| Project A | 1.50 |\n' in result
+
+    def test_csv(self):
+        """1行に1名・1プロジェクトの CSV として出力する"""
+        # 実行
+        result = report.render('2025-12-18', {1: 'A, B', 2: 'C'}, {2: 1.5}, {'Project A': 1.5}, fmt='csv', sort='name')
+
+        # 検証
+        rows = list(csv.reader(io.StringIO(result)))
+        assert rows == [
+            list(report.CSV_COLUMNS),
+            ['2025-12-18', 'missing', 'A, B', ''],
+            ['2025-12-18', 'entered', 'C', '1.50'],
+            ['2025-12-18', 'project', 'Project A', '1.50'],
+        ]
+
+    def test_json(self):
+        """省略した行数を含む JSON として出力する"""
+        # 実行
+        result = json.loads(report.render('2025-12-18', TARGET_USERS, {6: 8.0}, {}, fmt='json', sort='name', limit=2))
+
+        # 検証
+        assert result['missing'] == ['佐藤 陽翔', '山田 蓮']
+        assert result['entered'] == [{'name': '水城 瑞希', 'hours': 8.0}]
+        assert result['omitted'] == {'missing': 1}
+
+    def test_invalid_format(self):
+        """不正な出力形式は ValueError"""
+        with pytest.raises(ValueError, match='不正な出力形式'):
+            report.render('2025-12-18', TARGET_USERS, {}, {}, fmt='html')
+
+
+class TestRenderMany:
+    """複数レポートの生成と書き出しのテスト"""
+
+    def test_worker_processes(self, monkeypatch):
+        """ワーカープロセスで生成した結果は、順序も含めて1件ずつ生成した結果と一致する"""
+        monkeypatch.setattr(us, 'REPORT_PARALLEL_MIN', 1)
+        specs = [(f'2025-12-{day:02d}', TARGET_USERS, {6: float(day)}, {'Project A': float(day)}) for day in range(1, 11)]
+
+        # 実行
+        result = report.render_many(specs, fmt='markdown', workers=2)
+
+        # 検証
+        assert result == [report.render(*spec, fmt='markdown') for spec in specs]
+
+    def test_write_reports(self, tmp_path):
+        """プロジェクト・日付ごとのファイルに書き出す"""
+        specs = [('2025-12-18', TARGET_USERS, {6: 8.0}, {}, 'prj_a'), ('2025-12-18', TARGET_USERS, {}, {}, None)]
+
+        # 実行
+        paths = report.write_reports(specs, str(tmp_path), 'json')
+
+        # 検証
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted(['prj_a_2025-12-18.json', f'{us.TARGET_PROJECT_ID}_2025-12-18.json'])
+        assert json.loads((tmp_path / 'prj_a_2025-12-18.json').read_text(encoding='utf-8'))['entered'] == [{'name': '水城 瑞希', 'hours': 8.0}]
+        assert len(paths) == 2
@@ -0,0 +1,70 @@
+"""起動時間 (モジュールの読み込み時間) のテスト"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# main の読み込みにかかる時間の上限 (ミリ秒)。インタープリター自体の起動に読み込まれるモジュールは含まない
+IMPORT_TIME_BUDGET_MS = 50
+
+# 通信や集計が必要になるまで読み込まないモジュール
+DEFERRED_MODULES = ['requests', 'urllib3', 'numpy', 'sqlite3', 'concurrent.futures', 'email.utils']
+
+
+def _import_times(code: str) -> dict[str, int]:
+    """
+    -X importtime の出力を解析し、読み込まれたモジュールごとの読み込み時間を返す
+
+    Args:
+        code: 実行するコード
+
+    Returns:
+        {モジュール名: 読み込み時間 (マイクロ秒、そのモジュール自体の分)}
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # 形式: "import time: <自身の時間> | <累積時間> | <インデント><モジュール名>"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:') :].split('|')
+        times[name.strip()] = int(self_us)
+    return times
+
+
+class TestStartup:
+    """main の読み込みのテスト"""
+
+    def test_heavy_modules_deferred(self):
+        """main の読み込みだけでは、通信・集計用の重いモジュールを読み込まない"""
+        baseline = _import_times('pass')
+        imported = set(_import_times('import main')) - set(baseline)
+
+        # 検証
+        assert 'main' in imported
+        assert [m for m in DEFERRED_MODULES if m in imported] == []
+
+    def test_import_time_budget(self):
+        """main の読み込み時間が上限以内である (3回計測した最小値で判定する)"""
+        baseline = set(_import_times('pass'))
+
+        # 実行
+        elapsed_ms = []
+        for _ in range(3):
+            times = _import_times('import main')
+            elapsed_ms.append(sum(us for name, us in times.items() if name not in baseline) / 1000)
+
+        # 検証
+        if min(elapsed_ms) > IMPORT_TIME_BUDGET_MS:
+            slowest = sorted(((us, name) for name, us in _import_times('import main').items() if name not in baseline), reverse=True)[:5]
+            pytest.fail(f'main の読み込みに {min(elapsed_ms):.1f}ms かかりました (上限 {IMPORT_TIME_BUDGET_MS}ms): {slowest}')
@@ -0,0 +1,64 @@
+"""time_entry モジュールのテスト"""
+
+import pytest
+
+import time_entry
+
+
+def _json(entry_id, user_name='水城 瑞希', project_name='Project A', **extra):
+    """Redmine の JSON 形式のエントリを生成する"""
+    return {
+        'id': entry_id,
+        'project': {'id': 1, 'name': project_name},
+        'issue': {'id': 100},
+        'user': {'id': 6, 'name': user_name},
+        'activity': {'id': 9, 'name': '開発'},
+        'hours': 1.5,
+        'comments': '定例会議',
+        'spent_on': '2025-12-18',
+        'created_on': '2025-12-18T09:00:00Z',
+        'updated_on': '2025-12-18T10:00:00Z',
+        'custom_fields': [{'id': 1, 'value': 'x'}],
+        **extra,
+    }
+
+
+class TestTimeEntry:
+    """TimeEntry クラスと変換処理のテスト"""
+
+    def test_from_json(self):
+        """使用する項目のみを平坦な属性として保持する"""
+        entry = time_entry.from_json(_json(1), {})
+
+        # 検証
+        assert entry.as_tuple() == (1, '2025-12-18', 1.5, 6, '水城 瑞希', 1, 'Project A', 9, '開発', 100, '2025-12-18T10:00:00Z')
+        assert not hasattr(entry, '__dict__')
+        with pytest.raises(AttributeError):
+            entry.comments = '定例会議'
+
+    def test_optional_fields(self):
+        """チケットや名前がないエントリも変換できる"""
+        data = {'id': 2, 'spent_on': '2025-12-18', 'hours': 2.0, 'user': {'id': 7}, 'project': {'name': 'Project B'}}
+
+        # 実行
+        entry = time_entry.from_json(data, {})
+
+        # 検証
+        assert entry.issue_id is None
+        assert entry.user_name is None
+        assert entry.activity_name is None
+        assert entry.project_name == 'Project B'
+
+    def test_decode_shares_strings(self):
+        """同じ取得処理の中では、同じ日付や名前を1つのオブジェクトで共有する"""
+        # JSON のデコード結果と同様に、値が等しい別々の文字列を渡す
+        items = [_json(1, user_name=''.join(['水城', ' 瑞希'])), _json(2, user_name=''.join(['水城 ', '瑞希']))]
+
+        # 実行
+        first, second = time_entry.decode(items)
+
+        # 検証
+        assert first.user_name is second.user_name
+        assert first.project_name is second.project_name
+        assert first.spent_on is second.spent_on
+        assert first != second